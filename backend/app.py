@@ -1,19 +1,42 @@
-import json
-import random
-from pathlib import Path
-from typing import Dict, List
+import gzip
+from contextlib import asynccontextmanager
+from typing import Annotated, Dict, List, Optional, Tuple
 
-from fastapi import Depends, FastAPI
+import mercantile
+import numpy as np
+from fastapi import Depends, FastAPI, HTTPException, Path, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, Field
 from schemas.species import SPECIES_DATA, Species
-from scripts.tree_generation import (AreaType, Rectangle, Tree,
-                                     generate_trees_for_rectangles)
+from scripts.tree_generation import (AreaType, Tree, TreePlacement,
+                                     deduplicate_trees, generate_tree_batch)
+from services.aggregation import aggregate_trees
+from services.basemap import MBTilesReader, get_basemap, is_gzipped
+from services.conversion_sweep import (SWEEP_MAX_SCENARIOS,
+                                       ConversionScenarios, iter_sweep_ndjson,
+                                       scenario_grid, scenario_list)
 from services.getAsphaultConversionResults import plan_asphalt_conversion
-
-
-class TreeQueryParams(BaseModel):
-    """Query parameters for tree generation"""
+from services.growth_projection import MAX_PROJECTION_YEARS, projection_series
+from services.rectangle_store import RectangleStore, get_rectangle_store
+from services.region_rollups import (RegionKey, RegionRollups,
+                                     get_region_rollups)
+from services.sampling import SamplingMethod, sample_rectangles
+from services.spatial_index import GridIndex, get_spatial_index
+from services.species_mix import parse_species_distribution, species_mix
+from services.species_optimizer import optimize_species_mix
+from services.tree_cache import etag_matches, scenario_etag, tree_result_cache
+from services.tree_responses import (BINARY_MEDIA_TYPE, NDJSON_MEDIA_TYPE,
+                                    TREES_REMOVED_HEADER,
+                                    binary_trees_response,
+                                    negotiate_tree_media_type,
+                                    stream_batch_ndjson, stream_trees_ndjson)
+from services.tree_tiles import (MVT_MEDIA_TYPE, TREE_TILE_MIN_ZOOM,
+                                 get_tree_tile)
+
+
+class TreeGenerationParams(BaseModel):
+    """Query parameters shared by every endpoint that generates trees"""
 
     percentage: float = Field(
         default=1.0,
@@ -26,6 +49,67 @@ class TreeQueryParams(BaseModel):
         gt=0.0,
         description="Density of trees (trees per square meter)",
     )
+    placement: TreePlacement = Field(
+        default=TreePlacement.UNIFORM,
+        description="How trees are positioned: 'uniform' scatters them "
+        "independently, 'crown_spacing' keeps them at least one crown spread "
+        "apart and drops the trees that do not fit",
+    )
+    seed: Optional[int] = Field(
+        default=None,
+        ge=0,
+        description="Random seed; seeded requests return identical trees and are "
+        "cached",
+    )
+    species_distribution: Optional[str] = Field(
+        default=None,
+        description="Species mix as comma-separated species:fraction pairs "
+        "summing to 1.0, e.g. 'redwood:0.5,coast_live_oak:0.5'; species are "
+        "drawn uniformly if omitted",
+    )
+    area_type_defaults: bool = Field(
+        default=False,
+        description="Plant area types that have a default species mix (street "
+        "sides, parking lots) with it instead of species_distribution",
+    )
+
+    def species_mix(self) -> Optional[np.ndarray]:
+        """
+        Return the species fractions per area type to generate trees with.
+
+        Returns None when species are drawn uniformly. Raises HTTPException
+        when species_distribution is not a valid distribution.
+        """
+        distribution = None
+        if self.species_distribution is not None:
+            try:
+                distribution = parse_species_distribution(self.species_distribution)
+            except ValueError as e:
+                raise HTTPException(status_code=422, detail=str(e))
+        return species_mix(distribution, self.area_type_defaults)
+
+
+class TreeScenarioParams(TreeGenerationParams):
+    """Query parameters describing which rectangles get planted, and how densely"""
+
+    sampling: SamplingMethod = Field(
+        default=SamplingMethod.UNIFORM,
+        description="How rectangles are sampled: 'uniform' keeps a percentage of "
+        "rectangles, 'area_weighted' a percentage of plantable area and "
+        "'stratified' a percentage of each area type",
+    )
+    min_lon: Optional[float] = Field(
+        default=None, ge=-180.0, le=180.0, description="Western edge of the viewport"
+    )
+    min_lat: Optional[float] = Field(
+        default=None, ge=-90.0, le=90.0, description="Southern edge of the viewport"
+    )
+    max_lon: Optional[float] = Field(
+        default=None, ge=-180.0, le=180.0, description="Eastern edge of the viewport"
+    )
+    max_lat: Optional[float] = Field(
+        default=None, ge=-90.0, le=90.0, description="Northern edge of the viewport"
+    )
 
     model_config = {
         "json_schema_extra": {
@@ -33,11 +117,66 @@ class TreeQueryParams(BaseModel):
                 {
                     "percentage": 0.5,
                     "trees_per_square_meter": 0.01,
+                    "species_distribution": "redwood:0.5,coast_live_oak:0.5",
                 }
             ]
         }
     }
 
+    def viewport(self) -> Optional[Tuple[float, float, float, float]]:
+        """
+        Return the requested viewport as (min_lon, min_lat, max_lon, max_lat).
+
+        Returns None when no viewport was given. Raises HTTPException when only
+        part of the viewport was given or its edges are inverted.
+        """
+        edges = (self.min_lon, self.min_lat, self.max_lon, self.max_lat)
+        if all(edge is None for edge in edges):
+            return None
+        if any(edge is None for edge in edges):
+            raise HTTPException(
+                status_code=422,
+                detail="min_lon, min_lat, max_lon and max_lat must be given together",
+            )
+        if self.min_lon > self.max_lon or self.min_lat > self.max_lat:
+            raise HTTPException(
+                status_code=422, detail="Viewport minimum exceeds its maximum"
+            )
+        return edges
+
+
+class TreeQueryParams(TreeScenarioParams):
+    """Query parameters for tree generation"""
+
+    stream: bool = Field(
+        default=False,
+        description="Stream trees as NDJSON while they are generated "
+        "(also enabled by 'Accept: application/x-ndjson')",
+    )
+    dedup_radius_meters: Optional[float] = Field(
+        default=None,
+        gt=0.0,
+        le=50.0,
+        description="Drop trees closer than this many meters to an earlier "
+        "tree, e.g. where rectangles overlap; the number removed is reported "
+        "in the X-Trees-Removed header",
+    )
+
+
+class TreeAggregateParams(TreeScenarioParams):
+    """Query parameters for aggregated tree counts"""
+
+    cell_size_degrees: float = Field(
+        default=0.01,
+        gt=0.0,
+        le=1.0,
+        description="Width and height of an aggregation grid cell in degrees",
+    )
+
+
+class TreeTileParams(TreeGenerationParams):
+    """Query parameters for tree vector tiles"""
+
 
 class AsphaltConversionParams(BaseModel):
     """Parameters for asphalt conversion planning"""
@@ -77,10 +216,182 @@ class AsphaltConversionParams(BaseModel):
     }
 
 
+class AsphaltConversionProjectionParams(AsphaltConversionParams):
+    """Parameters for a year-by-year projection of an asphalt conversion"""
+
+    horizon_years: int = Field(
+        default=50,
+        ge=1,
+        le=MAX_PROJECTION_YEARS,
+        description="Number of years to project",
+    )
+
+
+class SpeciesMixOptimizationParams(BaseModel):
+    """Parameters for finding the species mix with the most CO2 reduction"""
+
+    asphalt_sqft: float = Field(
+        gt=0.0, description="Total square feet of asphalt to remove"
+    )
+    budget: float = Field(
+        gt=0.0,
+        description="Total budget for asphalt removal, planting and maintenance",
+    )
+    water_cap: Optional[float] = Field(
+        default=None,
+        gt=0.0,
+        description="Maximum yearly water requirement of all trees combined",
+    )
+    spacing_sqft_per_tree: float = Field(
+        default=100.0, gt=0.0, description="Square feet allocated per tree"
+    )
+    cost_removal_per_sqft: float = Field(
+        default=10.0, gt=0.0, description="Cost to remove asphalt per square foot"
+    )
+    maintenance_years: int = Field(
+        default=5, gt=0, description="Number of years of maintenance to account for"
+    )
+    species: Optional[List[Species]] = Field(
+        default=None,
+        min_length=1,
+        description="Species that may be planted, all species if omitted",
+    )
+
+
+class RegionRollupParams(BaseModel):
+    """Parameters for converting part of the parking area of every region"""
+
+    region_key: RegionKey = Field(
+        default=RegionKey.DISTRICT,
+        description="Roll up by supervisor 'district' or analysis 'neighborhood'",
+    )
+    percentage: float = Field(
+        default=1.0,
+        ge=0.0,
+        le=1.0,
+        description="Percentage of each region's parking area to convert (0.0 to 1.0)",
+    )
+    species_distribution: Dict[Species, float] = Field(
+        description="Distribution of tree species as {species_name: fraction}, must sum to 1.0"
+    )
+    spacing_sqft_per_tree: float = Field(
+        default=100.0, gt=0.0, description="Square feet allocated per tree"
+    )
+    cost_removal_per_sqft: float = Field(
+        default=10.0, gt=0.0, description="Cost to remove asphalt per square foot"
+    )
+    maintenance_years: int = Field(
+        default=5, gt=0, description="Number of years of maintenance to account for"
+    )
+    regions: Optional[List[str]] = Field(
+        default=None,
+        min_length=1,
+        description="Regions to report, e.g. ['5'] for district 5; all if omitted",
+    )
+    area_types: Optional[List[AreaType]] = Field(
+        default=None,
+        min_length=1,
+        description="Area types whose parking area is converted, all if omitted",
+    )
+
+
+# Items of the ConversionGrid lists; NaN and infinity have no JSON encoding
+FiniteNonNegative = Annotated[float, Field(ge=0.0, allow_inf_nan=False)]
+FinitePositive = Annotated[float, Field(gt=0.0, allow_inf_nan=False)]
+
+
+class ConversionGrid(BaseModel):
+    """Parameter values whose cartesian product forms the scenarios of a sweep"""
+
+    asphalt_sqft: List[FiniteNonNegative] = Field(
+        min_length=1, description="Square feet of asphalt to remove"
+    )
+    species_distributions: List[Dict[Species, float]] = Field(
+        min_length=1, description="Species distributions as {species_name: fraction}"
+    )
+    spacing_sqft_per_tree: List[FinitePositive] = Field(
+        default=[100.0], min_length=1, description="Square feet allocated per tree"
+    )
+    cost_removal_per_sqft: List[FiniteNonNegative] = Field(
+        default=[10.0], min_length=1, description="Cost to remove asphalt per square foot"
+    )
+    maintenance_years: List[Annotated[int, Field(gt=0)]] = Field(
+        default=[5], min_length=1, description="Years of maintenance to account for"
+    )
+
+    @property
+    def size(self) -> int:
+        """Number of scenarios in the product"""
+        return (
+            len(self.asphalt_sqft)
+            * len(self.species_distributions)
+            * len(self.spacing_sqft_per_tree)
+            * len(self.cost_removal_per_sqft)
+            * len(self.maintenance_years)
+        )
+
+
+class ConversionSweepParams(BaseModel):
+    """Many asphalt conversion scenarios, listed or as a parameter grid"""
+
+    scenarios: Optional[List[AsphaltConversionParams]] = Field(
+        default=None, description="Explicit scenarios, evaluated in order"
+    )
+    grid: Optional[ConversionGrid] = Field(
+        default=None,
+        description="Parameter values to combine, ordered like nested loops over "
+        "asphalt_sqft, spacing_sqft_per_tree, cost_removal_per_sqft, "
+        "maintenance_years and species_distributions (fastest)",
+    )
+
+    def to_scenarios(self) -> ConversionScenarios:
+        """
+        Collect the requested scenarios into columns.
+
+        Raises HTTPException unless exactly one of scenarios and grid is given,
+        or when the sweep exceeds SWEEP_MAX_SCENARIOS.
+        """
+        if (self.scenarios is None) == (self.grid is None):
+            raise HTTPException(
+                status_code=422, detail="Give exactly one of scenarios and grid"
+            )
+        size = len(self.scenarios) if self.scenarios is not None else self.grid.size
+        if size > SWEEP_MAX_SCENARIOS:
+            raise HTTPException(
+                status_code=422,
+                detail=f"At most {SWEEP_MAX_SCENARIOS} scenarios per sweep",
+            )
+        if self.scenarios is not None:
+            return scenario_list(self.scenarios)
+        return scenario_grid(
+            self.grid.asphalt_sqft,
+            self.grid.spacing_sqft_per_tree,
+            self.grid.cost_removal_per_sqft,
+            self.grid.maintenance_years,
+            self.grid.species_distributions,
+        )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Load the rectangle datasets once per process, before serving requests.
+
+    Handlers receive them through the get_* dependencies, which return the
+    instances warmed up here.
+    """
+    rectangles = get_rectangle_store()
+    get_spatial_index(rectangles)
+    get_region_rollups(rectangles)
+    get_basemap()
+    yield
+
+
 app = FastAPI(
     title="Forest Vision API",
     description="API for generating and managing tree locations in parking lots",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -93,76 +404,253 @@ app.add_middleware(
 )
 
 
-def load_rectangles_from_path(file_path: Path, area_type: AreaType) -> List[Rectangle]:
+def _select_rectangles(
+    params: TreeScenarioParams,
+    rectangles: RectangleStore,
+    spatial_index: GridIndex,
+    rng: np.random.Generator,
+) -> RectangleStore:
+    """
+    Apply the viewport and sampling parameters of a request to the store.
+
+    Sampling is the first draw from rng, so requests with the same seed
+    select the same rectangles on every endpoint.
     """
-    Load rectangle data from a JSON file and convert to Rectangle objects.
+    viewport = params.viewport()
+    candidates = None
+    if viewport is not None:
+        candidates = spatial_index.query(*viewport)
+        print(f"Found {len(candidates)} rectangles in viewport {viewport}")
+
+    indices = sample_rectangles(
+        rectangles, params.percentage, params.sampling, rng, candidates
+    )
+    # Selections are sorted and unique, so one as long as the store is all of
+    # it; the store is used as is rather than copied
+    if isinstance(indices, slice) or len(indices) == len(rectangles):
+        print(f"Using all {len(rectangles)} rectangles")
+        return rectangles
+    print(f"Using {len(indices)} rectangles after sampling")
+    return rectangles.take(indices)
+
+
+@app.get("/trees/", response_model=List[Tree])
+async def get_trees(
+    request: Request,
+    response: Response,
+    params: TreeQueryParams = Depends(),
+    rectangles: RectangleStore = Depends(get_rectangle_store),
+    spatial_index: GridIndex = Depends(get_spatial_index),
+) -> List[Tree]:
+    """
+    Get tree locations based on predefined parking lot data.
 
     Args:
-        file_path: Path to the JSON file containing rectangle data
-        area_type: Type of area (parking lot or street side)
+        request: Incoming request, used for content negotiation and
+            revalidation.
+        response: Outgoing response, used to attach the ETag.
+        params: Query parameters for tree generation.
+        rectangles: Process-wide rectangle store.
+        spatial_index: Grid index over the rectangle store, used to restrict
+            generation to the requested viewport.
 
     Returns:
-        List of Rectangle objects converted from the JSON data
-    """
-    print(f"Loading data from {file_path.absolute()}")
-    with open(file_path, "r") as f:
-        data = json.load(f)
-    print(f"Loaded {len(data)} rectangles from JSON")
-
-    return [
-        Rectangle(
-            top_right_lat=item["latitude"],
-            top_right_long=item["longitude"],
-            width_meters=item["width"],
-            length_meters=item["length"],
-            area_type=area_type,
-        )
-        for item in data
-    ]
+        List of Tree objects containing the location and type of each tree,
+        a stream of NDJSON Tree lines when streaming was requested, or the
+        compact binary payload for 'Accept: application/vnd.forest-vision.trees'.
+        Seeded requests carry an ETag and are answered with 304 Not Modified
+        when the client already holds the current representation. With
+        dedup_radius_meters, the X-Trees-Removed header counts the trees
+        dropped as too close to another.
+    """
+    print("Received request for trees")
+    print(f"Loaded {len(rectangles)} rectangles")
 
+    viewport = params.viewport()
+    mix = params.species_mix()
+    media_type = negotiate_tree_media_type(
+        request.headers.get("accept", ""), params.stream
+    )
 
-def load_rectangles_from_json() -> List[Rectangle]:
+    # Seeded requests are reproducible, so they can be cached and revalidated
+    cache_key = None
+    headers = {}
+    if params.seed is not None:
+        cache_key = (
+            rectangles.version,
+            params.seed,
+            params.percentage,
+            params.sampling,
+            params.trees_per_square_meter,
+            viewport,
+            None if mix is None else mix.tobytes(),
+            params.placement,
+        )
+        # Cached batches hold the trees before deduplication, shared by every
+        # radius, but each radius is its own representation
+        headers["ETag"] = scenario_etag(
+            (cache_key, params.dedup_radius_meters), media_type
+        )
+        if etag_matches(request.headers.get("if-none-match", ""), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+    # Streams are generated chunk by chunk and never cached, so peak memory
+    # stays bounded. Deduplication needs every tree first, so deduplicated
+    # streams are generated as a whole.
+    dedup = params.dedup_radius_meters is not None
+    chunked = media_type == NDJSON_MEDIA_TYPE and not dedup
+    batch = None
+    if cache_key is not None and not chunked:
+        batch = tree_result_cache.get(cache_key)
+
+    if batch is None:
+        rng = np.random.default_rng(params.seed)
+
+        rectangles = _select_rectangles(params, rectangles, spatial_index, rng)
+
+        if chunked:
+            return stream_trees_ndjson(
+                rectangles,
+                params.trees_per_square_meter,
+                rng,
+                headers,
+                mix,
+                params.placement,
+            )
+
+        batch = generate_tree_batch(
+            rectangles, params.trees_per_square_meter, rng, mix, params.placement
+        )
+        print(f"Generated {len(batch)} trees")
+        if cache_key is not None:
+            tree_result_cache.put(cache_key, batch)
+    else:
+        print(f"Using {len(batch)} cached trees")
+
+    if dedup:
+        batch, removed = deduplicate_trees(batch, params.dedup_radius_meters)
+        print(f"Removed {removed} trees within {params.dedup_radius_meters} m")
+        headers[TREES_REMOVED_HEADER] = str(removed)
+
+    if media_type == NDJSON_MEDIA_TYPE:
+        return stream_batch_ndjson(batch, headers)
+    if media_type == BINARY_MEDIA_TYPE:
+        return binary_trees_response(batch, headers)
+    response.headers.update(headers)
+    return batch.to_trees()
+
+
+@app.get("/trees/aggregate/")
+async def get_tree_aggregate(
+    params: TreeAggregateParams = Depends(),
+    rectangles: RectangleStore = Depends(get_rectangle_store),
+    spatial_index: GridIndex = Depends(get_spatial_index),
+):
     """
-    Load rectangle data from JSON files in the datasets directory.
+    Get tree counts, species mix and CO2 per grid cell, for low zoom levels.
+
+    With the same seed and parameters, the counts match the trees /trees/
+    would return.
+
+    Args:
+        params: Query parameters for tree generation and the grid resolution.
+        rectangles: Process-wide rectangle store.
+        spatial_index: Grid index over the rectangle store.
 
     Returns:
-        List of Rectangle objects converted from the JSON data.
+        Dictionary with the total tree count and one entry per non-empty cell
     """
-    parking_lots_path = Path("./datasets/parking-lot-coordinates.json")
-    street_side_path = Path("./datasets/On_Street_Parking_rectangles.json")
-
-    rectangles = load_rectangles_from_path(parking_lots_path, AreaType.PARKING_LOT)
-    street_side_rectangles = load_rectangles_from_path(
-        street_side_path, AreaType.STREET_SIDE
+    mix = params.species_mix()
+    rng = np.random.default_rng(params.seed)
+    rectangles = _select_rectangles(params, rectangles, spatial_index, rng)
+    return aggregate_trees(
+        rectangles,
+        params.trees_per_square_meter,
+        params.cell_size_degrees,
+        mix,
+        params.placement,
     )
 
-    return rectangles + street_side_rectangles
 
-
-@app.get("/trees/", response_model=List[Tree])
-async def get_trees(params: TreeQueryParams = Depends()) -> List[Tree]:
+@app.get("/trees/tiles/{z}/{x}/{y}.mvt")
+async def get_tree_tile_mvt(
+    z: int = Path(ge=0, le=24),
+    x: int = Path(ge=0),
+    y: int = Path(ge=0),
+    params: TreeTileParams = Depends(),
+    spatial_index: GridIndex = Depends(get_spatial_index),
+) -> Response:
     """
-    Get tree locations based on predefined parking lot data.
+    Get the trees inside one map tile as a Mapbox Vector Tile.
 
     Args:
+        z: Tile zoom level.
+        x: Tile column.
+        y: Tile row (XYZ scheme, origin at the top).
         params: Query parameters for tree generation.
+        spatial_index: Grid index over the rectangle store.
 
     Returns:
-        List of Tree objects containing the location and type of each tree.
+        MVT with a "trees" layer holding one MultiPoint feature per tree type,
+        or 204 No Content below TREE_TILE_MIN_ZOOM.
     """
-    print("Received request for trees")
-    rectangles = load_rectangles_from_json()
-    print(f"Loaded {len(rectangles)} rectangles")
+    if x >= 2**z or y >= 2**z:
+        raise HTTPException(status_code=404, detail="Tile out of range")
+    if z < TREE_TILE_MIN_ZOOM:
+        return Response(status_code=204)
+
+    tile = get_tree_tile(
+        spatial_index,
+        mercantile.Tile(x, y, z),
+        params.percentage,
+        params.trees_per_square_meter,
+        params.seed,
+        params.placement,
+        params.species_mix(),
+    )
+    return Response(content=tile, media_type=MVT_MEDIA_TYPE)
+
+
+@app.get("/basemap/{z}/{x}/{y}.pbf")
+def get_basemap_tile(
+    request: Request,
+    z: int = Path(ge=0, le=24),
+    x: int = Path(ge=0),
+    y: int = Path(ge=0),
+    basemap: Optional[MBTilesReader] = Depends(get_basemap),
+) -> Response:
+    """
+    Get a basemap vector tile straight out of the configured MBTiles file.
+
+    Gzipped tiles are sent as stored with Content-Encoding: gzip, and only
+    decompressed for clients that do not accept gzip.
 
-    # Calculate how many rectangles to sample
-    sample_size = int(len(rectangles) * params.percentage)
-    if sample_size < len(rectangles):
-        rectangles = random.sample(rectangles, sample_size)
-    print(f"Using {len(rectangles)} rectangles after sampling")
+    Args:
+        request: Incoming request, used to check Accept-Encoding.
+        z: Tile zoom level.
+        x: Tile column.
+        y: Tile row (XYZ scheme, origin at the top).
+        basemap: Reader for the MBTiles file, None if no basemap is configured.
+
+    Returns:
+        The tile, or 204 No Content if the file has no tile there.
+    """
+    if basemap is None:
+        raise HTTPException(status_code=404, detail="No basemap configured")
+    if x >= 2**z or y >= 2**z:
+        raise HTTPException(status_code=404, detail="Tile out of range")
+
+    tile = basemap.get_tile(z, x, y)
+    if tile is None:
+        return Response(status_code=204)
 
-    trees = generate_trees_for_rectangles(rectangles, params.trees_per_square_meter)
-    print(f"Generated {len(trees)} trees")
-    return trees
+    headers = {"Cache-Control": "public, max-age=86400", "Vary": "Accept-Encoding"}
+    if is_gzipped(tile):
+        if "gzip" in request.headers.get("accept-encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+        else:
+            tile = gzip.decompress(tile)
+    return Response(content=tile, media_type=MVT_MEDIA_TYPE, headers=headers)
 
 
 @app.post("/asphalt-conversion/")
@@ -185,6 +673,108 @@ async def calculate_asphalt_conversion(params: AsphaltConversionParams):
     )
 
 
+@app.post("/asphalt-conversion/projection/")
+async def project_asphalt_conversion(params: AsphaltConversionProjectionParams):
+    """
+    Project an asphalt conversion year by year as the planted trees grow.
+
+    Args:
+        params: Asphalt conversion parameters and the projection horizon
+
+    Returns:
+        Per-year canopy area, cumulative CO2 sequestered, yearly water demand
+        and cumulative planting and maintenance cost, per species and in
+        total, plus the one-off asphalt removal cost
+    """
+    scenarios = scenario_list([params])
+    return {
+        "asphalt_removal_cost": params.asphalt_sqft * params.cost_removal_per_sqft,
+        **projection_series(scenarios, params.horizon_years),
+    }
+
+
+@app.post("/asphalt-conversion/optimize/")
+async def optimize_asphalt_conversion(params: SpeciesMixOptimizationParams):
+    """
+    Find the species mix that maximizes CO2 reduction within a budget.
+
+    Args:
+        params: Area, budget, optional water cap and cost model parameters
+
+    Returns:
+        Whole tree counts per species, the resulting species distribution,
+        costs, water requirement, CO2 reduction and its LP upper bound, and
+        the constraints that stop further planting
+    """
+    try:
+        return optimize_species_mix(
+            asphalt_sqft=params.asphalt_sqft,
+            budget=params.budget,
+            water_cap=params.water_cap,
+            spacing_sqft_per_tree=params.spacing_sqft_per_tree,
+            cost_removal_per_sqft=params.cost_removal_per_sqft,
+            maintenance_years=params.maintenance_years,
+            species=params.species,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@app.post("/asphalt-conversion/rollup/")
+async def rollup_asphalt_conversion(
+    params: RegionRollupParams,
+    rollups: RegionRollups = Depends(get_region_rollups),
+):
+    """
+    Calculate the impact of converting parking area, per district or neighborhood.
+
+    Answered from per-region area tables precomputed at startup, so the cost
+    does not depend on the number of rectangles or trees.
+
+    Args:
+        params: Region key, share of parking area converted and conversion
+            parameters
+        rollups: Region tables of the rectangle store
+
+    Returns:
+        Parking area, converted area, tree capacity, costs and CO2 reduction
+        per region and in total
+    """
+    try:
+        return rollups.convert(
+            params.region_key,
+            params.percentage,
+            params.species_distribution,
+            spacing_sqft_per_tree=params.spacing_sqft_per_tree,
+            cost_removal_per_sqft=params.cost_removal_per_sqft,
+            maintenance_years=params.maintenance_years,
+            regions=params.regions,
+            area_types=params.area_types,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@app.post("/asphalt-conversion/sweep/")
+def sweep_asphalt_conversion(params: ConversionSweepParams) -> StreamingResponse:
+    """
+    Evaluate many asphalt conversion scenarios in one request.
+
+    Scenarios are evaluated as one NumPy computation per chunk, over a
+    scenarios x species matrix, and streamed back as they are serialized.
+
+    Args:
+        params: Explicit scenarios, or a grid of parameter values
+
+    Returns:
+        NDJSON, one line per scenario with its index, parameters and the
+        results of /asphalt-conversion/
+    """
+    return StreamingResponse(
+        iter_sweep_ndjson(params.to_scenarios()), media_type=NDJSON_MEDIA_TYPE
+    )
+
+
 @app.get("/health")
 async def health_check():
     """
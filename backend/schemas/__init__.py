@@ -2,6 +2,10 @@
 Common schemas and data models for the Forest Vision API.
 """
 
-from .species import Species, SpeciesData, SPECIES_DATA
+from .species import (SPECIES, SPECIES_CODES, SPECIES_DATA, SPECIES_NAMES,
+                      SPECIES_TABLE, Species, SpeciesData, species_codes)
 
-__all__ = ['Species', 'SpeciesData', 'SPECIES_DATA'] 
\ No newline at end of file
+__all__ = [
+    'Species', 'SpeciesData', 'SPECIES_DATA', 'SPECIES', 'SPECIES_CODES',
+    'SPECIES_NAMES', 'SPECIES_TABLE', 'species_codes'
+] 
\ No newline at end of file
@@ -1,5 +1,7 @@
 from enum import Enum
-from typing import Dict, TypedDict
+from typing import Dict, Iterable, List, TypedDict
+
+import numpy as np
 
 
 class Species(str, Enum):
@@ -77,4 +79,28 @@ SPECIES_DATA: Dict[str, SpeciesData] = {
         "max_height": 75,
         "max_crown_spread": 50
     }
-} 
\ No newline at end of file
+} 
+
+
+# Stable small-integer codes for Species, used by uint8 species columns
+SPECIES: List[Species] = list(Species)
+SPECIES_CODES: Dict[Species, int] = {
+    species: code for code, species in enumerate(SPECIES)
+}
+SPECIES_NAMES: List[str] = [species.value for species in SPECIES]
+
+# Attribute table indexed by species code, one float64 field per SpeciesData
+# key: SPECIES_TABLE["co2_per_year"][codes] looks up a whole column of trees
+SPECIES_TABLE: np.ndarray = np.array(
+    [
+        tuple(SPECIES_DATA[species][name] for name in SpeciesData.__annotations__)
+        for species in SPECIES
+    ],
+    dtype=[(name, np.float64) for name in SpeciesData.__annotations__],
+)
+SPECIES_TABLE.flags.writeable = False
+
+
+def species_codes(species: Iterable) -> np.ndarray:
+    """uint8 codes of species given as Species members or their names"""
+    return np.array([SPECIES_CODES[Species(s)] for s in species], dtype=np.uint8)
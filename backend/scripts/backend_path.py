@@ -0,0 +1,15 @@
+"""
+Make the backend packages importable from scripts run as files.
+
+Running `python scripts/ingest.py` only puts backend/scripts on sys.path,
+while tree_generation imports the shared schemas package the way the API
+does. Entry points import this module before their sibling modules.
+"""
+
+import sys
+from pathlib import Path
+
+BACKEND_DIR = str(Path(__file__).resolve().parents[1])
+
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
@@ -1,14 +1,34 @@
+import argparse
+import hashlib
 import sqlite3
 import json
 import mercantile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import chain
 from pathlib import Path
 import sys
+from typing import List, NamedTuple, Optional
 from tqdm import tqdm
 import mapbox_vector_tile
+import mapbox_vector_tile.decoder
+import numpy as np
+import shapely
+import shapely.geometry
 import gzip
 import io
 import os
 
+from parallel import ordered_map
+
+# Number of tiles decoded per worker task when streaming
+DEFAULT_BATCH_TILES = 64
+
+# Fraction of the extent past the tile border that tile generators copy
+# features into (tippecanoe's default buffer is 5/256). Only features this
+# close to the border can also be in a neighbouring tile.
+TILE_BUFFER_FRACTION = 1 / 16
+
 def is_valid_sqlite_db(file_path):
     """Check if the file is a valid SQLite database"""
     if not os.path.exists(file_path):
@@ -100,10 +120,36 @@ def inspect_database(conn):
     except sqlite3.Error as e:
         print(f"Error inspecting database: {e}")
 
-def decode_tile_data(tile_data):
-    """Decode MVT tile data and return GeoJSON features"""
+def _collect_points(coordinates, points):
+    """Append the [x, y] lists of a GeoJSON coordinates tree to points"""
+    if coordinates and isinstance(coordinates[0], (int, float)):
+        points.append(coordinates)
+    else:
+        for part in coordinates:
+            _collect_points(part, points)
+
+def _decode_tile(tile_data, tile=None, layer_filter=None):
+    """
+    Decode MVT tile data into GeoJSON features.
+
+    Layers not in layer_filter are dropped from the parsed protobuf message
+    before any geometry is decoded. If the tile is given, the coordinates of
+    all features are converted from tile pixels to lon/lat in one vectorized
+    step and rounded to 7 decimals (about 1 cm).
+
+    Args:
+        tile_data: MVT tile, optionally gzipped
+        tile: mercantile.Tile (XYZ) the data belongs to, None to keep tile
+            pixel coordinates
+        layer_filter: Layer names to decode, all layers if None
+
+    Returns:
+        (features, on_edge) with on_edge[i] True if feature i comes within
+        TILE_BUFFER_FRACTION of the tile border, so it may continue in or be
+        repeated by a neighbouring tile
+    """
     if not tile_data:
-        return []
+        return [], np.zeros(0, dtype=bool)
     
     # Try to decompress if gzipped
     try:
@@ -113,38 +159,90 @@ def decode_tile_data(tile_data):
         pass  # Data wasn't gzipped
     
     try:
-        tile = mapbox_vector_tile.decode(tile_data)
+        vector_tile = mapbox_vector_tile.decoder.TileData(
+            tile_data, default_options={"y_coord_down": tile is not None}
+        )
+        if layer_filter:
+            layers = vector_tile.tile.layers
+            for i in reversed(range(len(layers))):
+                if layers[i].name not in layer_filter:
+                    del layers[i]
+        # The decoder reports a missing id as 0, tell them apart here
+        has_id = {
+            layer.name: [feature.HasField('id') for feature in layer.features]
+            for layer in vector_tile.tile.layers
+        }
+        decoded = vector_tile.get_message()
     except Exception as e:
         print(f"Failed to decode tile data: {e}")
-        return []
+        return [], np.zeros(0, dtype=bool)
     
     features = []
-    for layer_name, layer in tile.items():
-        for feature in layer['features']:
+    on_edge = []
+    for layer_name, layer in decoded.items():
+        points = []
+        point_feature = []
+        for feature, feature_has_id in zip(layer['features'], has_id[layer_name]):
             # Convert MVT geometry to GeoJSON
             geometry = feature.get('geometry', {})
             properties = feature.get('properties', {})
             properties['layer'] = layer_name
             
-            features.append({
+            count = len(points)
+            _collect_points(geometry.get('coordinates', []), points)
+            point_feature.extend([len(features)] * (len(points) - count))
+            
+            geojson = {
                 "type": "Feature",
                 "geometry": geometry,
                 "properties": properties
-            })
+            }
+            if feature_has_id:
+                geojson["id"] = feature['id']
+            features.append(geojson)
+        
+        layer_edge = np.zeros(len(layer['features']), dtype=bool)
+        if points:
+            pixels = np.array(points, dtype=np.float64)
+            extent = layer['extent']
+            buffer = extent * TILE_BUFFER_FRACTION
+            outside = ((pixels <= buffer) | (pixels >= extent - buffer)).any(axis=1)
+            first = len(features) - len(layer['features'])
+            np.logical_or.at(layer_edge, np.array(point_feature) - first, outside)
+            if tile is not None:
+                lon_lat = _pixels_to_lon_lat(pixels, tile, extent)
+                # Points shared by several rings are the same list, which is
+                # fine: every point was read into pixels before any write
+                for point, (lon, lat) in zip(points, lon_lat.tolist()):
+                    point[0] = lon
+                    point[1] = lat
+        on_edge.append(layer_edge)
     
-    return features
+    return features, np.concatenate(on_edge) if on_edge else np.zeros(0, dtype=bool)
 
-def extract_features_from_mbtiles(mbtiles_path, zoom_level=14, bounds=None, layer_filter=None):
+def _pixels_to_lon_lat(pixels, tile, extent):
+    """Convert (x, y-down) tile pixel coordinates to rounded (lon, lat)"""
+    scale = 1 << tile.z
+    world_x = (tile.x + pixels[:, 0] / extent) / scale
+    world_y = (tile.y + pixels[:, 1] / extent) / scale
+    lon = world_x * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1.0 - 2.0 * world_y))))
+    return np.round(np.column_stack([lon, lat]), 7)
+
+def decode_tile_data(tile_data, tile=None, layer_filter=None):
+    """Decode MVT tile data and return GeoJSON features"""
+    return _decode_tile(tile_data, tile, layer_filter)[0]
+
+def _tile_query(conn, zoom_level, bounds=None):
     """
-    Extract features from MBTiles file at a specific zoom level.
-    bounds: tuple of (min_lon, min_lat, max_lon, max_lat) if you want to limit the area
-    layer_filter: list of layer names to extract (e.g., ['building', 'road'])
+    Build the query selecting (x, TMS row, data) of the tiles to extract.
+
+    Tiles are ordered by column, which FeatureMerger relies on, and which
+    follows the usual MBTiles index so SQLite does not sort the tile data.
+
+    Returns:
+        (query, params), or None if no tile table could be identified
     """
-    conn = sqlite3.connect(mbtiles_path)
-    
-    # First, inspect the database structure
-    inspect_database(conn)
-    
     cursor = conn.cursor()
     
     # Try to find the main tiles table
@@ -179,26 +277,44 @@ def extract_features_from_mbtiles(mbtiles_path, zoom_level=14, bounds=None, laye
     params = [zoom_level]
     
     if bounds:
-        min_tile = mercantile.tile(bounds[0], bounds[1], zoom_level)
-        max_tile = mercantile.tile(bounds[2], bounds[3], zoom_level)
+        # XYZ y grows southwards, MBTiles stores TMS rows which grow northwards
+        north_west = mercantile.tile(bounds[0], bounds[3], zoom_level)
+        south_east = mercantile.tile(bounds[2], bounds[1], zoom_level)
+        max_row = (1 << zoom_level) - 1
         query += f' AND {tile_col} >= ? AND {tile_col} <= ? AND {tile_row} >= ? AND {tile_row} <= ?'
-        params.extend([min_tile.x, max_tile.x, min_tile.y, max_tile.y])
+        params.extend([north_west.x, south_east.x, max_row - south_east.y, max_row - north_west.y])
+    query += f' ORDER BY {tile_col}, {tile_row}'
 
     print(f"\nExecuting query: {query}")
     print(f"With parameters: {params}")
+    return query, params
+
+def extract_features_from_mbtiles(mbtiles_path, zoom_level=14, bounds=None, layer_filter=None):
+    """
+    Extract features from MBTiles file at a specific zoom level.
+    bounds: tuple of (min_lon, min_lat, max_lon, max_lat) if you want to limit the area
+    layer_filter: list of layer names to extract (e.g., ['building', 'road'])
+    """
+    conn = sqlite3.connect(mbtiles_path)
     
-    cursor.execute(query, params)
+    # First, inspect the database structure
+    inspect_database(conn)
     
-    features = []
-    for tile_column, tile_row, tile_data in tqdm(cursor.fetchall(), desc="Processing tiles"):
-        # Decode MVT data
-        tile_features = decode_tile_data(tile_data)
-        
-        # Filter layers if requested
-        if layer_filter:
-            tile_features = [f for f in tile_features if f['properties'].get('layer') in layer_filter]
-        
-        features.extend(tile_features)
+    tile_query = _tile_query(conn, zoom_level, bounds)
+    if tile_query is None:
+        return None
+    
+    cursor = conn.cursor()
+    cursor.execute(*tile_query)
+    
+    merger = FeatureMerger()
+    lines = []
+    for row in tqdm(cursor.fetchall(), desc="Processing tiles"):
+        # Decode MVT data, only the requested layers
+        lines.extend(merger.add(decode_tile_batch([row], zoom_level, layer_filter)))
+    lines.extend(merger.finish())
+    print(f"Dropped {merger.duplicates} duplicate feature parts")
+    features = [json.loads(line) for line in lines]
 
     conn.close()
 
@@ -207,20 +323,229 @@ def extract_features_from_mbtiles(mbtiles_path, zoom_level=14, bounds=None, laye
         "features": features
     }
 
+def _feature_key(feature):
+    """Hash of a feature's layer and geometry, to drop exact duplicates"""
+    text = json.dumps(
+        [feature['properties'].get('layer'), feature['geometry']], separators=(',', ':')
+    )
+    return hashlib.blake2b(text.encode(), digest_size=8).digest()
+
+class TileBatch(NamedTuple):
+    """Decoded features of a batch of tiles"""
+
+    lines: List[str]  # JSON-encoded features
+    keys: List[Optional[bytes]]  # _feature_key of lines near the tile border
+    columns: List[int]  # tile column of each line
+    spanning: List[dict]  # features with an id near the tile border
+    spanning_columns: List[int]  # tile column of each spanning feature
+
+def decode_tile_batch(tiles, zoom_level, layer_filter=None):
+    """
+    Decode a batch of tiles into serialized GeoJSON features.
+
+    Runs in worker processes, so features are serialized here and mostly
+    strings travel back to the parent process. Features with an id near a tile
+    border may be continued in other tiles; they are returned whole to be
+    merged by FeatureMerger. Other features near a border are keyed so
+    FeatureMerger can drop their copies in neighbouring tiles.
+
+    Args:
+        tiles: (tile column, TMS tile row, tile data) rows
+        zoom_level: Zoom level of the tiles
+        layer_filter: Layer names to keep, all layers if None
+
+    Returns:
+        TileBatch of the features in the batch
+    """
+    batch = TileBatch([], [], [], [], [])
+    max_row = (1 << zoom_level) - 1
+    for tile_column, tile_row, tile_data in tiles:
+        tile = mercantile.Tile(tile_column, max_row - tile_row, zoom_level)
+        features, on_edge = _decode_tile(tile_data, tile, layer_filter)
+        for feature, edge in zip(features, on_edge.tolist()):
+            if edge and 'id' in feature:
+                batch.spanning.append(feature)
+                batch.spanning_columns.append(tile_column)
+            else:
+                batch.lines.append(json.dumps(feature))
+                batch.keys.append(_feature_key(feature) if edge else None)
+                batch.columns.append(tile_column)
+    return batch
+
+class FeatureMerger:
+    """
+    Deduplicate features across tiles.
+
+    Tiles must come in column order. A feature near a tile border is dropped if
+    its layer and geometry were already seen in the same or the previous tile
+    column; the keys of older columns are evicted as the columns advance.
+    Features with an id near a tile border are held back and the parts sharing
+    a layer and id are merged into one geometry. A feature continuing into
+    the next column has a part there, so a group is complete, and written,
+    once a whole column has passed without adding to it.
+    """
+
+    def __init__(self):
+        self.seen = {}  # {tile column: keys of its border features}
+        self.spanning = {}  # {(layer, id): parts}
+        self.spanning_column = {}  # {(layer, id): last tile column with a part}
+        self.duplicates = 0
+
+    def add(self, batch):
+        """Yield the JSON lines of a TileBatch that were not seen before"""
+        for line, key, column in zip(batch.lines, batch.keys, batch.columns):
+            if column not in self.seen:
+                self.seen = {c: keys for c, keys in self.seen.items() if c == column - 1}
+                self.seen[column] = set()
+            if key is None:
+                yield line
+                continue
+            seen = key in self.seen[column] or key in self.seen.get(column - 1, ())
+            # Kept for the next column even if seen, the feature is in this one
+            self.seen[column].add(key)
+            if seen:
+                self.duplicates += 1
+                continue
+            yield line
+        for feature, column in zip(batch.spanning, batch.spanning_columns):
+            key = (feature['properties'].get('layer'), feature['id'])
+            self.spanning.setdefault(key, []).append(feature)
+            self.spanning_column[key] = column
+
+        # Columns before the last one of the batch have all been read
+        last_column = max(batch.columns + batch.spanning_columns, default=None)
+        if last_column is not None:
+            done = [
+                key for key, column in self.spanning_column.items()
+                if column < last_column - 1
+            ]
+            yield from self._merge(done)
+
+    def finish(self):
+        """Yield the merged features still held back by add as JSON lines"""
+        yield from self._merge(list(self.spanning))
+
+    def _merge(self, keys):
+        """Yield the merged features of the given spanning groups as JSON lines"""
+        for key in keys:
+            parts = self.spanning.pop(key)
+            del self.spanning_column[key]
+            feature = parts[0]
+            if len(parts) > 1:
+                self.duplicates += len(parts) - 1
+                merged = shapely.union_all(
+                    [shapely.geometry.shape(part['geometry']) for part in parts]
+                )
+                feature['geometry'] = shapely.geometry.mapping(merged)
+            yield json.dumps(feature)
+
+def _fetch_batches(cursor, batch_size):
+    """Yield rows of an executed query batch_size at a time"""
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+def stream_features_from_mbtiles(
+    mbtiles_path,
+    output_path,
+    zoom_level=14,
+    bounds=None,
+    layer_filter=None,
+    output_format="seq",
+    workers=None,
+    batch_size=DEFAULT_BATCH_TILES,
+):
+    """
+    Extract features from an MBTiles file straight to disk.
+
+    Tiles are read batch_size at a time and decoded in a pool of worker
+    processes, at most two batches per worker in flight. Features are written
+    as soon as their batch is decoded, in tile order, so memory use does not
+    grow with the size of the MBTiles file.
+
+    Args:
+        mbtiles_path: MBTiles file to read
+        output_path: File to write
+        zoom_level: Zoom level of the tiles to extract
+        bounds: (min_lon, min_lat, max_lon, max_lat) to limit the area
+        layer_filter: Layer names to extract (e.g., ['building', 'road'])
+        output_format: "seq" for GeoJSONSeq (one Feature per line) or
+            "collection" for a single FeatureCollection
+        workers: Number of worker processes, defaults to the CPU count
+        batch_size: Number of tiles decoded per task
+
+    Returns:
+        Number of features written, or None if the tiles could not be read
+    """
+    workers = workers or os.cpu_count() or 1
+    conn = sqlite3.connect(mbtiles_path)
+    tile_query = _tile_query(conn, zoom_level, bounds)
+    if tile_query is None:
+        conn.close()
+        return None
+    
+    cursor = conn.cursor()
+    cursor.execute(*tile_query)
+    
+    count = 0
+    merger = FeatureMerger()
+    decode = partial(decode_tile_batch, zoom_level=zoom_level, layer_filter=layer_filter)
+    with open(output_path, 'w') as f, ProcessPoolExecutor(max_workers=workers) as executor:
+        if output_format == "collection":
+            f.write('{"type": "FeatureCollection", "features": [\n')
+        
+        batches = ordered_map(
+            executor, decode, _fetch_batches(cursor, batch_size), max_in_flight=2 * workers
+        )
+        progress = tqdm(batches, desc="Processing tile batches")
+        for lines in chain((list(merger.add(batch)) for batch in progress), [list(merger.finish())]):
+            if not lines:
+                continue
+            if output_format == "collection":
+                f.write((",\n" if count else "") + ",\n".join(lines))
+            else:
+                f.write("\n".join(lines) + "\n")
+            count += len(lines)
+        
+        if output_format == "collection":
+            f.write('\n]}\n')
+    
+    conn.close()
+    print(f"Dropped {merger.duplicates} duplicate feature parts")
+    return count
+
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python extract_mbtiles.py <path_to_mbtiles> [zoom_level] [layer1,layer2,...]")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Extract GeoJSON features from an MBTiles file")
+    parser.add_argument("mbtiles_path")
+    parser.add_argument("zoom_level", nargs="?", type=int, default=14)
+    parser.add_argument("layers", nargs="?", help="Comma-separated layer names, e.g. building,road")
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Decode tiles in parallel and write features as they are decoded",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["seq", "collection"],
+        default="seq",
+        help="With --stream: GeoJSONSeq (.geojsons) or a FeatureCollection (.geojson)",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Defaults to the CPU count")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_TILES)
+    parser.add_argument("--output", help="Defaults to the MBTiles path with a GeoJSON suffix")
+    args = parser.parse_args()
 
-    mbtiles_path = sys.argv[1]
+    mbtiles_path = args.mbtiles_path
     
     # Validate the database file first
     if not is_valid_sqlite_db(mbtiles_path):
         print("Database validation failed. Please check if this is a valid MBTiles file.")
         sys.exit(1)
     
-    zoom_level = int(sys.argv[2]) if len(sys.argv) > 2 else 14
-    layer_filter = sys.argv[3].split(',') if len(sys.argv) > 3 else None
+    zoom_level = args.zoom_level
+    layer_filter = args.layers.split(',') if args.layers else None
 
     # San Francisco bounds approximately
     sf_bounds = [-122.5, 37.7, -122.3, 37.9]
@@ -230,10 +555,30 @@ if __name__ == "__main__":
     print(f"Layer filter: {layer_filter}")
     print(f"Bounds: {sf_bounds}")
     
+    if args.stream:
+        suffix = '.geojsons' if args.format == "seq" else '.geojson'
+        output_path = args.output or Path(mbtiles_path).with_suffix(suffix)
+        count = stream_features_from_mbtiles(
+            mbtiles_path,
+            output_path,
+            zoom_level,
+            sf_bounds,
+            layer_filter,
+            output_format=args.format,
+            workers=args.workers,
+            batch_size=args.batch_size,
+        )
+        if count is None:
+            print("\nFailed to extract features from the MBTiles file")
+            sys.exit(1)
+        print(f"\nExtracted {count} features")
+        print(f"Exported GeoJSON to {output_path}")
+        sys.exit(0)
+    
     geojson = extract_features_from_mbtiles(mbtiles_path, zoom_level, sf_bounds, layer_filter)
     
     if geojson:
-        output_path = Path(mbtiles_path).with_suffix('.geojson')
+        output_path = args.output or Path(mbtiles_path).with_suffix('.geojson')
         with open(output_path, 'w') as f:
             json.dump(geojson, f)
         print(f"\nExtracted {len(geojson['features'])} features")
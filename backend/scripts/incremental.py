@@ -0,0 +1,146 @@
+"""
+Per-row content-hash manifests for incremental dataset rebuilds.
+
+A manifest maps the id of every source row to a hash of the columns its
+rectangles are derived from. Comparing it with the hashes of a refreshed CSV
+tells which rows were added, changed or removed, so only those have to be
+reprocessed and patched into the previous output.
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+from rectangle_io import ID_COLUMN, Columns
+
+# Version 2 added the district keys to the hashed columns, version 3 hashes
+# only the columns the rectangles are built from
+MANIFEST_VERSION = 3
+
+
+class RowChanges(NamedTuple):
+    """Row ids that differ between a manifest and the current source"""
+
+    added: np.ndarray
+    changed: np.ndarray
+    removed: np.ndarray
+
+    @property
+    def stale(self) -> np.ndarray:
+        """Rows whose previous rectangles must be dropped"""
+        return np.concatenate([self.changed, self.removed])
+
+    @property
+    def dirty(self) -> np.ndarray:
+        """Rows whose rectangles must be (re)computed"""
+        return np.concatenate([self.added, self.changed])
+
+
+def manifest_path(output: str) -> Path:
+    """Manifest stored next to an output dataset"""
+    return Path(f"{output}.manifest.json")
+
+
+def row_hashes(rows: pd.DataFrame) -> pd.Series:
+    """
+    Hash the content of every row.
+
+    Args:
+        rows: Source rows with ID_COLUMN and the columns the rectangles are
+            built from and tagged with; all but ID_COLUMN are hashed
+
+    Returns:
+        uint64 hash per row, indexed by row id
+    """
+    hashes = pd.util.hash_pandas_object(rows.drop(columns=ID_COLUMN), index=False)
+    return pd.Series(hashes.to_numpy(), index=rows[ID_COLUMN].to_numpy())
+
+
+def load_manifest(output: str, params: Dict) -> Optional[pd.Series]:
+    """
+    Load the manifest of a previous build.
+
+    Args:
+        output: Output dataset the manifest belongs to
+        params: Build parameters of the current run
+
+    Returns:
+        Row hashes of the previous build, or None if there is no usable
+        previous build (no manifest or output, or different parameters)
+    """
+    path = manifest_path(output)
+    if not path.exists() or not Path(output).exists():
+        return None
+    with open(path, "r") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("params") != params:
+        print("Build parameters changed, rebuilding everything")
+        return None
+    rows = manifest["rows"]
+    return pd.Series(
+        np.fromiter(rows.values(), dtype=np.uint64, count=len(rows)),
+        index=np.fromiter(rows.keys(), dtype=np.int64, count=len(rows)),
+    )
+
+
+def save_manifest(output: str, params: Dict, hashes: pd.Series) -> None:
+    """Write the manifest of the current build next to its output."""
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "params": params,
+        "rows": dict(zip(map(str, hashes.index.tolist()), hashes.tolist())),
+    }
+    with open(manifest_path(output), "w") as f:
+        f.write(json.dumps(manifest))
+
+
+def diff_rows(previous: Optional[pd.Series], current: pd.Series) -> RowChanges:
+    """
+    Compare the row hashes of a previous build with the current source.
+
+    Args:
+        previous: Row hashes of the previous build, None for a full build
+        current: Row hashes of the current source
+
+    Returns:
+        Ids of added, changed and removed rows
+    """
+    if previous is None:
+        previous = pd.Series(dtype=np.uint64)
+    ids = current.index.to_numpy()
+    known = current.index.isin(previous.index)
+    same = previous.reindex(ids[known]).to_numpy() == current.to_numpy()[known]
+    return RowChanges(
+        added=ids[~known],
+        changed=ids[known][~same],
+        removed=previous.index[~previous.index.isin(current.index)].to_numpy(),
+    )
+
+
+def patch_columns(
+    previous: Columns, updates: Columns, order: np.ndarray, changes: RowChanges
+) -> Columns:
+    """
+    Replace the rectangles of stale rows with freshly computed ones.
+
+    Args:
+        previous: Rectangle columns of the previous build, with ID_COLUMN
+        updates: Rectangle columns computed for the dirty rows, with ID_COLUMN
+        order: Row ids in source order
+        changes: Row changes between the builds
+
+    Returns:
+        Rectangle columns ordered like the source rows, as a full rebuild
+        would be
+    """
+    keep = ~np.isin(previous[ID_COLUMN], changes.stale)
+    merged = {
+        name: np.concatenate([np.asarray(previous[name])[keep], updates[name]])
+        for name in updates
+    }
+    # Stable sort by source position keeps the rectangles of a row in order
+    position = pd.Index(order).get_indexer(merged[ID_COLUMN])
+    permutation = np.argsort(position, kind="stable")
+    return {name: column[permutation] for name, column in merged.items()}
@@ -0,0 +1,477 @@
+"""
+Chunked, parallel ingestion of parking CSVs into rectangle datasets.
+
+Replaces the per-script pipelines of loader.py, process_street_parking.py and
+extract_lat_long.py with one command:
+
+    python scripts/ingest.py streets datasets/On_Street_Parking.csv
+    python scripts/ingest.py points datasets/Off_street_Parking.csv \\
+        --output datasets/parking-lot-coordinates.npy --width 18 --length 18
+    python scripts/ingest.py combine \\
+        parking_lot=datasets/parking-lot-coordinates.npy \\
+        street_side=datasets/On_Street_Parking_rectangles.npy
+
+CSVs are read in chunks with only the columns each command needs, chunks are
+processed by a pool of worker processes and the results are merged back in
+input order. Rectangles keep the supervisor district and analysis
+neighborhood of their source row when the CSV has them (see
+REGION_KEY_SOURCES). Outputs ending in .npy use the memory-mappable format of
+rectangle_io.py, other outputs are written as JSON. The combine command
+stacks the datasets of every area type into the single file the API maps.
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import backend_path  # noqa: F401  (before the siblings importing schemas)
+import pandas as pd
+from streetside import generate_rectangle_arrays
+from incremental import (diff_rows, load_manifest, patch_columns, row_hashes,
+                         save_manifest)
+from parallel import ordered_map
+from rectangle_io import (AREA_TYPE_COLUMN, DISTRICT_COLUMN, ID_COLUMN,
+                          NEIGHBORHOOD_COLUMN, OPTIONAL_COLUMNS,
+                          RECTANGLE_COLUMNS, Columns, read_rectangles,
+                          write_rectangles)
+from tree_generation import AREA_TYPES, AreaType
+from wkt import linestring_segments, parse_linestrings
+
+DEFAULT_CHUNK_ROWS = 20_000
+
+# Dataset the combine command writes, and the API maps when it is up to date
+DEFAULT_COMBINED_OUTPUT = "datasets/rectangles.npy"
+
+# Value of the region key columns for rectangles of datasets without them
+UNKNOWN_REGION_KEYS = {DISTRICT_COLUMN: 0, NEIGHBORHOOD_COLUMN: ""}
+
+# Source columns holding the district keys of a row, and the rectangle
+# column each is stored in
+REGION_KEY_SOURCES = {
+    "DISTRICT": DISTRICT_COLUMN,  # On_Street_Parking.csv
+    "supervisor_district": DISTRICT_COLUMN,  # Off_street_Parking.csv
+    "analysis_neighborhood": NEIGHBORHOOD_COLUMN,  # Off_street_Parking.csv
+}
+
+
+def region_key_columns(csv_path: str) -> List[str]:
+    """Columns of REGION_KEY_SOURCES present in the header of a CSV"""
+    header = pd.read_csv(csv_path, nrows=0).columns
+    return [column for column in REGION_KEY_SOURCES if column in header]
+
+
+def row_tags(chunk: pd.DataFrame) -> Columns:
+    """
+    Values every rectangle inherits from its source row.
+
+    Args:
+        chunk: Source rows, with any of ID_COLUMN and REGION_KEY_SOURCES
+
+    Returns:
+        One array per tag column the chunk has, one entry per row. Unknown
+        districts are 0 and unknown neighborhoods "".
+    """
+    tags = {}
+    if ID_COLUMN in chunk:
+        tags[ID_COLUMN] = chunk[ID_COLUMN].to_numpy(dtype=np.int64)
+    for source, name in REGION_KEY_SOURCES.items():
+        if source not in chunk:
+            continue
+        values = chunk[source]
+        if name == DISTRICT_COLUMN:
+            values = pd.to_numeric(values, errors="coerce").fillna(0)
+            tags[name] = values.to_numpy(dtype=OPTIONAL_COLUMNS[name])
+        else:
+            tags[name] = values.fillna("").to_numpy(dtype=str)
+    return tags
+
+
+def process_street_chunk(
+    chunk: pd.DataFrame,
+    offset_meters: float,
+    width_meters: float,
+    min_spaces: Optional[float],
+    first_segment_only: bool,
+) -> Columns:
+    """
+    Turn a chunk of street parking rows into street-side rectangles.
+
+    Args:
+        chunk: Rows with a "shape" LINESTRING column, plus "PRKG_SPLY" when
+            min_spaces is given; rectangles are tagged with the row_tags of
+            their source row
+        offset_meters: Offset distance from the street centerline in meters
+        width_meters: Width of the rectangles in meters
+        min_spaces: Skip segments with fewer parking spaces than this
+        first_segment_only: Only use the first segment of each LINESTRING
+
+    Returns:
+        Rectangle columns, two rectangles per street segment
+    """
+    shapes = chunk["shape"]
+    if min_spaces is not None:
+        shapes = shapes.where(chunk["PRKG_SPLY"].fillna(0) >= min_spaces)
+
+    # WKT coordinates are (longitude, latitude)
+    segments = linestring_segments(parse_linestrings(shapes), first_segment_only)
+    columns = generate_rectangle_arrays(
+        segments.start[:, 1],
+        segments.start[:, 0],
+        segments.end[:, 1],
+        segments.end[:, 0],
+        offset_meters=offset_meters,
+        width_meters=width_meters,
+    )
+    # Two rectangles per segment
+    for name, values in row_tags(chunk).items():
+        columns[name] = np.repeat(values[segments.feature], 2)
+    return columns
+
+
+def process_point_chunk(
+    chunk: pd.DataFrame,
+    lat_column: str,
+    lon_column: str,
+    width_meters: float,
+    length_meters: float,
+) -> Columns:
+    """
+    Turn a chunk of rows with point coordinates into fixed-size rectangles.
+
+    Args:
+        chunk: Rows with latitude and longitude columns; rectangles are
+            tagged with the row_tags of their source row
+        lat_column: Name of the latitude column
+        lon_column: Name of the longitude column
+        width_meters: Width of every rectangle in meters
+        length_meters: Length of every rectangle in meters
+
+    Returns:
+        Rectangle columns, one rectangle per row with both coordinates
+    """
+    located = chunk[[lat_column, lon_column]].notna().all(axis=1).to_numpy()
+    points = chunk[located]
+    columns = {
+        "latitude": points[lat_column].to_numpy(dtype=np.float64),
+        "longitude": points[lon_column].to_numpy(dtype=np.float64),
+        "width": np.full(len(points), width_meters, dtype=np.float64),
+        "length": np.full(len(points), length_meters, dtype=np.float64),
+    }
+    for name, values in row_tags(chunk).items():
+        columns[name] = values[located]
+    return columns
+
+
+def _find_column(header: List[str], suffixes: List[str]) -> Optional[str]:
+    """First column whose lowercased name ends with one of the suffixes,
+    falling back to the first one containing it"""
+    names = [col.lower() for col in header]
+    for matches in (str.endswith, str.__contains__):
+        for col, name in zip(header, names):
+            if any(matches(name, suffix) for suffix in suffixes):
+                return col
+    return None
+
+
+def find_point_columns(csv_path: str) -> List[str]:
+    """
+    Detect the latitude and longitude columns of a CSV from its header.
+
+    Names ending in "lat"/"latitude" and "long"/"longitude" win over names
+    merely containing them, so e.g. MAIN_ENTRANCE_LAT is preferred to LATE_FEE.
+    """
+    header = list(pd.read_csv(csv_path, nrows=0).columns)
+    lat_column = _find_column(header, ["latitude", "lat"])
+    lon_column = _find_column(header, ["longitude", "long", "lon"])
+    if lat_column is None or lon_column is None:
+        raise ValueError("No latitude/longitude columns found in the CSV file.")
+    return [lat_column, lon_column]
+
+
+def ingest_csv(
+    csv_path: str,
+    process_chunk: Callable[[pd.DataFrame], Columns],
+    usecols: List[str],
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    workers: Optional[int] = None,
+) -> Columns:
+    """
+    Read a CSV in chunks and process the chunks in a pool of worker processes.
+
+    Args:
+        csv_path: CSV file to ingest
+        process_chunk: Picklable function turning a DataFrame chunk into
+            rectangle columns
+        usecols: Columns to read; all others are skipped while parsing
+        chunk_rows: Number of rows per chunk
+        workers: Number of worker processes, defaults to the CPU count
+
+    Returns:
+        Rectangle columns of all chunks, in input order
+    """
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    rows = 0
+
+    def counted(chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        nonlocal rows
+        for chunk in chunks:
+            rows += len(chunk)
+            yield chunk
+
+    chunks = pd.read_csv(csv_path, usecols=usecols, chunksize=chunk_rows)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(
+            ordered_map(
+                executor, process_chunk, counted(chunks), max_in_flight=2 * workers
+            )
+        )
+
+    merged = concatenate_columns(results)
+    elapsed = time.perf_counter() - start
+    print(
+        f"Ingested {rows} rows into {len(merged['latitude'])} rectangles "
+        f"in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/sec, "
+        f"{workers} workers)"
+    )
+    return merged
+
+
+def ingest_csv_incremental(
+    csv_path: str,
+    output: str,
+    process_chunk: Callable[[pd.DataFrame], Columns],
+    usecols: List[str],
+    params: Dict,
+) -> None:
+    """
+    Rebuild a street dataset, reprocessing only rows that changed.
+
+    Rows are hashed on the columns process_chunk reads, and compared with the
+    manifest of the previous build. Columns that do not change the output,
+    like the data_as_of stamp of every export, are not read and so do not
+    mark rows as changed. Rectangles of unchanged rows are kept from the
+    previous output; added and changed rows are processed and removed rows
+    dropped. Without a usable previous build every row is processed.
+
+    Args:
+        csv_path: CSV file to ingest, with ID_COLUMN and usecols
+        output: Dataset to patch, its manifest is stored next to it
+        process_chunk: Function turning a DataFrame of rows into rectangle
+            columns tagged with ID_COLUMN
+        usecols: Columns process_chunk reads, the ones rows are hashed on
+        params: Build parameters; a change forces a full rebuild
+    """
+    start = time.perf_counter()
+    rows = pd.read_csv(csv_path, usecols=[ID_COLUMN, *usecols])
+    hashes = row_hashes(rows)
+    previous = load_manifest(output, params)
+    changes = diff_rows(previous, hashes)
+
+    if previous is not None and not (len(changes.dirty) or len(changes.removed)):
+        print(f"No rows changed since the last build, {output} is up to date")
+        return
+
+    dirty = rows[rows[ID_COLUMN].isin(changes.dirty)]
+    updates = process_chunk(dirty)
+    if previous is not None:
+        updates = patch_columns(
+            read_rectangles(output), updates, rows[ID_COLUMN].to_numpy(), changes
+        )
+
+    write_rectangles(updates, output)
+    save_manifest(output, params, hashes)
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"Incremental build of {len(rows)} rows: {len(changes.added)} added, "
+        f"{len(changes.changed)} changed, {len(changes.removed)} removed; "
+        f"{len(updates['latitude'])} rectangles in {elapsed:.2f}s"
+    )
+    print(f"Output written to: {output}")
+
+
+def concatenate_columns(results: List[Columns]) -> Columns:
+    """Stack the rectangle columns of several chunks, in order."""
+    if not results:
+        return {name: np.empty(0, dtype=np.float64) for name in RECTANGLE_COLUMNS}
+    return {
+        name: np.concatenate([result[name] for result in results])
+        for name in results[0]
+    }
+
+
+def combine_datasets(datasets: List[Tuple[AreaType, str]]) -> Columns:
+    """
+    Stack rectangle datasets into one, tagging rows with their area type.
+
+    Args:
+        datasets: (area type, dataset path) pairs, in row order
+
+    Returns:
+        Rectangle columns with AREA_TYPE_COLUMN and the region keys of any
+        dataset; rows of datasets without a region key get its unknown value.
+        Source row ids are dropped, they are only unique within a dataset.
+    """
+    parts = [read_rectangles(path) for _, path in datasets]
+    region_keys = [
+        name for name in UNKNOWN_REGION_KEYS if any(name in part for part in parts)
+    ]
+    results = []
+    for (area_type, _), part in zip(datasets, parts):
+        num_rows = len(part["latitude"])
+        columns = {name: part[name] for name in RECTANGLE_COLUMNS}
+        code = AREA_TYPES.index(area_type)
+        columns[AREA_TYPE_COLUMN] = np.full(
+            num_rows, code, dtype=OPTIONAL_COLUMNS[AREA_TYPE_COLUMN]
+        )
+        for name in region_keys:
+            columns[name] = (
+                part[name]
+                if name in part
+                else np.full(num_rows, UNKNOWN_REGION_KEYS[name])
+            )
+        results.append(columns)
+    return concatenate_columns(results)
+
+
+def _area_type_dataset(argument: str) -> Tuple[AreaType, str]:
+    """Parse an AREA_TYPE=PATH command line argument"""
+    area_type, _, path = argument.partition("=")
+    try:
+        return AreaType(area_type), path
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"expected AREA_TYPE=PATH with AREA_TYPE one of "
+            f"{', '.join(AREA_TYPES)}, got {argument!r}"
+        )
+
+
+def write_output(columns: Columns, output: str) -> None:
+    """Write rectangle columns in the format selected by the output suffix."""
+    write_rectangles(columns, output)
+    print(f"Output written to: {output}")
+
+
+def main(argv: Optional[List[str]] = None):
+    """Parse command line arguments and run the requested ingestion."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Defaults to the CPU count"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    streets = commands.add_parser(
+        "streets", help="Street-side rectangles from LINESTRING street segments"
+    )
+    streets.add_argument("csv_path")
+    streets.add_argument(
+        "--output",
+        help="A .npy path writes the memory-mappable binary format, any other "
+        "path JSON. Defaults to <csv_path without extension>_rectangles.npy",
+    )
+    streets.add_argument("--offset", type=float, default=1.0)
+    streets.add_argument("--width", type=float, default=1.0)
+    streets.add_argument(
+        "--min-spaces",
+        type=float,
+        default=None,
+        help="Skip segments with fewer parking spaces (PRKG_SPLY) than this",
+    )
+    streets.add_argument(
+        "--first-segment-only",
+        action="store_true",
+        help="Only use the first segment of each LINESTRING, like loader.py",
+    )
+    streets.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only reprocess rows added, changed or removed since the last "
+        "--incremental build, tracked in <output>.manifest.json",
+    )
+
+    points = commands.add_parser(
+        "points", help="Fixed-size rectangles from latitude/longitude columns"
+    )
+    points.add_argument("csv_path")
+    points.add_argument(
+        "--output",
+        help="A .npy path writes the memory-mappable binary format, any other "
+        "path JSON. Defaults to <csv_path without extension>_rectangles.npy",
+    )
+    points.add_argument("--width", type=float, default=1.0)
+    points.add_argument("--length", type=float, default=2.0)
+    points.add_argument("--lat-column", help="Detected from the header if omitted")
+    points.add_argument("--lon-column", help="Detected from the header if omitted")
+
+    combine = commands.add_parser(
+        "combine",
+        help="One memory-mappable dataset from the datasets of each area type",
+    )
+    combine.add_argument(
+        "datasets",
+        nargs="+",
+        type=_area_type_dataset,
+        metavar="AREA_TYPE=PATH",
+        help="e.g. parking_lot=datasets/parking-lot-coordinates.npy",
+    )
+    combine.add_argument("--output", default=DEFAULT_COMBINED_OUTPUT)
+
+    args = parser.parse_args(argv)
+    if args.command == "combine":
+        write_output(combine_datasets(args.datasets), args.output)
+        return
+    output = args.output or args.csv_path.rsplit(".", 1)[0] + "_rectangles.npy"
+
+    if args.command == "streets":
+        usecols = ["shape"] + (["PRKG_SPLY"] if args.min_spaces is not None else [])
+        usecols += region_key_columns(args.csv_path)
+        process_chunk = partial(
+            process_street_chunk,
+            offset_meters=args.offset,
+            width_meters=args.width,
+            min_spaces=args.min_spaces,
+            first_segment_only=args.first_segment_only,
+        )
+        if args.incremental:
+            params = {
+                "offset": args.offset,
+                "width": args.width,
+                "min_spaces": args.min_spaces,
+                "first_segment_only": args.first_segment_only,
+            }
+            ingest_csv_incremental(
+                args.csv_path, output, process_chunk, usecols, params
+            )
+            return
+    else:
+        usecols = find_point_columns(args.csv_path)
+        lat_column = args.lat_column or usecols[0]
+        lon_column = args.lon_column or usecols[1]
+        usecols = [lat_column, lon_column, *region_key_columns(args.csv_path)]
+        process_chunk = partial(
+            process_point_chunk,
+            lat_column=lat_column,
+            lon_column=lon_column,
+            width_meters=args.width,
+            length_meters=args.length,
+        )
+
+    columns = ingest_csv(
+        args.csv_path, process_chunk, usecols, args.chunk_rows, args.workers
+    )
+    write_output(columns, output)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except FileNotFoundError as e:
+        print(f"Error: Could not find CSV file: {e.filename}")
+        sys.exit(1)
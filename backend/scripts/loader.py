@@ -1,13 +1,14 @@
 """Functions for loading and processing street data."""
 
-import csv
 import json
-import re
 import sys
 from typing import Dict, List, Tuple
 
-from streetside import Coordinate, generate_rectangles
+import backend_path  # noqa: F401  (before the siblings importing schemas)
+import pandas as pd
+from streetside import Coordinate, generate_rectangle_arrays
 from tree_generation import AreaType, Rectangle
+from wkt import Segments, linestring_segments, parse_linestrings
 
 
 def parse_street_coordinates(csv_path: str) -> List[Tuple[Coordinate, Coordinate]]:
@@ -20,28 +21,21 @@ def parse_street_coordinates(csv_path: str) -> List[Tuple[Coordinate, Coordinate
     Returns:
         List of coordinate pairs (start point, end point) for each street segment
     """
-    coordinate_pairs = []
+    segments = _first_segments(csv_path)
 
-    with open(csv_path, "r") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            # Extract coordinates from LINESTRING
-            linestring = row["shape"]
-            coords_match = re.findall(r"-?\d+\.\d+", linestring)
-            if (
-                len(coords_match) >= 4
-            ):  # Ensure we have at least 2 points (4 coordinates)
-                # Convert coordinates to floats
-                coords = [float(x) for x in coords_match]
-
-                # Create Coordinate objects for start and end points
-                # Note: CSV has (longitude, latitude) format
-                coord1 = Coordinate(lat=coords[1], lon=coords[0])
-                coord2 = Coordinate(lat=coords[3], lon=coords[2])
+    # Note: CSV has (longitude, latitude) format
+    return [
+        (Coordinate(lat=lat1, lon=lon1), Coordinate(lat=lat2, lon=lon2))
+        for (lon1, lat1), (lon2, lat2) in zip(
+            segments.start.tolist(), segments.end.tolist()
+        )
+    ]
 
-                coordinate_pairs.append((coord1, coord2))
 
-    return coordinate_pairs
+def _first_segments(csv_path: str) -> Segments:
+    """First segment of every street LINESTRING in the CSV, parsed in bulk."""
+    shapes = pd.read_csv(csv_path, usecols=["shape"])["shape"]
+    return linestring_segments(parse_linestrings(shapes), first_segment_only=True)
 
 
 def generate_street_rectangles(
@@ -58,21 +52,33 @@ def generate_street_rectangles(
     Returns:
         List of Rectangle objects representing areas along the streets
     """
-    coordinate_pairs = parse_street_coordinates(csv_path)
-    rectangles = []
-
-    for coord1, coord2 in coordinate_pairs:
-        # Generate two rectangles for each street segment
-        rect1, rect2 = generate_rectangles(
-            coord1=coord1,
-            coord2=coord2,
-            offset_meters=offset_meters,
-            width_meters=width_meters,
+    segments = _first_segments(csv_path)
+
+    # Generate two rectangles for each street segment, all segments at once
+    columns = generate_rectangle_arrays(
+        segments.start[:, 1],
+        segments.start[:, 0],
+        segments.end[:, 1],
+        segments.end[:, 0],
+        offset_meters=offset_meters,
+        width_meters=width_meters,
+    )
+
+    return [
+        Rectangle(
+            top_right_lat=lat,
+            top_right_long=lon,
+            width_meters=width,
+            length_meters=length,
             area_type=AreaType.STREET_SIDE,
         )
-        rectangles.extend([rect1, rect2])
-
-    return rectangles
+        for lat, lon, width, length in zip(
+            columns["latitude"].tolist(),
+            columns["longitude"].tolist(),
+            columns["width"].tolist(),
+            columns["length"].tolist(),
+        )
+    ]
 
 
 def _rectangle_to_dict(rectangle: Rectangle) -> Dict:
@@ -88,7 +94,7 @@ def _rectangle_to_dict(rectangle: Rectangle) -> Dict:
 def main():
     """Process CSV file from command line argument and output rectangles as JSON."""
     if len(sys.argv) != 2:
-        print("Usage: python -m scripts.loader <csv_file_path>")
+        print("Usage: python scripts/loader.py <csv_file_path>")
         sys.exit(1)
 
     csv_path = sys.argv[1]
@@ -0,0 +1,27 @@
+"""
+Helpers shared by the preprocessing scripts that fan work out to a pool of
+worker processes.
+"""
+
+from collections import deque
+from concurrent.futures import Executor
+from typing import Callable, Iterable, Iterator
+
+
+def ordered_map(
+    executor: Executor,
+    fn: Callable,
+    items: Iterable,
+    max_in_flight: int,
+) -> Iterator:
+    """
+    Like executor.map, but keeps at most max_in_flight items submitted at once,
+    so a large input is never read into memory ahead of the workers.
+    """
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= max_in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
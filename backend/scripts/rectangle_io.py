@@ -0,0 +1,205 @@
+"""
+Reading and writing rectangle datasets.
+
+Datasets are stored either as a JSON list of records or as a .npy file
+holding a structured array with one fixed-width record per rectangle:
+
+    field         dtype
+    latitude      <f8     top-right corner
+    longitude     <f8     top-right corner
+    width         <f8     meters
+    length        <f8     meters
+    objectid      <i8     source row, only in incrementally built datasets
+    area_type     <u1     AREA_TYPES code, only in combined datasets
+    district      <i2     supervisor district, 0 if unknown (optional)
+    neighborhood  <i2     analysis neighborhood code, -1 if unknown (optional)
+
+Neighborhood codes index the sorted neighborhood names, stored in a small
+JSON sidecar next to the .npy file (see neighborhoods_path). Outside .npy
+files, neighborhood columns hold the names themselves, "" if unknown.
+
+A .npy dataset is opened with np.load(mmap_mode="r"): nothing is parsed at
+startup and every process serving the same file shares its page cache.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple, Union
+
+import numpy as np
+
+Columns = Dict[str, np.ndarray]
+
+RECTANGLE_COLUMNS = ("latitude", "longitude", "width", "length")
+
+# Optional column tagging each rectangle with the source row it came from
+ID_COLUMN = "objectid"
+
+# Optional column holding the area type code of each rectangle, in datasets
+# that stack several area types
+AREA_TYPE_COLUMN = "area_type"
+
+# Optional columns locating each rectangle in the city's districts
+DISTRICT_COLUMN = "district"
+NEIGHBORHOOD_COLUMN = "neighborhood"
+
+# Layout of the optional columns, in record order
+OPTIONAL_COLUMNS: Dict[str, str] = {
+    ID_COLUMN: "<i8",
+    AREA_TYPE_COLUMN: "<u1",
+    DISTRICT_COLUMN: "<i2",
+    NEIGHBORHOOD_COLUMN: "<i2",
+}
+
+NPY_SUFFIX = ".npy"
+
+
+def rectangle_dtype(optional: Iterable[str] = ()) -> np.dtype:
+    """Record layout of .npy rectangle datasets with the given optional columns"""
+    optional = set(optional)
+    fields = [(name, "<f8") for name in RECTANGLE_COLUMNS]
+    fields += [
+        (name, dtype) for name, dtype in OPTIONAL_COLUMNS.items() if name in optional
+    ]
+    return np.dtype(fields)
+
+
+def neighborhoods_path(path: Union[str, Path]) -> Path:
+    """Sidecar holding the neighborhood names of a .npy dataset"""
+    return Path(f"{path}.neighborhoods.json")
+
+
+def encode_neighborhoods(names: np.ndarray) -> Tuple[np.ndarray, List[str]]:
+    """
+    Encode neighborhood names as codes into their sorted unique names.
+
+    Args:
+        names: Neighborhood name per rectangle, "" if unknown
+
+    Returns:
+        (codes, neighborhoods) with codes -1 for unknown neighborhoods
+    """
+    neighborhoods, codes = np.unique(np.asarray(names, dtype=str), return_inverse=True)
+    neighborhoods = neighborhoods.tolist()
+    codes = codes.ravel().astype(OPTIONAL_COLUMNS[NEIGHBORHOOD_COLUMN])
+    if neighborhoods and neighborhoods[0] == "":
+        # "" sorts first and marks unknown neighborhoods
+        neighborhoods.pop(0)
+        codes -= 1
+    return codes, neighborhoods
+
+
+def columns_to_records(columns: Columns) -> List[Dict]:
+    """Rectangle columns as a list of JSON-ready records."""
+    names = [
+        name for name in (*RECTANGLE_COLUMNS, *OPTIONAL_COLUMNS) if name in columns
+    ]
+    return [
+        dict(zip(names, values))
+        for values in zip(*(columns[name].tolist() for name in names))
+    ]
+
+
+def write_rectangles(columns: Columns, path: Union[str, Path]) -> None:
+    """
+    Write rectangle columns to a dataset file.
+
+    The file is written next to the target and renamed over it, so processes
+    that have the previous version memory-mapped keep reading intact data.
+
+    Args:
+        columns: Rectangle columns, optionally with OPTIONAL_COLUMNS, with
+            neighborhood names
+        path: Output file; a .npy suffix selects the binary format, anything
+            else a compact JSON list of records
+    """
+    path = Path(path)
+    partial_path = path.with_name(f".{path.name}.partial")
+    if path.suffix == NPY_SUFFIX:
+        records = np.empty(
+            len(columns["latitude"]), dtype=rectangle_dtype(columns)
+        )
+        for name in records.dtype.names:
+            if name != NEIGHBORHOOD_COLUMN:
+                records[name] = columns[name]
+        if NEIGHBORHOOD_COLUMN in columns:
+            codes, neighborhoods = encode_neighborhoods(columns[NEIGHBORHOOD_COLUMN])
+            records[NEIGHBORHOOD_COLUMN] = codes
+            sidecar = neighborhoods_path(path)
+            partial_sidecar = sidecar.with_name(f".{sidecar.name}.partial")
+            partial_sidecar.write_text(json.dumps(neighborhoods))
+            os.replace(partial_sidecar, sidecar)
+        with open(partial_path, "wb") as f:
+            np.save(f, records, allow_pickle=False)
+    else:
+        with open(partial_path, "w") as f:
+            # json.dumps uses the C encoder, json.dump does not
+            f.write(json.dumps(columns_to_records(columns)))
+    os.replace(partial_path, path)
+
+
+def read_rectangle_codes(path: Union[str, Path]) -> Tuple[Columns, List[str]]:
+    """
+    Read a dataset file with its neighborhoods as codes.
+
+    Args:
+        path: .npy or JSON dataset written by write_rectangles (or the older
+            scripts)
+
+    Returns:
+        (columns, neighborhoods): rectangle columns plus the OPTIONAL_COLUMNS
+        the dataset has, with neighborhood codes into the neighborhoods list.
+        Columns of a .npy dataset are read-only views into the memory-mapped
+        file.
+    """
+    path = Path(path)
+    if path.suffix == NPY_SUFFIX:
+        records = np.load(path, mmap_mode="r", allow_pickle=False)
+        columns = {name: records[name] for name in records.dtype.names}
+        if NEIGHBORHOOD_COLUMN not in columns:
+            return columns, []
+        if columns[NEIGHBORHOOD_COLUMN].dtype.kind == "U":
+            # Written before neighborhoods were stored as codes
+            codes, neighborhoods = encode_neighborhoods(columns[NEIGHBORHOOD_COLUMN])
+            columns[NEIGHBORHOOD_COLUMN] = codes
+            return columns, neighborhoods
+        return columns, json.loads(neighborhoods_path(path).read_text())
+
+    with open(path, "r") as f:
+        data = json.load(f)
+    dtypes = {name: "<f8" for name in RECTANGLE_COLUMNS}
+    if data:
+        dtypes.update(
+            (name, dtype) for name, dtype in OPTIONAL_COLUMNS.items() if name in data[0]
+        )
+    dtypes.pop(NEIGHBORHOOD_COLUMN, None)
+    columns = {
+        name: np.array([item[name] for item in data], dtype=dtype)
+        for name, dtype in dtypes.items()
+    }
+    if not data or NEIGHBORHOOD_COLUMN not in data[0]:
+        return columns, []
+    names = [item[NEIGHBORHOOD_COLUMN] for item in data]
+    columns[NEIGHBORHOOD_COLUMN], neighborhoods = encode_neighborhoods(names)
+    return columns, neighborhoods
+
+
+def read_rectangles(path: Union[str, Path]) -> Columns:
+    """
+    Read a dataset file written by write_rectangles (or the older scripts).
+
+    Args:
+        path: .npy or JSON dataset
+
+    Returns:
+        Rectangle columns, plus the OPTIONAL_COLUMNS the dataset has, with
+        neighborhood names. Other columns of a .npy dataset are read-only
+        views into the memory-mapped file.
+    """
+    columns, neighborhoods = read_rectangle_codes(path)
+    if NEIGHBORHOOD_COLUMN in columns:
+        # The trailing "" names the unknown (-1) code
+        names = np.array([*neighborhoods, ""])
+        columns[NEIGHBORHOOD_COLUMN] = names[columns[NEIGHBORHOOD_COLUMN]]
+    return columns
@@ -1,22 +1,16 @@
 # Generate lat and long for tree locations
 
-import random
 from enum import Enum
-from typing import List, Tuple
+from typing import List, Optional, Protocol, Sequence, Tuple, Union
 
 import numpy as np
 from pydantic import BaseModel
+from schemas.species import SPECIES, SPECIES_TABLE, Species
 
-
-class TreeType(str, Enum):
-    """Types of trees that can be planted"""
-
-    OAK = "coast_live_oak"
-    PINE = "monterey_pine"
-    REDWOOD = "redwood"
-    BUCKEYE = "california_buckeye"
-    SYCAMORE = "western_sycamore"
-    PLANE = "london_plane"
+# Tree types are the species of the shared registry; batches store their
+# uint8 species codes
+TreeType = Species
+TREE_TYPES: List[Species] = SPECIES
 
 
 class AreaType(str, Enum):
@@ -29,6 +23,27 @@ class AreaType(str, Enum):
     STREET_SIDE = "street_side"
 
 
+# Stable small-integer codes for AreaType, used by columnar rectangle stores
+AREA_TYPES: List[AreaType] = list(AreaType)
+
+METERS_PER_FOOT = 0.3048
+
+# Cells and trees deduplicate_trees handles at a time, bound its temporary
+# arrays
+DEDUP_BLOCK_CELLS = 1 << 16
+DEDUP_BLOCK_TREES = 1 << 20
+
+# Cells per axis of the deduplication grid at most, so cell keys fit in int64
+MAX_DEDUP_CELLS_PER_AXIS = 1 << 24
+
+
+class TreePlacement(str, Enum):
+    """How trees are positioned inside their rectangle"""
+
+    UNIFORM = "uniform"  # independent uniform positions, crowns may overlap
+    CROWN_SPACING = "crown_spacing"  # jittered grid, crowns never overlap
+
+
 class Rectangle(BaseModel):
     """Represents a rectangular area defined by its top-right corner and dimensions"""
 
@@ -39,6 +54,16 @@ class Rectangle(BaseModel):
     area_type: AreaType  # Type of area being converted
 
 
+class RectangleColumns(Protocol):
+    """Column-oriented view of many rectangles, one array entry per rectangle"""
+
+    top_right_lat: np.ndarray
+    top_right_long: np.ndarray
+    width_meters: np.ndarray
+    length_meters: np.ndarray
+    area_type: np.ndarray  # uint8 codes indexing AREA_TYPES
+
+
 class Tree(BaseModel):
     """Represents a tree with its location and type"""
 
@@ -47,6 +72,181 @@ class Tree(BaseModel):
     tree_type: TreeType
 
 
+class TreeBatch:
+    """
+    Columnar batch of generated trees.
+
+    tree_type holds uint8 species codes indexing SPECIES (and SPECIES_TABLE).
+    """
+
+    def __init__(
+        self, latitude: np.ndarray, longitude: np.ndarray, tree_type: np.ndarray
+    ):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.tree_type = tree_type
+
+    def __len__(self) -> int:
+        return len(self.latitude)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the column arrays, in bytes"""
+        return self.latitude.nbytes + self.longitude.nbytes + self.tree_type.nbytes
+
+    def to_trees(self) -> List[Tree]:
+        """Materialize the batch as a list of Tree objects."""
+        return [
+            Tree.model_construct(
+                latitude=lat, longitude=long, tree_type=SPECIES[code]
+            )
+            for lat, long, code in zip(
+                self.latitude.tolist(),
+                self.longitude.tolist(),
+                self.tree_type.tolist(),
+            )
+        ]
+
+    def take(self, indices: Union[np.ndarray, slice]) -> "TreeBatch":
+        """Select a subset of trees by index, boolean mask or slice."""
+        return TreeBatch(
+            self.latitude[indices], self.longitude[indices], self.tree_type[indices]
+        )
+
+    @classmethod
+    def concatenate(cls, batches: Sequence["TreeBatch"]) -> "TreeBatch":
+        """Stack several batches into one, preserving order."""
+        if not batches:
+            return cls.empty()
+        return cls(
+            np.concatenate([batch.latitude for batch in batches]),
+            np.concatenate([batch.longitude for batch in batches]),
+            np.concatenate([batch.tree_type for batch in batches]),
+        )
+
+    @classmethod
+    def empty(cls) -> "TreeBatch":
+        """Create a batch without any trees."""
+        return cls(
+            np.empty(0, dtype=np.float64),
+            np.empty(0, dtype=np.float64),
+            np.empty(0, dtype=np.uint8),
+        )
+
+
+# Random streams of a tree, one per kind of draw (see RectangleRandom)
+_START_STREAM, _SOUTH_STREAM, _WEST_STREAM, _SPECIES_STREAM = range(4)
+_NUM_STREAMS = 4
+
+# Increment of the SplitMix64 counter, 2**64 / golden ratio
+_GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+
+
+def _counter_step(steps: int) -> np.uint64:
+    """Counter increment of the given number of steps, modulo 2**64"""
+    return np.uint64(steps * _GOLDEN_GAMMA % 2**64)
+
+
+# Numbers RectangleRandom hashes at a time, small enough to stay in cache
+_RANDOM_BLOCK = 1 << 14
+
+
+def _mix64(x: np.ndarray, shifted: Optional[np.ndarray] = None) -> np.ndarray:
+    """SplitMix64 finalizer, scrambling the uint64 array x in place"""
+    if shifted is None:
+        shifted = np.empty_like(x)
+    x ^= np.right_shift(x, np.uint64(30), out=shifted)
+    x *= np.uint64(0xBF58476D1CE4E5B9)
+    x ^= np.right_shift(x, np.uint64(27), out=shifted)
+    x *= np.uint64(0x94D049BB133111EB)
+    x ^= np.right_shift(x, np.uint64(31), out=shifted)
+    return x
+
+
+class RectangleRandom:
+    """
+    Counter-based random numbers keyed by rectangle.
+
+    Each rectangle gets a SplitMix64 state hashed from the seed and its key,
+    and each draw of a tree hashes that state with the tree's rank in the
+    rectangle and the kind of draw. Nothing is consumed from a shared
+    stream, so the trees of a rectangle depend only on the seed and its key,
+    not on the rectangles generated along with it or how they are chunked.
+    """
+
+    def __init__(self, seed: int, keys: np.ndarray):
+        """
+        Args:
+            seed: Random seed, a non-negative int below 2**64
+            keys: Key of each rectangle, e.g. its row in the store
+        """
+        seed_state = _mix64(np.array([seed], dtype=np.uint64))
+        self.states = _mix64(np.asarray(keys, dtype=np.uint64) * _counter_step(1))
+        self.states += seed_state
+
+    @classmethod
+    def from_generator(
+        cls, rng: np.random.Generator, num_rectangles: int
+    ) -> "RectangleRandom":
+        """Key rectangles by position, seeded with one draw from rng."""
+        seed = int(rng.integers(0, np.iinfo(np.int64).max))
+        return cls(seed, np.arange(num_rectangles))
+
+    def take(self, indices: Union[np.ndarray, slice]) -> "RectangleRandom":
+        """Select the states of a subset of rectangles, keeping their keys."""
+        subset = RectangleRandom.__new__(RectangleRandom)
+        subset.states = self.states[indices]
+        return subset
+
+    def tree_states(self, counts: np.ndarray) -> np.ndarray:
+        """
+        State of each tree, from its rectangle's state and rank.
+
+        Args:
+            counts: Trees of each rectangle, stored contiguously in
+                rectangle order
+
+        Returns:
+            uint64 state of each tree; the first tree of a rectangle shares
+            the rectangle's state
+        """
+        step = _counter_step(_NUM_STREAMS)
+        # Rank is the tree's position minus the position of its first tree
+        first = (np.cumsum(counts) - counts).astype(np.uint64)
+        states = np.arange(int(counts.sum()), dtype=np.uint64)
+        states *= step
+        states += np.repeat(self.states - first * step, counts)
+        return states
+
+    @staticmethod
+    def uniforms(
+        states: np.ndarray, stream: int, out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        One uniform number in [0, 1) per state, for one kind of draw.
+
+        Args:
+            states: Rectangle or tree states
+            stream: Kind of draw, distinct draws of a state use distinct streams
+            out: Float64 array to write the numbers into
+
+        Returns:
+            The uniform numbers
+        """
+        if out is None:
+            out = np.empty(len(states))
+        step = _counter_step(stream + 1)
+        x = np.empty(min(len(states), _RANDOM_BLOCK), dtype=np.uint64)
+        shifted = np.empty_like(x)
+        for start in range(0, len(states), _RANDOM_BLOCK):
+            block = states[start : start + _RANDOM_BLOCK]
+            bits = np.add(block, step, out=x[: len(block)])
+            _mix64(bits, shifted[: len(block)])
+            bits >>= np.uint64(11)
+            np.multiply(bits, 2.0**-53, out=out[start : start + len(block)])
+        return out
+
+
 def _meters_to_lat_long_conversion(latitude: float) -> Tuple[float, float]:
     """
     Convert meters to approximate latitude and longitude differences at a given latitude
@@ -64,74 +264,512 @@ def _meters_to_lat_long_conversion(latitude: float) -> Tuple[float, float]:
     return meters_to_lat, meters_to_long
 
 
-def _generate_tree_locations(
-    rectangle: Rectangle, trees_per_square_meter: float
-) -> List[Tree]:
+def _rectangle_columns(
+    rectangles: Union[List[Rectangle], RectangleColumns],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
     """
-    Generate tree locations within a rectangle using uniform density
+    Return (top_right_lat, top_right_long, width_meters, length_meters) arrays
+    for either a list of Rectangle objects or a columnar rectangle store
+    """
+    if isinstance(rectangles, list):
+        return (
+            np.array([rect.top_right_lat for rect in rectangles], dtype=np.float64),
+            np.array([rect.top_right_long for rect in rectangles], dtype=np.float64),
+            np.array([rect.width_meters for rect in rectangles], dtype=np.float64),
+            np.array([rect.length_meters for rect in rectangles], dtype=np.float64),
+        )
+    return (
+        rectangles.top_right_lat,
+        rectangles.top_right_long,
+        rectangles.width_meters,
+        rectangles.length_meters,
+    )
+
+
+def _area_type_codes(
+    rectangles: Union[List[Rectangle], RectangleColumns],
+) -> np.ndarray:
+    """uint8 AREA_TYPES code of each rectangle"""
+    if isinstance(rectangles, list):
+        return np.array(
+            [AREA_TYPES.index(rect.area_type) for rect in rectangles], dtype=np.uint8
+        )
+    return rectangles.area_type
+
+
+def draw_species(
+    draws: np.ndarray, species_mix: np.ndarray, area_type: np.ndarray
+) -> np.ndarray:
+    """
+    Draw the species of every tree in one categorical draw.
+
+    The uniform number of each tree is looked up in the cumulative
+    distribution of its area type's row of species_mix.
 
     Args:
-        rectangle: Rectangle defining the area
+        draws: Uniform number in [0, 1) of each tree
+        species_mix: (area types, species) matrix of species fractions, one
+            row with a positive sum per AREA_TYPES code
+        area_type: AREA_TYPES code of the rectangle of each tree
+
+    Returns:
+        uint8 species code of each tree
+    """
+    num_trees = len(area_type)
+    cdf = np.cumsum(species_mix, axis=1)
+    cdf /= cdf[:, -1:]
+    if (species_mix == species_mix[0]).all():
+        return np.searchsorted(cdf[0], draws, side="right").astype(np.uint8)
+
+    # A tree gets the first species whose cumulative fraction exceeds its draw
+    codes = np.zeros(num_trees, dtype=np.uint8)
+    for column in cdf[:, :-1].T:
+        codes += draws >= column[area_type]
+    return codes
+
+
+def tree_counts(
+    width_meters: np.ndarray, length_meters: np.ndarray, trees_per_square_meter: float
+) -> np.ndarray:
+    """
+    Number of trees to plant in each rectangle at the given density
+
+    Every rectangle gets at least one tree. Counts are rounded rather than
+    truncated to avoid truncation bias.
+    """
+    area = width_meters * length_meters
+    return np.maximum(1, np.rint(area * trees_per_square_meter)).astype(np.int64)
+
+
+def crown_spacing(
+    area_type: np.ndarray, species_mix: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Minimum distance between trees of each rectangle, in meters.
+
+    Two crowns do not overlap when their trees are at least the mean of their
+    crown spreads apart, so the widest crown the area type's mix can draw is
+    enough for every pair of species planted there.
+
+    Args:
+        area_type: AREA_TYPES code of each rectangle
+        species_mix: Species fractions per area type (see draw_species),
+            None for uniformly drawn species
+
+    Returns:
+        Spacing of each rectangle
+    """
+    crowns = SPECIES_TABLE["max_crown_spread"] * METERS_PER_FOOT
+    if species_mix is None:
+        return np.full(len(area_type), crowns.max())
+    widest = np.where(species_mix > 0, crowns, 0.0).max(axis=1)
+    return widest[area_type]
+
+
+def crown_grid(
+    width_meters: np.ndarray, length_meters: np.ndarray, spacing: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (columns, rows) of the grid of spacing-sized cells fitting each rectangle
+
+    A side shorter than the spacing still holds one row or column of cells.
+    """
+    columns = np.maximum(1, np.floor(width_meters / spacing)).astype(np.int64)
+    rows = np.maximum(1, np.floor(length_meters / spacing)).astype(np.int64)
+    return columns, rows
+
+
+def planted_tree_counts(
+    rectangles: Union[List[Rectangle], RectangleColumns],
+    trees_per_square_meter: float,
+    placement: TreePlacement = TreePlacement.UNIFORM,
+    species_mix: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Number of trees generate_tree_batch plants in each rectangle.
+
+    With crown spacing, the density's count is capped by the cells of the
+    rectangle's crown grid, one tree per cell.
+
+    Args:
+        rectangles: Rectangles to populate with trees
         trees_per_square_meter: Density of trees (trees per square meter)
+        placement: How trees are positioned inside their rectangle
+        species_mix: Species fractions per area type, None for uniform
+
+    Returns:
+        int64 tree count of each rectangle
     """
-    # Get conversion factors for the rectangle's latitude
-    meters_to_lat, meters_to_long = _meters_to_lat_long_conversion(
-        rectangle.top_right_lat
-    )
+    _, _, widths, lengths = _rectangle_columns(rectangles)
+    counts = tree_counts(widths, lengths, trees_per_square_meter)
+    if placement == TreePlacement.CROWN_SPACING:
+        spacing = crown_spacing(_area_type_codes(rectangles), species_mix)
+        columns, rows = crown_grid(widths, lengths, spacing)
+        counts = np.minimum(counts, columns * rows)
+    return counts
+
+
+def _crown_grid_offsets(
+    random: RectangleRandom,
+    tree_states: np.ndarray,
+    rect_index: np.ndarray,
+    counts: np.ndarray,
+    widths: np.ndarray,
+    lengths: np.ndarray,
+    spacing: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Offsets west and south of the top-right corner, in meters, of trees
+    placed on each rectangle's crown grid.
 
-    # Calculate number of trees based on area and density
-    area = rectangle.width_meters * rectangle.length_meters
-    # Use round instead of int to avoid truncation bias
-    num_trees = max(1, round(area * trees_per_square_meter))
+    The n trees of a rectangle take n evenly strided cells of its grid in
+    row-major order, from a random start, so no cell holds two trees. Each
+    tree is then jittered around its cell center by at most the cell's slack
+    over the spacing, which keeps trees in different cells at least the
+    spacing apart along one axis.
 
-    # Generate random positions within the rectangle
-    random_widths = np.random.uniform(0, rectangle.width_meters, num_trees)
-    random_lengths = np.random.uniform(0, rectangle.length_meters, num_trees)
+    Per-rectangle values are gathered into one reused per-tree buffer, since
+    allocating fresh arrays costs more than the arithmetic at millions of
+    trees.
 
-    # Randomly select tree types for each tree
-    tree_types = random.choices(list(TreeType), k=num_trees)
+    Args:
+        random: Random states of the rectangles
+        tree_states: Random state of each tree (see RectangleRandom)
+        rect_index: Rectangle of each tree, trees of a rectangle contiguous
+        counts: Trees of each rectangle, at most its number of cells
+        widths: Width of each rectangle in meters
+        lengths: Length of each rectangle in meters
+        spacing: Minimum distance between trees of each rectangle, in meters
+
+    Returns:
+        (west, south) offset of each tree
+    """
+    columns, rows = crown_grid(widths, lengths, spacing)
+    cells = columns * rows
+    num_trees = len(rect_index)
+    buffer = np.empty(num_trees)
+
+    def per_tree(values: np.ndarray) -> np.ndarray:
+        return np.take(values, rect_index, out=buffer, mode="clip")
+
+    # Cell of each tree: its rank among the trees of its rectangle, shifted
+    # by the rectangle's random start and scaled by the stride
+    first = np.cumsum(counts) - counts
+    cell = np.arange(num_trees, dtype=np.float64)
+    cell += per_tree(random.uniforms(random.states, _START_STREAM) - first)
+    cell *= per_tree(cells / counts)
+    np.floor(cell, out=cell)
+    # A start rounded up to 1.0 would push the last tree off the grid
+    np.minimum(cell, per_tree((cells - 1).astype(np.float64)), out=cell)
+
+    # Split the row-major cell into its row (south) and column (cell)
+    tree_columns = per_tree(columns.astype(np.float64))
+    south = np.floor(cell / tree_columns)
+    cell -= np.multiply(south, tree_columns, out=buffer)
+
+    cell_width = widths / columns
+    west = random.uniforms(tree_states, _WEST_STREAM)
+    west -= 0.5
+    west *= per_tree(np.maximum(cell_width - spacing, 0.0))
+    cell += 0.5
+    cell *= per_tree(cell_width)
+    west += cell
+
+    cell_length = lengths / rows
+    south += 0.5
+    south *= per_tree(cell_length)
+    jitter = random.uniforms(tree_states, _SOUTH_STREAM, out=cell)
+    jitter -= 0.5
+    jitter *= per_tree(np.maximum(cell_length - spacing, 0.0))
+    south += jitter
+    return west, south
+
+
+def generate_tree_batch(
+    rectangles: Union[List[Rectangle], RectangleColumns],
+    trees_per_square_meter: float,
+    rng: Optional[Union[np.random.Generator, RectangleRandom]] = None,
+    species_mix: Optional[np.ndarray] = None,
+    placement: TreePlacement = TreePlacement.UNIFORM,
+) -> TreeBatch:
+    """
+    Generate tree locations for all rectangles at once using uniform density
 
-    # Convert to lat/long coordinates
-    tree_locations = []
-    for w, l, tree_type in zip(random_widths, random_lengths, tree_types):
-        # Convert meters to lat/long differences
-        lat_diff = l * meters_to_lat
-        long_diff = w * meters_to_long
+    Per-rectangle tree counts are expanded into a rectangle index per tree,
+    so every coordinate and tree type is drawn in a handful of array
+    operations regardless of the number of rectangles. Draws are derived per
+    rectangle and tree (see RectangleRandom), so generating rectangles in
+    chunks with the matching states gives the same trees as all at once.
 
-        # Calculate final coordinates (note: subtract from top_right_lat since we're going south)
-        tree_lat = rectangle.top_right_lat - lat_diff
-        tree_long = rectangle.top_right_long - long_diff
+    Args:
+        rectangles: Rectangles to populate with trees
+        trees_per_square_meter: Density of trees (trees per square meter)
+        rng: States of the rectangles, or a generator keying them by
+            position from one draw; a fresh generator if not given
+        species_mix: Species fractions per area type (see draw_species),
+            None for uniformly drawn species
+        placement: How trees are positioned inside their rectangle; crown
+            spacing drops the trees that do not fit (see planted_tree_counts)
+
+    Returns:
+        TreeBatch with the trees of each rectangle stored contiguously, in
+        rectangle order
+    """
+    lats, longs, widths, lengths = _rectangle_columns(rectangles)
+    if isinstance(rng, RectangleRandom):
+        random = rng
+    else:
+        if rng is None:
+            rng = np.random.default_rng()
+        random = RectangleRandom.from_generator(rng, len(lats))
+    if len(lats) == 0 or trees_per_square_meter == 0:
+        return TreeBatch.empty()
+
+    counts = planted_tree_counts(
+        rectangles, trees_per_square_meter, placement, species_mix
+    )
+    rect_index = np.repeat(np.arange(len(counts)), counts)
+    tree_states = random.tree_states(counts)
 
-        tree_locations.append(
-            Tree(latitude=tree_lat, longitude=tree_long, tree_type=tree_type)
+    # Get conversion factors for each rectangle's latitude
+    meters_to_lat, meters_to_long = _meters_to_lat_long_conversion(lats)
+
+    # Offsets south and west of the top-right corner, in degrees
+    if placement == TreePlacement.CROWN_SPACING:
+        spacing = crown_spacing(_area_type_codes(rectangles), species_mix)
+        long_diff, lat_diff = _crown_grid_offsets(
+            random, tree_states, rect_index, counts, widths, lengths, spacing
         )
+        lat_diff *= meters_to_lat
+    else:
+        lat_diff = random.uniforms(tree_states, _SOUTH_STREAM)
+        lat_diff *= lengths[rect_index]
+        lat_diff *= meters_to_lat
+        long_diff = random.uniforms(tree_states, _WEST_STREAM)
+        long_diff *= widths[rect_index]
+    long_diff *= meters_to_long[rect_index]
+
+    # Note: subtract from the top-right corner since we're going south and west
+    latitude = lats[rect_index] - lat_diff
+    longitude = longs[rect_index] - long_diff
+
+    draws = random.uniforms(tree_states, _SPECIES_STREAM)
+    if species_mix is None:
+        tree_type = (draws * len(SPECIES)).astype(np.uint8)
+    else:
+        area_type = _area_type_codes(rectangles)[rect_index]
+        tree_type = draw_species(draws, species_mix, area_type)
+
+    return TreeBatch(latitude, longitude, tree_type)
+
+
+def _expand_ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Positions start, ..., end - 1 of each [start, end) range, concatenated"""
+    lengths = ends - starts
+    offsets = np.cumsum(lengths) - lengths
+    positions = np.arange(int(lengths.sum()), dtype=np.int64)
+    positions += np.repeat(starts - offsets, lengths)
+    return positions
+
+
+def _distinct(values: np.ndarray, scratch: np.ndarray) -> np.ndarray:
+    """
+    Values without repeats, in no particular order, in time linear in values.
+
+    scratch holds one int32 per possible value; its content does not matter.
+    """
+    index = np.arange(len(values), dtype=np.int32)
+    scratch[values] = index
+    return values[scratch[values] == index]
 
-    return tree_locations
+
+def _range_blocks(lengths: np.ndarray) -> List[slice]:
+    """Split ranges into runs of about DEDUP_BLOCK_TREES positions each"""
+    block = (np.cumsum(lengths) - lengths) // DEDUP_BLOCK_TREES
+    bounds = [0, *(np.flatnonzero(np.diff(block)) + 1).tolist(), len(lengths)]
+    return [slice(lo, hi) for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+
+def deduplicate_trees(
+    batch: TreeBatch, radius_meters: float
+) -> Tuple[TreeBatch, int]:
+    """
+    Drop trees closer than a radius to a tree that is kept.
+
+    Overlapping rectangles, like the street-side rectangles meeting at
+    corners and intersections, double up trees where they overlap. Trees are
+    kept greedily in batch order: a tree survives unless an earlier
+    surviving tree is within the radius.
+
+    Trees are sorted by square cell at least one radius wide, then batch
+    order, so a tree's close neighbors lie in its own or one of the 8
+    surrounding cells. Every round keeps the first undecided tree of each
+    cell that comes before the first undecided trees of the cells around
+    it, and drops every tree within the radius of it in one pass over those
+    cells. Kept trees are a radius apart, so a cell one radius wide holds at
+    most 4 of them: each cell is passed over a bounded number of times
+    however many trees it holds, and only cells next to a change are looked
+    at again.
+
+    Positions are projected to meters around the batch's mean latitude,
+    which is accurate to well under a percent across a city.
+
+    Args:
+        batch: Trees to deduplicate
+        radius_meters: Minimum distance between kept trees
+
+    Returns:
+        (kept trees in batch order, number of trees removed)
+    """
+    num_trees = len(batch)
+    if num_trees < 2:
+        return batch, 0
+
+    meters_to_lat, meters_to_long = _meters_to_lat_long_conversion(
+        batch.latitude.mean()
+    )
+    x = batch.longitude / meters_to_long
+    y = batch.latitude / meters_to_lat
+    x -= x.min()
+    y -= y.min()
+    # Wider cells for tiny radii keep the cell keys within int64
+    cell_size = max(radius_meters, max(x.max(), y.max()) / MAX_DEDUP_CELLS_PER_AXIS)
+    # A spare row and column on each side keep the neighbor offsets below
+    # from wrapping into the next column
+    height = int(y.max() // cell_size) + 3
+    keys = (x // cell_size).astype(np.int64) + 1
+    keys *= height
+    keys += (y // cell_size).astype(np.int64) + 1
+
+    # Trees sorted by cell, in batch order within each cell; positions below
+    # index this order
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    starts = np.flatnonzero(np.diff(keys, prepend=-1))
+    ends = np.append(starts[1:], num_trees)
+    cells = keys[starts]
+    del keys
+    num_cells = len(cells)
+    x, y = x[order], y[order]
+    # The 3 x 3 cells around each cell; missing ones point at the empty cell
+    # num_cells, which never has an undecided tree
+    around = np.full((num_cells, 9), num_cells, dtype=np.int32)
+    around[:, 4] = np.arange(num_cells)
+    # Cells of the same column are next to each other in key order
+    below = np.flatnonzero(cells[1:] == cells[:-1] + 1)
+    around[below + 1, 3] = below
+    around[below, 5] = below + 1
+    for shift in (0, 1, 2, 6, 7, 8):
+        column, row = divmod(shift, 3)
+        neighbor = cells + (column - 1) * height + row - 1
+        found = np.minimum(np.searchsorted(cells, neighbor), num_cells - 1)
+        around[:, shift] = np.where(cells[found] == neighbor, found, num_cells)
+    del cells, below, neighbor, found
+
+    # Position of the first undecided tree of each cell, its end once done,
+    # and that tree, num_trees once done
+    head = starts.copy()
+    first = np.append(order[starts], num_trees)
+    decided = np.zeros(num_trees, dtype=bool)
+    keep = np.zeros(num_trees, dtype=bool)
+    scratch = np.empty(num_cells + 1, dtype=np.int32)
+    check = np.arange(num_cells, dtype=np.int32)
+    while len(check):
+        around_changed = []
+        # Blocks bound the temporary arrays; a later block sees the decisions
+        # of the earlier ones, as a sequential pass would
+        for block in range(0, len(check), DEDUP_BLOCK_CELLS):
+            block_cells = check[block : block + DEDUP_BLOCK_CELLS]
+            tree = first[block_cells]
+            # Earlier blocks may have decided every tree of a cell
+            ready = tree <= first[around[block_cells]].min(axis=1)
+            ready &= tree < num_trees
+            ready_cells = block_cells[ready]
+            keep[tree[ready]] = True
+            kept = head[ready_cells]
+
+            # Drop the trees around each kept tree within the radius; no
+            # other kept tree is that close and every undecided one is later
+            source = np.repeat(kept, 9)
+            target = around[ready_cells].ravel()
+            present = target < num_cells
+            source, target = source[present], target[present]
+            for part in _range_blocks(ends[target] - head[target]):
+                lo, hi = head[target[part]], ends[target[part]]
+                positions = _expand_ranges(lo, hi)
+                center = np.repeat(source[part], hi - lo)
+                dx = x[positions] - x[center]
+                dy = y[positions] - y[center]
+                close = dx * dx + dy * dy < radius_meters * radius_meters
+                decided[positions[close]] = True
+            decided[kept] = True
+
+            # Move the cells around kept trees to their next undecided tree
+            changed = _distinct(target, scratch)
+            changed = changed[head[changed] < ends[changed]]
+            for part in _range_blocks(ends[changed] - head[changed]):
+                lo, hi = head[changed[part]], ends[changed[part]]
+                positions = _expand_ranges(lo, hi)
+                undecided = np.where(decided[positions], num_trees, positions)
+                head[changed[part]] = np.minimum.reduceat(
+                    undecided, np.cumsum(hi - lo) - (hi - lo)
+                )
+            done = changed[head[changed] == num_trees]
+            head[done] = ends[done]
+            first[changed] = order[np.minimum(head[changed], num_trees - 1)]
+            first[done] = num_trees
+            around_changed.append(_distinct(around[changed].ravel(), scratch))
+
+        # Only cells next to a changed cell can have become ready
+        check = _distinct(np.concatenate(around_changed), scratch)
+        check = check[first[check] < num_trees]
+    return batch.take(keep), num_trees - int(np.count_nonzero(keep))
+
+
+def _generate_tree_locations(
+    rectangle: Rectangle, trees_per_square_meter: float
+) -> List[Tree]:
+    """
+    Generate tree locations within a rectangle using uniform density
+
+    Args:
+        rectangle: Rectangle defining the area
+        trees_per_square_meter: Density of trees (trees per square meter)
+    """
+    return generate_tree_batch([rectangle], trees_per_square_meter).to_trees()
 
 
 def generate_trees_for_rectangles(
-    rectangles: List[Rectangle], trees_per_square_meter: float
+    rectangles: Union[List[Rectangle], RectangleColumns],
+    trees_per_square_meter: float,
+    rng: Optional[np.random.Generator] = None,
 ) -> List[Tree]:
     """
     Generate tree locations for multiple rectangles
 
+    Compatibility wrapper around generate_tree_batch for callers that need
+    Tree objects; prefer the columnar batch for large outputs.
+
     Args:
-        rectangles: List of rectangles to populate with trees
+        rectangles: Rectangles to populate with trees, either as a list of
+            Rectangle objects or as a columnar store (see RectangleColumns)
         trees_per_square_meter: Density of trees (trees per square meter), defaults to 1.0
+        rng: Random generator to draw from, pass a seeded one for reproducible trees
     """
     # Early return if density is 0
     if trees_per_square_meter == 0:
         return []
 
+    _, _, widths, lengths = _rectangle_columns(rectangles)
+
     print(f"\nGenerating trees with density: {trees_per_square_meter} trees/m²")
-    total_area = sum(rect.width_meters * rect.length_meters for rect in rectangles)
+    total_area = float(np.sum(widths * lengths))
     expected_trees = round(total_area * trees_per_square_meter)
     print(f"Total area: {total_area}m², Expected trees: {expected_trees}")
 
-    all_trees = []
-    for rectangle in rectangles:
-        trees = _generate_tree_locations(rectangle, trees_per_square_meter)
-        all_trees.extend(trees)
+    all_trees = generate_tree_batch(
+        rectangles, trees_per_square_meter, rng
+    ).to_trees()
 
     print(f"Actually generated {len(all_trees)} trees\n")
     return all_trees
@@ -0,0 +1,92 @@
+"""Bulk parsing of WKT geometries into flat coordinate arrays."""
+
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+
+class RaggedCoordinates(NamedTuple):
+    """
+    Coordinates of many features stored back to back.
+
+    Feature i owns rows offsets[i]:offsets[i + 1] of coords. Features that are
+    missing or not LINESTRINGs have no rows.
+    """
+
+    coords: np.ndarray  # (num_points, 2) as (longitude, latitude), WKT order
+    offsets: np.ndarray  # (num_features + 1,) start row of each feature
+
+    @property
+    def counts(self) -> np.ndarray:
+        """Number of points in each feature"""
+        return np.diff(self.offsets)
+
+
+class Segments(NamedTuple):
+    """Consecutive point pairs of ragged LINESTRINGs"""
+
+    start: np.ndarray  # (num_segments, 2) as (longitude, latitude)
+    end: np.ndarray  # (num_segments, 2)
+    feature: np.ndarray  # index of the feature each segment belongs to
+
+
+def parse_linestrings(shapes: pd.Series) -> RaggedCoordinates:
+    """
+    Parse a column of WKT LINESTRINGs into ragged coordinate arrays.
+
+    The coordinate text of all rows is joined and parsed by NumPy in a single
+    call, so no per-row Python objects are created.
+
+    Args:
+        shapes: WKT strings such as "LINESTRING (-122.49 37.78, -122.48 37.78)";
+            missing values and other geometry types yield empty features
+
+    Returns:
+        RaggedCoordinates with one feature per row, in row order
+    """
+    shapes = shapes.fillna("").astype(str)
+    is_linestring = shapes.str.match(r"\s*LINESTRING\s*\(")
+    bodies = (
+        shapes.where(is_linestring, "")
+        .str.replace(r"^\s*LINESTRING\s*\(|\)\s*$", "", regex=True)
+        .str.strip()
+    )
+    counts = np.where(bodies.str.len() > 0, bodies.str.count(",") + 1, 0)
+
+    text = " ".join(bodies.str.replace(",", " ", regex=False))
+    values = np.fromstring(text, sep=" ") if text.strip() else np.empty(0)
+    if len(values) != 2 * counts.sum():
+        raise ValueError("LINESTRING coordinates must be 2D (x y) pairs")
+
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return RaggedCoordinates(coords=values.reshape(-1, 2), offsets=offsets)
+
+
+def linestring_segments(
+    linestrings: RaggedCoordinates, first_segment_only: bool = False
+) -> Segments:
+    """
+    Every consecutive segment of every feature, in feature order.
+
+    Args:
+        linestrings: Parsed LINESTRINGs
+        first_segment_only: Only keep the first segment of each feature
+
+    Returns:
+        Segments with their start and end points and owning feature
+    """
+    counts = linestrings.counts
+    point_feature = np.repeat(np.arange(len(counts)), counts)
+
+    # A segment starts at every point followed by a point of the same feature
+    starts = np.flatnonzero(point_feature[:-1] == point_feature[1:])
+    if first_segment_only:
+        starts = starts[np.isin(starts, linestrings.offsets[:-1])]
+
+    return Segments(
+        start=linestrings.coords[starts],
+        end=linestrings.coords[starts + 1],
+        feature=point_feature[starts],
+    )
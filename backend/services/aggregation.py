@@ -0,0 +1,102 @@
+from typing import Dict, Optional
+
+import numpy as np
+from schemas.species import SPECIES, SPECIES_NAMES, SPECIES_TABLE
+from scripts.tree_generation import (AREA_TYPES, TreePlacement,
+                                     planted_tree_counts)
+from services.rectangle_store import RectangleStore
+
+# Without a species mix, tree types are drawn uniformly, so each one gets an
+# equal share of trees
+_UNIFORM_MIX = np.full((len(AREA_TYPES), len(SPECIES)), 1.0 / len(SPECIES))
+
+
+def aggregate_trees(
+    rectangles: RectangleStore,
+    trees_per_square_meter: float,
+    cell_size_degrees: float,
+    species_mix: Optional[np.ndarray] = None,
+    placement: TreePlacement = TreePlacement.UNIFORM,
+) -> Dict:
+    """
+    Count the trees that would be generated for each cell of a square grid.
+
+    Rectangles are binned by their centroid on a grid anchored at (0, 0), so
+    cells line up across requests. Each rectangle contributes the exact
+    number of trees generation would place in it, which makes the cost
+    proportional to the number of rectangles, not trees.
+
+    Args:
+        rectangles: Rectangles to aggregate
+        trees_per_square_meter: Density of trees (trees per square meter)
+        cell_size_degrees: Width and height of a grid cell in degrees
+        species_mix: Species fractions per area type used for generation
+            (see draw_species), None for uniformly drawn species
+        placement: How trees are positioned inside their rectangle, which
+            caps the tree counts with crown spacing
+
+    Returns:
+        Dictionary with:
+        {
+            "cell_size_degrees": float,
+            "total_trees": int,
+            "cells": [
+                {
+                    "longitude": float,  # cell center
+                    "latitude": float,
+                    "rectangles": int,
+                    "trees": int,
+                    "trees_per_species": {species: expected trees},
+                    "co2_per_year_kg": float
+                },
+                ...
+            ]
+        }
+    """
+    counts = planted_tree_counts(
+        rectangles, trees_per_square_meter, placement, species_mix
+    )
+    min_long, min_lat, max_long, max_lat = rectangles.bounds()
+    cols = np.floor((min_long + max_long) / 2 / cell_size_degrees).astype(np.int64)
+    rows = np.floor((min_lat + max_lat) / 2 / cell_size_degrees).astype(np.int64)
+
+    cells, cell_index = np.unique(
+        np.column_stack([cols, rows]), axis=0, return_inverse=True
+    )
+    cell_index = cell_index.ravel()
+    cell_rectangles = np.bincount(cell_index, minlength=len(cells))
+    cell_trees = np.bincount(cell_index, weights=counts, minlength=len(cells))
+
+    # Expected trees per species follow the mix of each rectangle's area type
+    mix = _UNIFORM_MIX if species_mix is None else species_mix
+    mix = mix / mix.sum(axis=1, keepdims=True)
+    cell_type_trees = np.bincount(
+        cell_index * len(AREA_TYPES) + rectangles.area_type,
+        weights=counts,
+        minlength=len(cells) * len(AREA_TYPES),
+    ).reshape(len(cells), len(AREA_TYPES))
+    species_trees = cell_type_trees @ mix
+    co2_per_year = species_trees @ SPECIES_TABLE["co2_per_year"]
+    centers = (cells + 0.5) * cell_size_degrees
+
+    return {
+        "cell_size_degrees": cell_size_degrees,
+        "total_trees": int(counts.sum()),
+        "cells": [
+            {
+                "longitude": longitude,
+                "latitude": latitude,
+                "rectangles": num_rectangles,
+                "trees": int(trees),
+                "trees_per_species": dict(zip(SPECIES_NAMES, species_row)),
+                "co2_per_year_kg": co2,
+            }
+            for (longitude, latitude), num_rectangles, trees, species_row, co2 in zip(
+                centers.tolist(),
+                cell_rectangles.tolist(),
+                cell_trees.tolist(),
+                species_trees.tolist(),
+                co2_per_year.tolist(),
+            )
+        ],
+    }
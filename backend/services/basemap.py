@@ -0,0 +1,126 @@
+import os
+import queue
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+from services.cache import LRUCache
+
+# MBTiles file to serve basemap tiles from; the endpoint is disabled if unset
+BASEMAP_MBTILES_ENV = "FOREST_VISION_BASEMAP_MBTILES"
+
+# Read-only SQLite connections shared by the request threads
+BASEMAP_POOL_SIZE = 4
+
+# Tile blobs kept in memory, bounded by their total size in bytes
+BASEMAP_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+# Bytes charged per cached tile on top of its blob, so that missing tiles,
+# cached as empty blobs, still count against the budget
+BASEMAP_CACHE_ENTRY_BYTES = 64
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def is_gzipped(data: bytes) -> bool:
+    """Whether a tile blob is stored gzip-compressed"""
+    return data[:2] == GZIP_MAGIC
+
+
+class MBTilesReader:
+    """
+    Read tiles out of an MBTiles file through a pool of read-only connections.
+
+    Tiles are looked up with XYZ coordinates and returned exactly as stored,
+    so gzipped blobs are passed through without recompressing. Recently read
+    tiles, and tiles found missing, are kept in an LRU cache.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        pool_size: int = BASEMAP_POOL_SIZE,
+        cache_max_bytes: int = BASEMAP_CACHE_MAX_BYTES,
+    ):
+        self.path = Path(path)
+        if not self.path.exists():
+            raise FileNotFoundError(self.path)
+        self.cache = LRUCache(
+            cache_max_bytes, sizeof=lambda data: len(data) + BASEMAP_CACHE_ENTRY_BYTES
+        )
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        for _ in range(pool_size):
+            self._pool.put(self._connect())
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            f"{self.path.absolute().as_uri()}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection from the pool, waiting if all are in use"""
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def get_tile(self, z: int, x: int, y: int) -> Optional[bytes]:
+        """
+        Read one tile.
+
+        Args:
+            z: Zoom level
+            x: Tile column
+            y: Tile row in the XYZ scheme (origin at the top); MBTiles stores
+                TMS rows, so it is flipped before the lookup
+
+        Returns:
+            The stored tile blob, or None if the file has no such tile
+        """
+        key = (z, x, y)
+        data = self.cache.get(key)
+        if data is None:
+            tms_y = (1 << z) - 1 - y
+            with self.connection() as conn:
+                row = conn.execute(
+                    "SELECT tile_data FROM tiles "
+                    "WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                    (z, x, tms_y),
+                ).fetchone()
+            # Missing tiles are cached as empty blobs
+            data = bytes(row[0]) if row and row[0] else b""
+            self.cache.put(key, data)
+        return data or None
+
+    def close(self) -> None:
+        """Close every pooled connection"""
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+
+_basemap: Optional[MBTilesReader] = None
+
+
+def get_basemap() -> Optional[MBTilesReader]:
+    """
+    Return the process-wide basemap reader, opening it on first use.
+
+    Returns:
+        MBTilesReader for the file named by BASEMAP_MBTILES_ENV, or None if
+        no basemap is configured
+    """
+    global _basemap
+    path = os.environ.get(BASEMAP_MBTILES_ENV)
+    if not path:
+        return None
+    if _basemap is None or _basemap.path != Path(path):
+        _basemap = MBTilesReader(Path(path))
+        print(f"Basemap ready: serving tiles from {_basemap.path.absolute()}")
+    return _basemap
@@ -0,0 +1,60 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache bounded by the total size of its values.
+
+    The size of each value is measured with `sizeof` (1 per entry by default),
+    so the bound can be a number of entries or a number of bytes.
+    """
+
+    def __init__(self, max_size: int, sizeof: Callable[[Any], int] = lambda value: 1):
+        self.max_size = max_size
+        self.sizeof = sizeof
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Return the cached value for key and mark it recently used."""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Cache value under key, evicting least recently used entries to stay
+        within max_size. Values larger than max_size are not cached.
+        """
+        value_size = self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self.size -= self.sizeof(self._entries.pop(key))
+            if value_size > self.max_size:
+                return
+            self._entries[key] = value
+            self.size += value_size
+            while self.size > self.max_size:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= self.sizeof(evicted)
+
+    def clear(self) -> None:
+        """Drop every cached entry."""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
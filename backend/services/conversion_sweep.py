@@ -0,0 +1,185 @@
+import json
+from typing import Dict, Iterator, List, NamedTuple, Sequence
+
+import numpy as np
+from schemas.species import (SPECIES, SPECIES_CODES, SPECIES_NAMES,
+                             SPECIES_TABLE, Species)
+
+# Scenarios evaluated and serialized per streamed chunk
+SWEEP_CHUNK_SCENARIOS = 10_000
+
+# Largest sweep accepted in one request
+SWEEP_MAX_SCENARIOS = 1_000_000
+
+
+class ConversionScenarios(NamedTuple):
+    """Asphalt conversion scenarios as columns, one row per scenario"""
+
+    asphalt_sqft: np.ndarray
+    spacing_sqft_per_tree: np.ndarray
+    cost_removal_per_sqft: np.ndarray
+    maintenance_years: np.ndarray
+    species_mix: np.ndarray  # (scenarios, species) fractions by species code
+
+    def __len__(self) -> int:
+        return len(self.asphalt_sqft)
+
+    def take(self, indices) -> "ConversionScenarios":
+        """Select a subset of scenarios by row index or slice"""
+        return ConversionScenarios(*(column[indices] for column in self))
+
+
+def mix_matrix(distributions: Sequence[Dict[Species, float]]) -> np.ndarray:
+    """
+    Species distributions as a (distributions, species) fraction matrix.
+
+    Args:
+        distributions: {species: fraction} dicts
+
+    Returns:
+        Fractions by species code; species not in a distribution are 0
+    """
+    mix = np.zeros((len(distributions), len(SPECIES)))
+    for row, distribution in enumerate(distributions):
+        for species, fraction in distribution.items():
+            mix[row, SPECIES_CODES[Species(species)]] = fraction
+    return mix
+
+
+def scenario_grid(
+    asphalt_sqft: Sequence[float],
+    spacing_sqft_per_tree: Sequence[float],
+    cost_removal_per_sqft: Sequence[float],
+    maintenance_years: Sequence[int],
+    species_distributions: Sequence[Dict[Species, float]],
+) -> ConversionScenarios:
+    """
+    Cartesian product of parameter values.
+
+    Scenarios are ordered like nested loops over the arguments in signature
+    order, species_distributions varying fastest.
+
+    Returns:
+        One scenario per combination of values
+    """
+    axes = [
+        np.asarray(asphalt_sqft, dtype=np.float64),
+        np.asarray(spacing_sqft_per_tree, dtype=np.float64),
+        np.asarray(cost_removal_per_sqft, dtype=np.float64),
+        np.asarray(maintenance_years, dtype=np.int64),
+        np.arange(len(species_distributions)),
+    ]
+    grids = [grid.ravel() for grid in np.meshgrid(*axes, indexing="ij")]
+    return ConversionScenarios(
+        *grids[:4], species_mix=mix_matrix(species_distributions)[grids[4]]
+    )
+
+
+def scenario_list(scenarios: Sequence) -> ConversionScenarios:
+    """
+    Collect explicit scenarios into columns.
+
+    Args:
+        scenarios: Objects with the fields of AsphaltConversionParams
+
+    Returns:
+        One row per scenario, in order
+    """
+    return ConversionScenarios(
+        asphalt_sqft=np.array([s.asphalt_sqft for s in scenarios], dtype=np.float64),
+        spacing_sqft_per_tree=np.array(
+            [s.spacing_sqft_per_tree for s in scenarios], dtype=np.float64
+        ),
+        cost_removal_per_sqft=np.array(
+            [s.cost_removal_per_sqft for s in scenarios], dtype=np.float64
+        ),
+        maintenance_years=np.array(
+            [s.maintenance_years for s in scenarios], dtype=np.int64
+        ),
+        species_mix=mix_matrix([s.species_distribution for s in scenarios]),
+    )
+
+
+def evaluate_conversion_scenarios(scenarios: ConversionScenarios) -> Dict[str, np.ndarray]:
+    """
+    Evaluate plan_asphalt_conversion for every scenario at once.
+
+    Args:
+        scenarios: Scenarios to evaluate
+
+    Returns:
+        asphalt_removal_cost, total_maintenance_cost and total_co2_reduction_kg
+        per scenario, and trees_planted (scenarios, species)
+    """
+    capacity = np.floor(scenarios.asphalt_sqft / scenarios.spacing_sqft_per_tree)
+    trees = np.floor(capacity[:, None] * scenarios.species_mix)
+    years = scenarios.maintenance_years.astype(np.float64)
+    return {
+        "asphalt_removal_cost": scenarios.asphalt_sqft * scenarios.cost_removal_per_sqft,
+        "trees_planted": trees.astype(np.int64),
+        "total_maintenance_cost": trees @ SPECIES_TABLE["maintenance_cost"] * years,
+        "total_co2_reduction_kg": trees @ SPECIES_TABLE["co2_per_year"] * years,
+    }
+
+
+def _format_column(values: np.ndarray, prefix: str) -> List[str]:
+    """
+    JSON text of every value of a column, each preceded by prefix.
+
+    Sweep columns repeat few distinct values, so each distinct value is
+    formatted once and looked up for every row.
+
+    Raises:
+        ValueError: If a value is NaN or infinite, which JSON cannot encode
+    """
+    distinct, inverse = np.unique(values, return_inverse=True)
+    text = [prefix + json.dumps(value, allow_nan=False) for value in distinct.tolist()]
+    return [text[i] for i in inverse.tolist()]
+
+
+def iter_sweep_ndjson(
+    scenarios: ConversionScenarios, chunk_size: int = SWEEP_CHUNK_SCENARIOS
+) -> Iterator[bytes]:
+    """
+    Evaluate scenarios chunk by chunk and serialize them as NDJSON.
+
+    Each line holds the scenario index and parameters plus the fields
+    returned by plan_asphalt_conversion, with trees_planted_per_species
+    listing the species used by any scenario. Lines are assembled column by
+    column, which keeps the per-row Python work to a single string join.
+
+    Args:
+        scenarios: Scenarios to evaluate
+        chunk_size: Number of scenarios per yielded chunk
+
+    Yields:
+        UTF-8 encoded NDJSON, one line per scenario
+    """
+    used = np.flatnonzero(scenarios.species_mix.any(axis=0)).tolist()
+    species_prefixes = [f',"{SPECIES_NAMES[code]}":' for code in used]
+    # Open the trees_planted_per_species object before its first count
+    opening = ',"trees_planted_per_species":{'
+    if species_prefixes:
+        species_prefixes[0] = opening + species_prefixes[0][1:]
+    maintenance_prefix = ("}" if used else opening + "}") + ',"total_maintenance_cost":'
+
+    for start in range(0, len(scenarios), chunk_size):
+        chunk = scenarios.take(slice(start, start + chunk_size))
+        results = evaluate_conversion_scenarios(chunk)
+        trees = results["trees_planted"][:, used].T
+        columns = [
+            (chunk.asphalt_sqft, ',"asphalt_sqft":'),
+            (chunk.spacing_sqft_per_tree, ',"spacing_sqft_per_tree":'),
+            (chunk.cost_removal_per_sqft, ',"cost_removal_per_sqft":'),
+            (chunk.maintenance_years, ',"maintenance_years":'),
+            (results["asphalt_removal_cost"], ',"asphalt_removal_cost":'),
+            *zip(trees, species_prefixes),
+            (results["total_maintenance_cost"], maintenance_prefix),
+            (results["total_co2_reduction_kg"], ',"total_co2_reduction_kg":'),
+        ]
+        text = [
+            [f'{{"scenario":{i}' for i in range(start, start + len(chunk))],
+            *(_format_column(values, prefix) for values, prefix in columns),
+            ["}\n"] * len(chunk),
+        ]
+        yield "".join(map("".join, zip(*text))).encode()
@@ -0,0 +1,102 @@
+from typing import Dict
+
+import numpy as np
+from schemas.species import SPECIES_NAMES, SPECIES_TABLE
+from services.conversion_sweep import (ConversionScenarios,
+                                       evaluate_conversion_scenarios)
+
+# Longest projection accepted, in years
+MAX_PROJECTION_YEARS = 200
+
+
+def maturity(years: np.ndarray) -> np.ndarray:
+    """
+    Fraction of mature height reached by each species after each year.
+
+    Height follows h(t) = max_height * (1 - exp(-growth_rate * t / max_height)):
+    it grows by growth_rate per year at first and levels off at max_height.
+
+    Args:
+        years: Years since planting
+
+    Returns:
+        (years, species) array of h(t) / max_height, in [0, 1)
+    """
+    rate = SPECIES_TABLE["growth_rate"] / SPECIES_TABLE["max_height"]
+    return -np.expm1(-np.outer(years, rate))
+
+
+def project_conversion_scenarios(
+    scenarios: ConversionScenarios, horizon_years: int
+) -> Dict[str, np.ndarray]:
+    """
+    Year-by-year projection of planted trees for every scenario and species.
+
+    Crown spread, CO2 uptake and water demand scale with maturity from zero
+    to the species' max_crown_spread, co2_per_year and water_requirement.
+    Each tree's canopy is capped at the area allotted to it by the spacing.
+    Planting costs are paid in year 0, maintenance every year after.
+
+    Args:
+        scenarios: Scenarios to project, trees are counted as in
+            plan_asphalt_conversion
+        horizon_years: Number of years to project
+
+    Returns:
+        trees (scenarios, species) and, as (scenarios, years, species) arrays
+        for years 1..horizon_years: canopy_area_sqft, co2_sequestered_kg
+        (cumulative), water_demand (per year) and cumulative_cost (planting
+        and maintenance, excluding asphalt removal)
+    """
+    years = np.arange(1, horizon_years + 1)
+    grown = maturity(years)[None, :, :]
+    trees = evaluate_conversion_scenarios(scenarios)["trees_planted"]
+    tree_counts = trees[:, None, :].astype(np.float64)
+
+    crown_radius = SPECIES_TABLE["max_crown_spread"] * grown / 2
+    canopy_per_tree = np.minimum(
+        np.pi * crown_radius**2, scenarios.spacing_sqft_per_tree[:, None, None]
+    )
+    annual_co2 = tree_counts * SPECIES_TABLE["co2_per_year"] * grown
+    planting = trees * SPECIES_TABLE["planting_cost"]
+    maintenance = trees * SPECIES_TABLE["maintenance_cost"]
+
+    return {
+        "trees": trees,
+        "canopy_area_sqft": tree_counts * canopy_per_tree,
+        "co2_sequestered_kg": np.cumsum(annual_co2, axis=1),
+        "water_demand": tree_counts * SPECIES_TABLE["water_requirement"] * grown,
+        "cumulative_cost": planting[:, None, :]
+        + maintenance[:, None, :] * years[None, :, None],
+    }
+
+
+def projection_series(scenarios: ConversionScenarios, horizon_years: int) -> Dict:
+    """
+    Projection of the first scenario as JSON-ready per-species series.
+
+    Args:
+        scenarios: Scenarios to project; only the first one is returned
+        horizon_years: Number of years to project
+
+    Returns:
+        {years, species: {name: {trees, <series>...}}, total: {<series>...}}
+        with the series of project_conversion_scenarios, species with no
+        trees left out
+    """
+    projection = project_conversion_scenarios(scenarios.take(slice(0, 1)), horizon_years)
+    trees = projection.pop("trees")[0]
+    series = {name: values[0] for name, values in projection.items()}
+    planted = np.flatnonzero(trees).tolist()
+
+    return {
+        "years": list(range(1, horizon_years + 1)),
+        "species": {
+            SPECIES_NAMES[code]: {
+                "trees": int(trees[code]),
+                **{name: values[:, code].tolist() for name, values in series.items()},
+            }
+            for code in planted
+        },
+        "total": {name: values.sum(axis=1).tolist() for name, values in series.items()},
+    }
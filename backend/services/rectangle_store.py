@@ -0,0 +1,296 @@
+import hashlib
+import time
+from functools import cached_property
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from scripts.rectangle_io import (AREA_TYPE_COLUMN, DISTRICT_COLUMN,
+                                  NEIGHBORHOOD_COLUMN, NPY_SUFFIX,
+                                  read_rectangle_codes)
+from scripts.tree_generation import (AREA_TYPES, AreaType, Rectangle,
+                                     _meters_to_lat_long_conversion)
+
+DATASETS_DIR = Path("./datasets")
+
+# Datasets loaded into the store, in row order. A .npy dataset next to a
+# .json one (same name, different suffix) is preferred.
+RECTANGLE_DATASETS: List[Tuple[Path, AreaType]] = [
+    (DATASETS_DIR / "parking-lot-coordinates.json", AreaType.PARKING_LOT),
+    (DATASETS_DIR / "On_Street_Parking_rectangles.json", AreaType.STREET_SIDE),
+]
+
+# All datasets stacked into one file by `ingest.py combine`. While it is newer
+# than every dataset it is memory-mapped instead of copying the datasets into
+# one store.
+COMBINED_DATASET = DATASETS_DIR / "rectangles.npy"
+
+# Codes of the area_type column, indexing AREA_TYPES
+AREA_TYPE_CODES = {area_type: code for code, area_type in enumerate(AREA_TYPES)}
+
+
+class RectangleStore:
+    """
+    Columnar, in-memory set of rectangles.
+
+    Each column is a NumPy array with one entry per rectangle. Column names
+    mirror the fields of Rectangle so the store can be passed anywhere a list
+    of rectangles is read column by column.
+
+    Rectangles also carry the supervisor district (0 if unknown) and analysis
+    neighborhood they lie in. Neighborhoods are stored as codes into the
+    sorted neighborhoods tuple, -1 if unknown.
+    """
+
+    def __init__(
+        self,
+        top_right_lat: np.ndarray,
+        top_right_long: np.ndarray,
+        width_meters: np.ndarray,
+        length_meters: np.ndarray,
+        area_type: np.ndarray,
+        district: Optional[np.ndarray] = None,
+        neighborhood: Optional[np.ndarray] = None,
+        neighborhoods: Sequence[str] = (),
+        load_seconds: float = 0.0,
+    ):
+        self.top_right_lat = np.asarray(top_right_lat, dtype=np.float64)
+        self.top_right_long = np.asarray(top_right_long, dtype=np.float64)
+        self.width_meters = np.asarray(width_meters, dtype=np.float64)
+        self.length_meters = np.asarray(length_meters, dtype=np.float64)
+        self.area_type = np.asarray(area_type, dtype=np.uint8)
+        num_rows = len(self.top_right_lat)
+        self.district = (
+            np.zeros(num_rows, dtype=np.int16)
+            if district is None
+            else np.asarray(district, dtype=np.int16)
+        )
+        self.neighborhood = (
+            np.full(num_rows, -1, dtype=np.int16)
+            if neighborhood is None
+            else np.asarray(neighborhood, dtype=np.int16)
+        )
+        self.neighborhoods: Tuple[str, ...] = tuple(neighborhoods)
+        self.load_seconds = load_seconds
+
+    def __len__(self) -> int:
+        return len(self.top_right_lat)
+
+    @property
+    def area(self) -> np.ndarray:
+        """Area of each rectangle in square meters"""
+        return self.width_meters * self.length_meters
+
+    @cached_property
+    def version(self) -> str:
+        """Content hash of the rectangle data, used in cache keys and ETags"""
+        digest = hashlib.blake2b(digest_size=16)
+        for column in self._columns():
+            digest.update(np.ascontiguousarray(column).tobytes())
+        digest.update("\n".join(self.neighborhoods).encode())
+        return digest.hexdigest()
+
+    def bounds(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Bounding box of each rectangle.
+
+        Rectangles extend south by their length and west by their width from
+        the top-right corner.
+
+        Returns:
+            (min_long, min_lat, max_long, max_lat) arrays in degrees
+        """
+        meters_to_lat, meters_to_long = _meters_to_lat_long_conversion(
+            self.top_right_lat
+        )
+        min_lat = self.top_right_lat - self.length_meters * meters_to_lat
+        min_long = self.top_right_long - self.width_meters * meters_to_long
+        return min_long, min_lat, self.top_right_long, self.top_right_lat
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the column arrays, in bytes"""
+        return sum(column.nbytes for column in self._columns())
+
+    def _columns(self) -> Tuple[np.ndarray, ...]:
+        return (
+            self.top_right_lat,
+            self.top_right_long,
+            self.width_meters,
+            self.length_meters,
+            self.area_type,
+            self.district,
+            self.neighborhood,
+        )
+
+    def take(self, indices: np.ndarray) -> "RectangleStore":
+        """
+        Select a subset of rectangles by row index.
+
+        Args:
+            indices: Integer row indices (or a boolean mask) into the store
+
+        Returns:
+            A new RectangleStore holding only the selected rows
+        """
+        return RectangleStore(
+            *(column[indices] for column in self._columns()),
+            neighborhoods=self.neighborhoods,
+        )
+
+    def to_rectangles(self) -> List[Rectangle]:
+        """Materialize the store as a list of Rectangle objects."""
+        return [
+            Rectangle(
+                top_right_lat=lat,
+                top_right_long=long,
+                width_meters=width,
+                length_meters=length,
+                area_type=AREA_TYPES[code],
+            )
+            for lat, long, width, length, code in zip(
+                *(column.tolist() for column in self._columns()[:5])
+            )
+        ]
+
+    @classmethod
+    def concatenate(cls, stores: Sequence["RectangleStore"]) -> "RectangleStore":
+        """
+        Stack several stores into one, preserving row order.
+
+        Stacking copies the columns of two or more stores into memory, a
+        single store is returned as is so memory-mapped columns stay mapped.
+        """
+        if not stores:
+            return cls.empty()
+        if len(stores) == 1:
+            return stores[0]
+        neighborhoods = sorted(set().union(*(store.neighborhoods for store in stores)))
+        columns = []
+        for store in stores:
+            # Recode against the union of the stores' neighborhoods; the
+            # trailing -1 keeps unknown (-1) codes unknown
+            codes = np.append(np.searchsorted(neighborhoods, store.neighborhoods), -1)
+            recoded = codes[store.neighborhood].astype(np.int16)
+            columns.append((*store._columns()[:-1], recoded))
+        return cls(
+            *(np.concatenate(column) for column in zip(*columns)),
+            neighborhoods=neighborhoods,
+        )
+
+    @classmethod
+    def empty(cls) -> "RectangleStore":
+        """Create a store without any rectangles."""
+        return cls([], [], [], [], [])
+
+
+def dataset_file(file_path: Path) -> Path:
+    """The file to load for a dataset, preferring its binary .npy variant"""
+    npy_path = file_path.with_suffix(NPY_SUFFIX)
+    return npy_path if npy_path.exists() else file_path
+
+
+def load_rectangle_arrays(
+    file_path: Path, area_type: Optional[AreaType] = None
+) -> RectangleStore:
+    """
+    Load a rectangle dataset straight into column arrays.
+
+    Columns of a .npy dataset stay memory-mapped; JSON datasets are parsed.
+    Datasets without district keys load with every rectangle unassigned.
+
+    Args:
+        file_path: Path to the .npy or JSON file containing rectangle data
+        area_type: Type of area (parking lot or street side) of every
+            rectangle, for datasets without an area type column
+
+    Returns:
+        RectangleStore with one row per record
+    """
+    print(f"Loading data from {file_path.absolute()}")
+    columns, neighborhoods = read_rectangle_codes(file_path)
+    num_rows = len(columns["latitude"])
+    print(f"Loaded {num_rows} rectangles from {file_path.suffix[1:].upper()}")
+
+    area_types = columns.get(AREA_TYPE_COLUMN)
+    if area_types is None:
+        area_types = np.full(num_rows, AREA_TYPE_CODES[area_type], dtype=np.uint8)
+    return RectangleStore(
+        top_right_lat=columns["latitude"],
+        top_right_long=columns["longitude"],
+        width_meters=columns["width"],
+        length_meters=columns["length"],
+        area_type=area_types,
+        district=columns.get(DISTRICT_COLUMN),
+        neighborhood=columns.get(NEIGHBORHOOD_COLUMN),
+        neighborhoods=neighborhoods,
+    )
+
+
+def is_combined_current(combined: Path, files: Sequence[Path]) -> bool:
+    """Whether a combined dataset exists and is newer than all of files"""
+    if not combined.exists():
+        return False
+    built = combined.stat().st_mtime
+    return all(not path.exists() or path.stat().st_mtime <= built for path in files)
+
+
+def load_rectangle_store(
+    datasets: Sequence[Tuple[Path, AreaType]] = RECTANGLE_DATASETS,
+    combined: Optional[Path] = None,
+) -> RectangleStore:
+    """
+    Load every rectangle dataset into a single columnar store.
+
+    Datasets that have not been generated yet are skipped with a warning so
+    the API can still serve the ones that exist.
+
+    Args:
+        datasets: (path, area type) pairs to load, in row order
+        combined: Dataset stacking all of datasets, loaded instead of them
+            while it is newer than each of them
+
+    Returns:
+        RectangleStore holding the rows of all datasets
+    """
+    start = time.perf_counter()
+    files = [(dataset_file(file_path), area_type) for file_path, area_type in datasets]
+    stores = []
+    if combined is not None and is_combined_current(combined, [f for f, _ in files]):
+        stores.append(load_rectangle_arrays(combined))
+    else:
+        for file_path, area_type in files:
+            if not file_path.exists():
+                print(f"Warning: dataset {file_path.absolute()} not found, skipping")
+                continue
+            stores.append(load_rectangle_arrays(file_path, area_type))
+        if len(stores) > 1:
+            print(
+                f"Copying {len(stores)} datasets into one store, run "
+                f"`scripts/ingest.py combine` to memory-map them as one file"
+            )
+
+    store = RectangleStore.concatenate(stores)
+    store.load_seconds = time.perf_counter() - start
+    print(
+        f"Rectangle store ready: {len(store)} rectangles, "
+        f"{store.nbytes / (1024 * 1024):.2f} MB, "
+        f"loaded in {store.load_seconds * 1000:.1f} ms"
+    )
+    return store
+
+
+_rectangle_store: Optional[RectangleStore] = None
+
+
+def get_rectangle_store() -> RectangleStore:
+    """
+    Return the process-wide rectangle store, loading it on first use.
+
+    Used both by the application lifespan (to load eagerly at startup) and as
+    a FastAPI dependency.
+    """
+    global _rectangle_store
+    if _rectangle_store is None:
+        _rectangle_store = load_rectangle_store(RECTANGLE_DATASETS, COMBINED_DATASET)
+    return _rectangle_store
@@ -0,0 +1,218 @@
+from enum import Enum
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+from fastapi import Depends
+from schemas.species import SPECIES_NAMES, Species, species_codes
+from scripts.tree_generation import AreaType
+from services.conversion_sweep import (ConversionScenarios,
+                                       evaluate_conversion_scenarios,
+                                       mix_matrix)
+from services.rectangle_store import (AREA_TYPE_CODES, AREA_TYPES,
+                                      RectangleStore, get_rectangle_store)
+
+SQFT_PER_SQUARE_METER = 10.763910416709722
+
+# Label of the rectangles whose district or neighborhood is not known
+UNASSIGNED_REGION = "unassigned"
+
+
+class RegionKey(str, Enum):
+    """Which regions rectangles are rolled up by"""
+
+    DISTRICT = "district"  # supervisor district
+    NEIGHBORHOOD = "neighborhood"  # analysis neighborhood
+
+
+class RegionTable(NamedTuple):
+    """Parking rectangles and area per region, split by area type"""
+
+    regions: List[str]
+    rectangles: np.ndarray  # (regions, area types) rectangle counts
+    area_sqft: np.ndarray  # (regions, area types) square feet
+
+
+def region_table(
+    rectangles: RectangleStore, codes: np.ndarray, labels: Sequence[str]
+) -> RegionTable:
+    """
+    Sum the rectangles and area of each region and area type.
+
+    Args:
+        rectangles: Rectangles to roll up
+        codes: Index into labels of the region of each rectangle
+        labels: Region names
+
+    Returns:
+        Table over the regions holding at least one rectangle, in label order
+    """
+    shape = (len(labels), len(AREA_TYPES))
+    cells = codes.astype(np.int64) * len(AREA_TYPES) + rectangles.area_type
+    counts = np.bincount(cells, minlength=shape[0] * shape[1]).reshape(shape)
+    area = np.bincount(
+        cells,
+        weights=rectangles.area * SQFT_PER_SQUARE_METER,
+        minlength=shape[0] * shape[1],
+    ).reshape(shape)
+    occupied = counts.sum(axis=1) > 0
+    return RegionTable(
+        regions=[label for label, used in zip(labels, occupied) if used],
+        rectangles=counts[occupied],
+        area_sqft=area[occupied],
+    )
+
+
+def district_table(rectangles: RectangleStore) -> RegionTable:
+    """Region table by supervisor district, unassigned rectangles last"""
+    districts, codes = np.unique(rectangles.district, return_inverse=True)
+    labels = [str(district) for district in districts.tolist()]
+    codes = codes.ravel()
+    if len(districts) and districts[0] == 0:
+        labels = labels[1:] + [UNASSIGNED_REGION]
+        codes = (codes - 1) % len(labels)
+    return region_table(rectangles, codes, labels)
+
+
+def neighborhood_table(rectangles: RectangleStore) -> RegionTable:
+    """Region table by analysis neighborhood, unassigned rectangles last"""
+    names = list(rectangles.neighborhoods)
+    codes = np.where(rectangles.neighborhood >= 0, rectangles.neighborhood, len(names))
+    return region_table(rectangles, codes, names + [UNASSIGNED_REGION])
+
+
+class RegionRollups:
+    """
+    Per-region parking area tables, built once per rectangle store.
+
+    Conversion impacts are then evaluated for every region at once from the
+    tables, without generating or even visiting individual trees.
+    """
+
+    def __init__(self, rectangles: RectangleStore):
+        self.rectangles = rectangles
+        self.tables: Dict[RegionKey, RegionTable] = {
+            RegionKey.DISTRICT: district_table(rectangles),
+            RegionKey.NEIGHBORHOOD: neighborhood_table(rectangles),
+        }
+
+    def convert(
+        self,
+        key: RegionKey,
+        fraction: float,
+        species_distribution: Dict[Species, float],
+        spacing_sqft_per_tree: float = 100.0,
+        cost_removal_per_sqft: float = 10.0,
+        maintenance_years: int = 5,
+        regions: Optional[Sequence[str]] = None,
+        area_types: Optional[Sequence[AreaType]] = None,
+    ) -> Dict:
+        """
+        Impact of converting a fraction of the parking area of each region.
+
+        Each region is one plan_asphalt_conversion scenario whose asphalt
+        area is the fraction of its parking area.
+
+        Args:
+            key: Regions to roll up by
+            fraction: Fraction of parking area converted (0.0 to 1.0)
+            species_distribution: {species: fraction} of the planted trees
+            spacing_sqft_per_tree: Square feet allocated per tree
+            cost_removal_per_sqft: Cost to remove asphalt per square foot
+            maintenance_years: Years of maintenance and CO2 reduction
+            regions: Regions to report, all if None
+            area_types: Area types to convert, all if None
+
+        Returns:
+            {region_key, regions: [{region, rectangles, parking_area_sqft,
+            asphalt_sqft, tree_capacity, <plan_asphalt_conversion fields>}],
+            total: {<the same sums>}}
+
+        Raises:
+            ValueError: If a requested region does not exist
+        """
+        key = RegionKey(key)
+        table = self.tables[key]
+        rows = np.arange(len(table.regions))
+        if regions is not None:
+            index = {region: row for row, region in enumerate(table.regions)}
+            unknown = [region for region in regions if region not in index]
+            if unknown:
+                raise ValueError(f"Unknown {key.value}: {', '.join(unknown)}")
+            rows = np.array([index[region] for region in regions], dtype=np.int64)
+        converted = [AREA_TYPE_CODES[t] for t in area_types or AREA_TYPES]
+        cells = np.ix_(rows, converted)
+        rectangles = table.rectangles[cells].sum(axis=1)
+        parking_area = table.area_sqft[cells].sum(axis=1)
+        scenarios = ConversionScenarios(
+            asphalt_sqft=parking_area * fraction,
+            spacing_sqft_per_tree=np.full(len(rows), float(spacing_sqft_per_tree)),
+            cost_removal_per_sqft=np.full(len(rows), float(cost_removal_per_sqft)),
+            maintenance_years=np.full(len(rows), maintenance_years, dtype=np.int64),
+            species_mix=np.repeat(
+                mix_matrix([species_distribution]), len(rows), axis=0
+            ),
+        )
+        results = evaluate_conversion_scenarios(scenarios)
+        columns = {
+            "rectangles": rectangles,
+            "parking_area_sqft": parking_area,
+            "asphalt_sqft": scenarios.asphalt_sqft,
+            "tree_capacity": np.floor(
+                scenarios.asphalt_sqft / scenarios.spacing_sqft_per_tree
+            ).astype(np.int64),
+            "asphalt_removal_cost": results["asphalt_removal_cost"],
+            "total_maintenance_cost": results["total_maintenance_cost"],
+            "total_co2_reduction_kg": results["total_co2_reduction_kg"],
+        }
+
+        planted = species_codes(species_distribution)
+        labels = [SPECIES_NAMES[code] for code in planted.tolist()]
+        trees = results["trees_planted"][:, planted]
+        region_values = zip(*(column.tolist() for column in columns.values()))
+        return {
+            "region_key": key.value,
+            "regions": [
+                {
+                    "region": table.regions[row],
+                    **dict(zip(columns, values)),
+                    "trees_planted_per_species": dict(zip(labels, counts)),
+                }
+                for row, values, counts in zip(
+                    rows.tolist(), region_values, trees.tolist()
+                )
+            ],
+            "total": {
+                **{name: column.sum().item() for name, column in columns.items()},
+                "trees_planted_per_species": dict(
+                    zip(labels, trees.sum(axis=0).tolist())
+                ),
+            },
+        }
+
+
+_region_rollups: Optional[RegionRollups] = None
+
+
+def get_region_rollups(
+    rectangles: RectangleStore = Depends(get_rectangle_store),
+) -> RegionRollups:
+    """
+    Return the region tables of the rectangle store, building them on first use.
+
+    Args:
+        rectangles: Rectangle store to roll up
+
+    Returns:
+        RegionRollups shared by every request against the same store
+    """
+    global _region_rollups
+    if _region_rollups is None or _region_rollups.rectangles is not rectangles:
+        _region_rollups = RegionRollups(rectangles)
+        print(
+            "Region rollups ready: "
+            + ", ".join(
+                f"{len(table.regions)} {key.value} regions"
+                for key, table in _region_rollups.tables.items()
+            )
+        )
+    return _region_rollups
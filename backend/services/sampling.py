@@ -0,0 +1,152 @@
+from enum import Enum
+from typing import Optional, Union
+
+import numpy as np
+from services.rectangle_store import RectangleStore
+
+
+class SamplingMethod(str, Enum):
+    """How a percentage of rectangles is selected for planting"""
+
+    UNIFORM = "uniform"  # percentage of rectangles, each equally likely
+    AREA_WEIGHTED = "area_weighted"  # percentage of plantable area
+    STRATIFIED = "stratified"  # percentage of rectangles within each area_type
+
+
+def sample_uniform(
+    num_rows: int, fraction: float, rng: np.random.Generator
+) -> np.ndarray:
+    """
+    Pick int(num_rows * fraction) rows uniformly without replacement.
+
+    Args:
+        num_rows: Number of rows to sample from
+        fraction: Fraction of rows to keep (0.0 to 1.0)
+        rng: Random generator to draw from
+
+    Returns:
+        Sorted row positions
+    """
+    sample_size = int(num_rows * fraction)
+    if sample_size >= num_rows:
+        return np.arange(num_rows)
+    return np.sort(rng.choice(num_rows, sample_size, replace=False))
+
+
+def sample_area_weighted(
+    areas: np.ndarray, fraction: float, rng: np.random.Generator
+) -> np.ndarray:
+    """
+    Pick rows in area-weighted random order until they cover a fraction of
+    the total area.
+
+    Rows are ordered by exponential keys E / area (Efraimidis-Spirakis), which
+    is a weighted sample without replacement. Only the smallest keys are
+    sorted, growing the partition until it covers the target area.
+
+    Args:
+        areas: Area of each row
+        fraction: Fraction of the total area to cover (0.0 to 1.0)
+        rng: Random generator to draw from
+
+    Returns:
+        Sorted row positions
+    """
+    num_rows = len(areas)
+    if fraction >= 1.0:
+        return np.arange(num_rows)
+    target = areas.sum() * fraction
+    if num_rows == 0 or target <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    with np.errstate(divide="ignore"):
+        keys = rng.exponential(size=num_rows) / areas
+
+    # Heavier rows come first, so an unweighted estimate is an upper bound
+    # on the number of rows needed in most draws
+    candidates = min(num_rows, max(16, int(num_rows * fraction * 1.25) + 1))
+    while True:
+        if candidates < num_rows:
+            head = np.argpartition(keys, candidates)[:candidates]
+        else:
+            head = np.arange(num_rows)
+        head = head[np.argsort(keys[head], kind="stable")]
+        covered = np.cumsum(areas[head])
+        if covered[-1] >= target or candidates == num_rows:
+            break
+        candidates = min(num_rows, candidates * 2)
+
+    count = min(len(head), int(np.searchsorted(covered, target)) + 1)
+    return np.sort(head[:count])
+
+
+def sample_stratified(
+    strata: np.ndarray, fraction: float, rng: np.random.Generator
+) -> np.ndarray:
+    """
+    Pick a uniform fraction of rows within each stratum.
+
+    Args:
+        strata: Stratum code of each row, e.g. the area_type column
+        fraction: Fraction of rows to keep in every stratum (0.0 to 1.0)
+        rng: Random generator to draw from
+
+    Returns:
+        Sorted row positions
+    """
+    if fraction >= 1.0:
+        return np.arange(len(strata))
+
+    order = np.argsort(strata, kind="stable")
+    _, starts, counts = np.unique(strata[order], return_index=True, return_counts=True)
+    picks = [
+        order[start + sample_uniform(count, fraction, rng)]
+        for start, count in zip(starts.tolist(), counts.tolist())
+    ]
+    if not picks:
+        return np.empty(0, dtype=np.int64)
+    return np.sort(np.concatenate(picks))
+
+
+def sample_rectangles(
+    rectangles: RectangleStore,
+    fraction: float,
+    method: SamplingMethod = SamplingMethod.UNIFORM,
+    rng: Optional[np.random.Generator] = None,
+    candidates: Optional[np.ndarray] = None,
+) -> Union[np.ndarray, slice]:
+    """
+    Select rectangles to plant as row indices into the store.
+
+    Without candidates, rows are sampled from the store's length and columns
+    directly, so no index of every row is built.
+
+    Args:
+        rectangles: Rectangle store to sample from
+        fraction: Fraction to keep (0.0 to 1.0); of rectangles for uniform and
+            stratified sampling, of plantable area for area-weighted sampling
+        method: Sampling method
+        rng: Random generator to draw from, a fresh one if not given
+        candidates: Row indices to restrict the sample to (e.g. the rectangles
+            in a viewport); all rows if not given
+
+    Returns:
+        Sorted row indices into rectangles, the candidates themselves or
+        slice(None) when every row is selected
+    """
+    # Every method keeps all rows at a full fraction, without drawing
+    if fraction >= 1.0:
+        return slice(None) if candidates is None else candidates
+    if rng is None:
+        rng = np.random.default_rng()
+
+    rows = slice(None) if candidates is None else candidates
+    if method == SamplingMethod.AREA_WEIGHTED:
+        positions = sample_area_weighted(rectangles.area[rows], fraction, rng)
+    elif method == SamplingMethod.STRATIFIED:
+        positions = sample_stratified(rectangles.area_type[rows], fraction, rng)
+    else:
+        num_rows = len(rectangles) if candidates is None else len(candidates)
+        positions = sample_uniform(num_rows, fraction, rng)
+
+    return positions if candidates is None else candidates[positions]
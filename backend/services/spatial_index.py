@@ -0,0 +1,127 @@
+from typing import Optional
+
+import numpy as np
+from fastapi import Depends
+from services.rectangle_store import RectangleStore, get_rectangle_store
+
+# Grid cell size in degrees, roughly 500m x 400m in San Francisco
+DEFAULT_CELL_SIZE_DEGREES = 0.005
+
+
+class GridIndex:
+    """
+    Uniform grid index over rectangle bounding boxes.
+
+    Each rectangle is filed under the grid cell holding the south-west corner
+    of its bounding box. Row indices are kept sorted by cell, so the
+    rectangles of a cell are one contiguous run. Queries widen the search
+    window by the largest rectangle extent, which guarantees that every
+    intersecting rectangle is among the candidates.
+    """
+
+    def __init__(
+        self,
+        rectangles: RectangleStore,
+        cell_size_degrees: float = DEFAULT_CELL_SIZE_DEGREES,
+    ):
+        self.rectangles = rectangles
+        self.cell_size = cell_size_degrees
+        self.min_long, self.min_lat, self.max_long, self.max_lat = rectangles.bounds()
+
+        if len(rectangles):
+            self.origin_long = float(self.min_long.min())
+            self.origin_lat = float(self.min_lat.min())
+            self.max_extent_long = float((self.max_long - self.min_long).max())
+            self.max_extent_lat = float((self.max_lat - self.min_lat).max())
+        else:
+            self.origin_long = self.origin_lat = 0.0
+            self.max_extent_long = self.max_extent_lat = 0.0
+
+        cols = self._cell(self.min_long, self.origin_long)
+        rows = self._cell(self.min_lat, self.origin_lat)
+        self.num_cols = int(cols.max()) + 1 if len(cols) else 0
+        self.num_rows = int(rows.max()) + 1 if len(rows) else 0
+
+        cell_ids = rows * self.num_cols + cols
+        self.order = np.argsort(cell_ids, kind="stable")
+        self.cell_keys, self.cell_starts, counts = np.unique(
+            cell_ids[self.order], return_index=True, return_counts=True
+        )
+        self.cell_ends = self.cell_starts + counts
+
+    def _cell(self, values: np.ndarray, origin: float) -> np.ndarray:
+        return np.floor((values - origin) / self.cell_size).astype(np.int64)
+
+    def query(
+        self, min_long: float, min_lat: float, max_long: float, max_lat: float
+    ) -> np.ndarray:
+        """
+        Find the rectangles whose bounding box intersects a viewport.
+
+        Args:
+            min_long: Western edge of the viewport
+            min_lat: Southern edge of the viewport
+            max_long: Eastern edge of the viewport
+            max_lat: Northern edge of the viewport
+
+        Returns:
+            Sorted row indices into the indexed RectangleStore
+        """
+        if not len(self.cell_keys):
+            return np.empty(0, dtype=np.int64)
+
+        col_lo, col_hi = self._cell(
+            np.array([min_long - self.max_extent_long, max_long]), self.origin_long
+        ).clip(0, self.num_cols - 1)
+        row_lo, row_hi = self._cell(
+            np.array([min_lat - self.max_extent_lat, max_lat]), self.origin_lat
+        ).clip(0, self.num_rows - 1)
+
+        # Occupied cells inside the widened window, one contiguous run each
+        rows, cols = np.meshgrid(
+            np.arange(row_lo, row_hi + 1), np.arange(col_lo, col_hi + 1), indexing="ij"
+        )
+        wanted = (rows * self.num_cols + cols).ravel()
+        positions = np.searchsorted(self.cell_keys, wanted)
+        in_range = positions < len(self.cell_keys)
+        positions, wanted = positions[in_range], wanted[in_range]
+        positions = positions[self.cell_keys[positions] == wanted]
+
+        starts = self.cell_starts[positions]
+        lengths = self.cell_ends[positions] - starts
+        run_offsets = np.cumsum(lengths) - lengths
+        within = np.arange(lengths.sum()) - np.repeat(run_offsets, lengths)
+        candidates = self.order[np.repeat(starts, lengths) + within]
+
+        hits = (
+            (self.min_long[candidates] <= max_long)
+            & (self.max_long[candidates] >= min_long)
+            & (self.min_lat[candidates] <= max_lat)
+            & (self.max_lat[candidates] >= min_lat)
+        )
+        return np.sort(candidates[hits])
+
+
+_spatial_index: Optional[GridIndex] = None
+
+
+def get_spatial_index(
+    rectangles: RectangleStore = Depends(get_rectangle_store),
+) -> GridIndex:
+    """
+    Return the grid index over the rectangle store, building it on first use.
+
+    Args:
+        rectangles: Rectangle store to index
+
+    Returns:
+        GridIndex shared by every request against the same store
+    """
+    global _spatial_index
+    if _spatial_index is None or _spatial_index.rectangles is not rectangles:
+        _spatial_index = GridIndex(rectangles)
+        print(
+            f"Spatial index ready: {len(_spatial_index.cell_keys)} occupied cells "
+            f"for {len(rectangles)} rectangles"
+        )
+    return _spatial_index
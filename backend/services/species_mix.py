@@ -0,0 +1,83 @@
+from typing import Dict, Optional
+
+import numpy as np
+from schemas.species import Species
+from scripts.tree_generation import AREA_TYPES, AreaType
+from services.conversion_sweep import mix_matrix
+
+# Default species fractions of area types that have one. Street sides get
+# narrow crowns (at most 40 ft), parking lots broad shade trees.
+AREA_TYPE_SPECIES_DEFAULTS: Dict[AreaType, Dict[Species, float]] = {
+    AreaType.STREET_SIDE: {
+        Species.REDWOOD: 0.3,
+        Species.MONTEREY_PINE: 0.4,
+        Species.CALIFORNIA_BUCKEYE: 0.3,
+    },
+    AreaType.PARKING_LOT: {
+        Species.COAST_LIVE_OAK: 0.4,
+        Species.WESTERN_SYCAMORE: 0.3,
+        Species.LONDON_PLANE: 0.3,
+    },
+}
+
+# Allowed deviation of a distribution's total from 1.0
+DISTRIBUTION_TOLERANCE = 1e-6
+
+
+def parse_species_distribution(text: str) -> Dict[Species, float]:
+    """
+    Parse a species distribution given as "species:fraction,..." pairs.
+
+    Args:
+        text: e.g. "redwood:0.5,coast_live_oak:0.5"
+
+    Returns:
+        {species: fraction}
+
+    Raises:
+        ValueError: If a pair is malformed, a species unknown, a fraction
+            not finite or negative, or the fractions do not sum to 1.0
+    """
+    distribution: Dict[Species, float] = {}
+    for pair in text.split(","):
+        name, separator, fraction = pair.partition(":")
+        if not separator:
+            raise ValueError(f"Expected species:fraction, got {pair.strip()!r}")
+        species = Species(name.strip())
+        distribution[species] = distribution.get(species, 0.0) + float(fraction)
+
+    if not np.isfinite(list(distribution.values())).all():
+        raise ValueError("Species fractions must be finite numbers")
+    if any(fraction < 0 for fraction in distribution.values()):
+        raise ValueError("Species fractions must not be negative")
+    total = sum(distribution.values())
+    if abs(total - 1.0) > DISTRIBUTION_TOLERANCE:
+        raise ValueError(f"Species fractions must sum to 1.0, not {total:g}")
+    return distribution
+
+
+def species_mix(
+    distribution: Optional[Dict[Species, float]] = None,
+    area_type_defaults: bool = False,
+) -> Optional[np.ndarray]:
+    """
+    Species fractions of every area type, as used by tree generation.
+
+    Args:
+        distribution: Species fractions for all area types, uniform if None
+        area_type_defaults: Use AREA_TYPE_SPECIES_DEFAULTS for the area types
+            that have a default, instead of distribution
+
+    Returns:
+        (area types, species) matrix indexed by AREA_TYPES and species code,
+        or None if species are uniform for every area type
+    """
+    if distribution is None and not area_type_defaults:
+        return None
+    rows = [
+        AREA_TYPE_SPECIES_DEFAULTS[area_type]
+        if area_type_defaults and area_type in AREA_TYPE_SPECIES_DEFAULTS
+        else distribution or {species: 1.0 / len(Species) for species in Species}
+        for area_type in AREA_TYPES
+    ]
+    return mix_matrix(rows)
@@ -0,0 +1,218 @@
+from itertools import combinations, product
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from schemas.species import (SPECIES, SPECIES_NAMES, SPECIES_TABLE, Species,
+                             species_codes)
+
+# Constraint names, in the row order of the constraint matrix
+CONSTRAINTS = ("area", "budget", "water")
+
+# How many trees below the LP solution each species is tried at when rounding
+ROUNDING_STEPS = 3
+
+
+def _lp_optimum(A: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """
+    Maximize c @ x subject to A @ x <= b, x >= 0 by enumerating vertices.
+
+    With m constraints an optimal vertex has at most m nonzero variables, so
+    every vertex is found by picking k variables and k constraints, making
+    those constraints tight and solving the k x k system. All systems of one
+    size are solved in a single batched call.
+
+    Args:
+        A: (m, n) non-negative constraint matrix, m small
+        b: (m,) non-negative bounds
+        c: (n,) objective
+
+    Returns:
+        An optimal x
+    """
+    m, n = A.shape
+    best, best_value = np.zeros(n), 0.0
+    for k in range(1, min(m, n) + 1):
+        variables = np.array(list(combinations(range(n), k)))
+        rows = np.array(list(combinations(range(m), k)))
+        var_idx = np.repeat(variables, len(rows), axis=0)
+        row_idx = np.tile(rows, (len(variables), 1))
+
+        systems = A[row_idx[:, :, None], var_idx[:, None, :]]
+        regular = np.abs(np.linalg.det(systems)) > 1e-12
+        if not regular.any():
+            continue
+        var_idx, row_idx, systems = var_idx[regular], row_idx[regular], systems[regular]
+        solutions = np.linalg.solve(systems, b[row_idx][:, :, None])[:, :, 0]
+
+        candidates = np.zeros((len(solutions), n))
+        np.put_along_axis(candidates, var_idx, solutions, axis=1)
+        feasible = (candidates >= -1e-9).all(axis=1) & (
+            candidates @ A.T <= b * (1 + 1e-9) + 1e-9
+        ).all(axis=1)
+        if not feasible.any():
+            continue
+        values = candidates[feasible] @ c
+        if values.max() > best_value:
+            best_value = values.max()
+            best = np.maximum(candidates[feasible][values.argmax()], 0.0)
+    return best
+
+
+def _greedy_fill(
+    A: np.ndarray, b: np.ndarray, counts: np.ndarray, order: Sequence[int]
+) -> np.ndarray:
+    """Add as many trees of each species in order as the slack allows."""
+    counts = counts.copy()
+    for i in order:
+        uses = A[:, i] > 0
+        slack = b - A @ counts
+        counts[i] += max(0, int(np.floor(np.min(slack[uses] / A[uses, i]) + 1e-9)))
+    return counts
+
+
+def _integer_solution(
+    A: np.ndarray, b: np.ndarray, c: np.ndarray, x: np.ndarray
+) -> np.ndarray:
+    """
+    Turn an LP solution into whole trees.
+
+    The LP solution has at most one nonzero count per constraint. Each of
+    those counts is rounded down by 0 to ROUNDING_STEPS trees, and the slack
+    left is filled greedily. Species are ranked once by CO2 per tree and once
+    by CO2 per share of each constraint. The best solution is then improved
+    by swapping a few trees of one species at a time for other species.
+    """
+    base = np.floor(x + 1e-9).astype(np.int64)
+    basic = np.flatnonzero(base)
+    # Share of each constraint one tree uses, to rank species by efficiency
+    usage = A / np.where(b > 0, b, 1.0)[:, None]
+    orders = [np.argsort(-c, kind="stable")] + [
+        np.argsort(-c / np.maximum(row, 1e-300), kind="stable") for row in usage
+    ]
+
+    def fill(start: np.ndarray, last: int = -1) -> np.ndarray:
+        """Best greedy fill of start, trying species last at the end"""
+        fills = [
+            _greedy_fill(A, b, start, [i for i in order.tolist() if i != last] + [last])
+            if last >= 0
+            else _greedy_fill(A, b, start, order.tolist())
+            for order in orders
+        ]
+        return max(fills, key=lambda counts: counts @ c)
+
+    best = base
+    for steps in product(range(ROUNDING_STEPS + 1), repeat=len(basic)):
+        start = base.copy()
+        start[basic] = np.maximum(base[basic] - steps, 0)
+        counts = fill(start)
+        if counts @ c > best @ c:
+            best = counts
+
+    # Local search: swap a few trees of one species for others
+    improved = True
+    while improved:
+        improved = False
+        for i in np.flatnonzero(best).tolist():
+            for step in range(1, ROUNDING_STEPS + 1):
+                start = best.copy()
+                start[i] = max(start[i] - step, 0)
+                counts = fill(start, last=i)
+                if counts @ c > best @ c + 1e-9:
+                    best, improved = counts, True
+                    break
+            if improved:
+                break
+    return best
+
+
+def optimize_species_mix(
+    asphalt_sqft: float,
+    budget: float,
+    water_cap: Optional[float] = None,
+    spacing_sqft_per_tree: float = 100.0,
+    cost_removal_per_sqft: float = 10.0,
+    maintenance_years: int = 5,
+    species: Optional[Sequence[Species]] = None,
+) -> Dict:
+    """
+    Find the tree counts per species that maximize CO2 reduction.
+
+    Uses the cost and CO2 model of plan_asphalt_conversion: the whole area is
+    cleared, at most one tree fits per spacing_sqft_per_tree, and each tree
+    costs its planting cost plus maintenance_years of maintenance and
+    captures co2_per_year for maintenance_years.
+
+    Args:
+        asphalt_sqft: Square feet of asphalt to remove
+        budget: Total budget for removal, planting and maintenance
+        water_cap: Maximum yearly water requirement of all trees, None for
+            no cap
+        spacing_sqft_per_tree: Square feet allocated per tree
+        cost_removal_per_sqft: Cost to remove asphalt per square foot
+        maintenance_years: Years of maintenance and CO2 reduction
+        species: Species that may be planted, all if None
+
+    Returns:
+        Tree counts and the resulting species distribution, costs, water use
+        and CO2 reduction, the LP upper bound on CO2 reduction and the
+        constraints that stop further planting
+
+    Raises:
+        ValueError: If the budget does not cover the asphalt removal
+    """
+    removal_cost = asphalt_sqft * cost_removal_per_sqft
+    if budget < removal_cost:
+        raise ValueError(
+            f"Budget {budget:,.2f} does not cover the asphalt removal "
+            f"cost of {removal_cost:,.2f}"
+        )
+
+    # A species listed twice would otherwise get two columns whose counts
+    # overwrite each other in the per-species result
+    allowed = np.unique(species_codes(species or SPECIES))
+    table = SPECIES_TABLE[allowed]
+    planting = table["planting_cost"]
+    maintenance = table["maintenance_cost"] * maintenance_years
+    water = table["water_requirement"]
+    co2 = table["co2_per_year"] * maintenance_years
+
+    A = np.array([np.ones(len(allowed)), planting + maintenance, water])
+    b = np.array(
+        [
+            np.floor(asphalt_sqft / spacing_sqft_per_tree),
+            budget - removal_cost,
+            np.inf if water_cap is None else water_cap,
+        ]
+    )
+    constrained = np.isfinite(b)
+    A, b = A[constrained], b[constrained]
+    names: List[str] = [name for name, used in zip(CONSTRAINTS, constrained) if used]
+
+    relaxed = _lp_optimum(A, b, co2)
+    counts = _integer_solution(A, b, co2, relaxed)
+
+    slack = b - A @ counts
+    binding = [
+        name for name, row, left in zip(names, A, slack) if (row > left).all()
+    ]
+    total_trees = int(counts.sum())
+    planting_cost = float(counts @ planting)
+    maintenance_cost = float(counts @ maintenance)
+    labels = [SPECIES_NAMES[code] for code in allowed.tolist()]
+    return {
+        "trees_planted_per_species": dict(zip(labels, counts.tolist())),
+        "species_distribution": {
+            label: count / total_trees
+            for label, count in zip(labels, counts.tolist())
+            if count
+        },
+        "total_trees": total_trees,
+        "asphalt_removal_cost": removal_cost,
+        "planting_cost": planting_cost,
+        "total_maintenance_cost": maintenance_cost,
+        "total_cost": removal_cost + planting_cost + maintenance_cost,
+        "annual_water_requirement": float(counts @ water),
+        "total_co2_reduction_kg": float(counts @ co2),
+        "co2_upper_bound_kg": float(relaxed @ co2),
+        "binding_constraints": binding,
+    }
@@ -0,0 +1,41 @@
+import hashlib
+from typing import Hashable
+
+from services.cache import LRUCache
+
+# Generated tree batches kept in memory, bounded by their total size in bytes
+TREE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+tree_result_cache = LRUCache(TREE_CACHE_MAX_BYTES, sizeof=lambda batch: batch.nbytes)
+
+
+def scenario_etag(key: Hashable, media_type: str) -> str:
+    """
+    Strong ETag for a reproducible tree scenario in a given representation.
+
+    Args:
+        key: Everything the generated trees depend on, including the seed and
+            the dataset version
+        media_type: Media type of the response body
+
+    Returns:
+        Quoted ETag value
+    """
+    digest = hashlib.blake2b(repr((key, media_type)).encode(), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag, using weak comparison.
+
+    Args:
+        if_none_match: Raw If-None-Match header value, possibly empty
+        etag: Quoted ETag of the current representation
+
+    Returns:
+        True if the client's cached copy is still current
+    """
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(
+        candidate.removeprefix("W/") == etag for candidate in candidates
+    )
@@ -0,0 +1,269 @@
+import struct
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+from fastapi.responses import Response, StreamingResponse
+from schemas.species import SPECIES, SPECIES_NAMES
+from scripts.tree_generation import (RectangleRandom, TreeBatch,
+                                     TreePlacement, generate_tree_batch)
+from services.rectangle_store import RectangleStore
+
+JSON_MEDIA_TYPE = "application/json"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+BINARY_MEDIA_TYPE = "application/vnd.forest-vision.trees"
+
+# Binary tree payload, all fields little-endian:
+#
+#   offset  size          field
+#   0       4             magic b"FVTR"
+#   4       2             format version (uint16)
+#   6       2             number of tree type codes (uint16)
+#   8       4             number of trees N (uint32)
+#   12      4             reserved, zero (uint32)
+#   16      8             origin longitude (float64)
+#   24      8             origin latitude (float64)
+#   32      8 * N         positions, float32 (longitude, latitude) offsets in
+#                         degrees from the origin, interleaved
+#   32+8N   N             tree type codes (uint8), indexing SPECIES
+#
+# Positions can be handed to deck.gl as a Float32Array with
+# COORDINATE_SYSTEM.LNGLAT_OFFSETS and coordinateOrigin set to the origin,
+# which keeps sub-centimeter precision despite the float32 storage.
+BINARY_MAGIC = b"FVTR"
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct("<4sHHIIdd")
+
+# Number of rectangles generated per streamed chunk
+STREAM_CHUNK_RECTANGLES = 5_000
+
+# Number of trees per streamed chunk of an already generated batch
+STREAM_CHUNK_TREES = 100_000
+
+# Response header reporting how many trees deduplication removed
+TREES_REMOVED_HEADER = "X-Trees-Removed"
+
+
+def negotiate_tree_media_type(accept: str, stream: bool = False) -> str:
+    """
+    Pick the representation of a /trees/ response.
+
+    Args:
+        accept: Raw Accept header value, possibly empty
+        stream: Whether streaming was requested through the query string
+
+    Returns:
+        NDJSON_MEDIA_TYPE, BINARY_MEDIA_TYPE or JSON_MEDIA_TYPE
+    """
+    if stream or NDJSON_MEDIA_TYPE in accept:
+        return NDJSON_MEDIA_TYPE
+    if BINARY_MEDIA_TYPE in accept:
+        return BINARY_MEDIA_TYPE
+    return JSON_MEDIA_TYPE
+
+
+def encode_ndjson(batch: TreeBatch) -> bytes:
+    """
+    Serialize a batch of trees as newline-delimited JSON, one Tree per line.
+
+    Args:
+        batch: Trees to serialize
+
+    Returns:
+        UTF-8 encoded NDJSON, each line matching the Tree schema
+    """
+    return "".join(
+        [
+            f'{{"latitude":{lat!r},"longitude":{long!r},'
+            f'"tree_type":"{SPECIES_NAMES[code]}"}}\n'
+            for lat, long, code in zip(
+                batch.latitude.tolist(),
+                batch.longitude.tolist(),
+                batch.tree_type.tolist(),
+            )
+        ]
+    ).encode()
+
+
+def encode_binary(batch: TreeBatch) -> bytes:
+    """
+    Serialize a batch of trees in the compact binary layout described above.
+
+    Args:
+        batch: Trees to serialize
+
+    Returns:
+        Header followed by the position and tree type arrays
+    """
+    if len(batch):
+        origin_long = (float(batch.longitude.min()) + float(batch.longitude.max())) / 2
+        origin_lat = (float(batch.latitude.min()) + float(batch.latitude.max())) / 2
+    else:
+        origin_long = origin_lat = 0.0
+
+    positions = np.empty((len(batch), 2), dtype="<f4")
+    positions[:, 0] = batch.longitude - origin_long
+    positions[:, 1] = batch.latitude - origin_lat
+
+    header = BINARY_HEADER.pack(
+        BINARY_MAGIC,
+        BINARY_VERSION,
+        len(SPECIES),
+        len(batch),
+        0,
+        origin_long,
+        origin_lat,
+    )
+    return header + positions.tobytes() + batch.tree_type.astype(np.uint8).tobytes()
+
+
+def decode_binary(payload: bytes) -> TreeBatch:
+    """
+    Parse a payload written by encode_binary back into a TreeBatch.
+
+    Args:
+        payload: Binary tree payload
+
+    Returns:
+        TreeBatch with float32-precision offsets added back to the origin
+    """
+    magic, version, _, count, _, origin_long, origin_lat = BINARY_HEADER.unpack_from(
+        payload
+    )
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise ValueError("Not a binary tree payload")
+
+    offset = BINARY_HEADER.size
+    positions = np.frombuffer(payload, dtype="<f4", count=count * 2, offset=offset)
+    tree_type = np.frombuffer(
+        payload, dtype=np.uint8, count=count, offset=offset + positions.nbytes
+    )
+    positions = positions.reshape(count, 2).astype(np.float64)
+    return TreeBatch(
+        positions[:, 1] + origin_lat, positions[:, 0] + origin_long, tree_type.copy()
+    )
+
+
+def binary_trees_response(
+    batch: TreeBatch, headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """
+    Build a response carrying trees in the compact binary layout.
+
+    The X-Tree-Types header lists tree type values in code order.
+
+    Args:
+        batch: Trees to send
+        headers: Extra response headers
+
+    Returns:
+        Response with the binary payload
+    """
+    return Response(
+        content=encode_binary(batch),
+        media_type=BINARY_MEDIA_TYPE,
+        headers={"X-Tree-Types": ",".join(SPECIES_NAMES), **(headers or {})},
+    )
+
+
+def iter_tree_batches(
+    rectangles: RectangleStore,
+    trees_per_square_meter: float,
+    chunk_size: int = STREAM_CHUNK_RECTANGLES,
+    rng: Optional[np.random.Generator] = None,
+    species_mix: Optional[np.ndarray] = None,
+    placement: TreePlacement = TreePlacement.UNIFORM,
+) -> Iterator[TreeBatch]:
+    """
+    Generate trees chunk by chunk of rectangles.
+
+    Only one chunk of trees is held in memory at a time, so peak memory is
+    bounded by the chunk size rather than the total tree count. Rectangles
+    are keyed by their position across all chunks, so the trees match those
+    generate_tree_batch draws from the same generator in one go.
+
+    Args:
+        rectangles: Rectangles to populate with trees
+        trees_per_square_meter: Density of trees (trees per square meter)
+        chunk_size: Number of rectangles per chunk
+        rng: Random generator to draw from, a fresh one if not given
+        species_mix: Species fractions per area type, None for uniform
+        placement: How trees are positioned inside their rectangle
+
+    Yields:
+        One TreeBatch per chunk of rectangles
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    random = RectangleRandom.from_generator(rng, len(rectangles))
+
+    for start in range(0, len(rectangles), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        yield generate_tree_batch(
+            rectangles.take(chunk),
+            trees_per_square_meter,
+            random.take(chunk),
+            species_mix,
+            placement,
+        )
+
+
+def stream_trees_ndjson(
+    rectangles: RectangleStore,
+    trees_per_square_meter: float,
+    rng: Optional[np.random.Generator] = None,
+    headers: Optional[Dict[str, str]] = None,
+    species_mix: Optional[np.ndarray] = None,
+    placement: TreePlacement = TreePlacement.UNIFORM,
+) -> StreamingResponse:
+    """
+    Stream generated trees as NDJSON while they are being generated.
+
+    Args:
+        rectangles: Rectangles to populate with trees
+        trees_per_square_meter: Density of trees (trees per square meter)
+        rng: Random generator to draw from, a fresh one if not given
+        headers: Extra response headers
+        species_mix: Species fractions per area type, None for uniform
+        placement: How trees are positioned inside their rectangle
+
+    Returns:
+        StreamingResponse writing one chunk of NDJSON per rectangle chunk
+    """
+    chunks = (
+        encode_ndjson(batch)
+        for batch in iter_tree_batches(
+            rectangles,
+            trees_per_square_meter,
+            STREAM_CHUNK_RECTANGLES,
+            rng,
+            species_mix,
+            placement,
+        )
+    )
+    return StreamingResponse(chunks, media_type=NDJSON_MEDIA_TYPE, headers=headers)
+
+
+def stream_batch_ndjson(
+    batch: TreeBatch,
+    headers: Optional[Dict[str, str]] = None,
+    chunk_size: int = STREAM_CHUNK_TREES,
+) -> StreamingResponse:
+    """
+    Stream an already generated batch of trees as NDJSON.
+
+    Used when trees must all be generated before the response starts, e.g.
+    to deduplicate them across rectangles.
+
+    Args:
+        batch: Trees to send
+        headers: Extra response headers
+        chunk_size: Number of trees per chunk
+
+    Returns:
+        StreamingResponse writing one chunk of NDJSON per chunk of trees
+    """
+    chunks = (
+        encode_ndjson(batch.take(slice(start, start + chunk_size)))
+        for start in range(0, len(batch), chunk_size)
+    )
+    return StreamingResponse(chunks, media_type=NDJSON_MEDIA_TYPE, headers=headers)
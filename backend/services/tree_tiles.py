@@ -0,0 +1,190 @@
+from typing import Optional, Tuple
+
+import mapbox_vector_tile
+import mercantile
+import numpy as np
+import shapely
+from schemas.species import SPECIES_NAMES
+from scripts.tree_generation import (RectangleRandom, TreeBatch,
+                                     TreePlacement, generate_tree_batch)
+from services.cache import LRUCache
+from services.rectangle_store import RectangleStore
+from services.spatial_index import GridIndex
+
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+TILE_EXTENT = 4096
+TREE_LAYER_NAME = "trees"
+
+# Lowest zoom level served; tiles below it would span most of the city
+TREE_TILE_MIN_ZOOM = 13
+
+# Seed of unseeded tiles, fixed so that neighbouring tiles agree on the trees
+# of the rectangles they share, whichever worker renders them
+DEFAULT_TILE_SEED = 0
+
+# Encoded tiles kept in memory, bounded by their total size in bytes
+TILE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+tile_cache = LRUCache(TILE_CACHE_MAX_BYTES, sizeof=len)
+
+# Fractional part of i * (golden ratio - 1) is evenly spread over [0, 1)
+_SELECTION_STEP = 0.6180339887498949
+
+
+def select_rectangles(indices: np.ndarray, percentage: float) -> np.ndarray:
+    """
+    Pick a stable fraction of rectangles by row index.
+
+    Whether a rectangle is selected depends only on its row index, so
+    neighbouring tiles agree on the selection and a rectangle spanning
+    several tiles is either drawn in all of them or in none.
+
+    Args:
+        indices: Row indices into the rectangle store
+        percentage: Fraction of rectangles to keep (0.0 to 1.0)
+
+    Returns:
+        The selected subset of indices
+    """
+    return indices[np.modf(indices * _SELECTION_STEP)[0] < percentage]
+
+
+def generate_rectangle_trees(
+    rectangles: RectangleStore,
+    indices: np.ndarray,
+    trees_per_square_meter: float,
+    seed: int,
+    placement: TreePlacement = TreePlacement.UNIFORM,
+    species_mix: Optional[np.ndarray] = None,
+) -> TreeBatch:
+    """
+    Generate the trees of some rectangles, each from its own random states.
+
+    Every rectangle is keyed by its row index (see RectangleRandom), so a
+    rectangle spanning several tiles gets the same trees in each of them, at
+    every zoom level, while the selection is generated in one batch.
+
+    Args:
+        rectangles: Rectangle store
+        indices: Row indices of the rectangles to populate
+        trees_per_square_meter: Density of trees (trees per square meter)
+        seed: Random seed of the scenario
+        placement: How trees are positioned inside their rectangle
+        species_mix: Species fractions per area type, None for uniform
+
+    Returns:
+        TreeBatch with the trees of each rectangle, in indices order
+    """
+    return generate_tree_batch(
+        rectangles.take(indices),
+        trees_per_square_meter,
+        RectangleRandom(seed, indices),
+        species_mix,
+        placement,
+    )
+
+
+def _tile_pixels(
+    batch: TreeBatch, tile: mercantile.Tile
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Project trees to Web Mercator pixel coordinates within a tile, y down."""
+    scale = 2**tile.z
+    x = (batch.longitude + 180.0) / 360.0 * scale - tile.x
+    sin_lat = np.sin(np.radians(batch.latitude))
+    y = (
+        0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * np.pi)
+    ) * scale - tile.y
+    return x * TILE_EXTENT, y * TILE_EXTENT
+
+
+def encode_tree_tile(batch: TreeBatch, tile: mercantile.Tile) -> bytes:
+    """
+    Encode the trees falling inside a tile as a Mapbox Vector Tile.
+
+    Trees are grouped into one MultiPoint feature per tree type in the
+    "trees" layer, with a tree_type and count property.
+
+    Args:
+        batch: Trees to encode; trees outside the tile are dropped
+        tile: Tile to encode
+
+    Returns:
+        Encoded (uncompressed) MVT bytes
+    """
+    x, y = _tile_pixels(batch, tile)
+    inside = (x >= 0) & (x < TILE_EXTENT) & (y >= 0) & (y < TILE_EXTENT)
+    x, y, codes = x[inside], y[inside], batch.tree_type[inside]
+
+    features = []
+    for code in np.unique(codes).tolist():
+        of_type = codes == code
+        features.append(
+            {
+                "geometry": shapely.multipoints(
+                    np.column_stack([x[of_type], y[of_type]])
+                ),
+                "properties": {
+                    "tree_type": SPECIES_NAMES[code],
+                    "count": int(of_type.sum()),
+                },
+            }
+        )
+
+    return mapbox_vector_tile.encode(
+        {"name": TREE_LAYER_NAME, "features": features},
+        default_options={"extents": TILE_EXTENT, "y_coord_down": True},
+    )
+
+
+def get_tree_tile(
+    spatial_index: GridIndex,
+    tile: mercantile.Tile,
+    percentage: float,
+    trees_per_square_meter: float,
+    seed: Optional[int] = None,
+    placement: TreePlacement = TreePlacement.UNIFORM,
+    species_mix: Optional[np.ndarray] = None,
+) -> bytes:
+    """
+    Return the encoded tree tile for a scenario, generating it on a cache miss.
+
+    Args:
+        spatial_index: Grid index over the rectangle store
+        tile: Tile to render
+        percentage: Fraction of rectangles to plant (0.0 to 1.0)
+        trees_per_square_meter: Density of trees (trees per square meter)
+        seed: Random seed, DEFAULT_TILE_SEED if not given
+        placement: How trees are positioned inside their rectangle
+        species_mix: Species fractions per area type, None for uniform
+
+    Returns:
+        Encoded MVT bytes
+    """
+    key = (
+        spatial_index.rectangles.version,
+        tile,
+        percentage,
+        trees_per_square_meter,
+        seed,
+        placement,
+        None if species_mix is None else species_mix.tobytes(),
+    )
+    cached = tile_cache.get(key)
+    if cached is not None:
+        return cached
+
+    west, south, east, north = mercantile.bounds(tile)
+    indices = select_rectangles(
+        spatial_index.query(west, south, east, north), percentage
+    )
+    batch = generate_rectangle_trees(
+        spatial_index.rectangles,
+        indices,
+        trees_per_square_meter,
+        DEFAULT_TILE_SEED if seed is None else seed,
+        placement,
+        species_mix,
+    )
+    # Trees of rectangles crossing the tile edge are clipped by the encoder
+    encoded = encode_tree_tile(batch, tile)
+    tile_cache.put(key, encoded)
+    return encoded
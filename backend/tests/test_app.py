@@ -1,15 +1,28 @@
+import gzip
+import json
+import sqlite3
+
+import mapbox_vector_tile
+import mercantile
 import pytest
 from fastapi.testclient import TestClient
 from app import app
+from services.basemap import (BASEMAP_CACHE_ENTRY_BYTES, BASEMAP_MBTILES_ENV,
+                               MBTilesReader)
+from services.rectangle_store import get_rectangle_store
+from services import tree_responses
+from services.tree_responses import BINARY_MEDIA_TYPE, decode_binary
 
 client = TestClient(app)
 
+
 def test_health_check():
     """Test the health check endpoint"""
     response = client.get("/health")
     assert response.status_code == 200
     assert response.json() == {"status": "healthy"}
 
+
 def test_get_trees():
     """Test the tree generation endpoint with various parameters"""
     # Test with default parameters
@@ -36,6 +49,189 @@ def test_get_trees():
     assert isinstance(trees, list)
     assert len(trees) > 0
 
+
+def test_get_trees_stream():
+    """Test NDJSON streaming of generated trees"""
+    params = {"percentage": 0.5, "trees_per_square_meter": 0.01, "stream": True}
+    response = client.get("/trees/", params=params)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = response.text.splitlines()
+    assert len(lines) > 0
+    tree = json.loads(lines[0])
+    assert set(tree) == {"latitude", "longitude", "tree_type"}
+
+    # Streaming can also be requested through the Accept header
+    response = client.get(
+        "/trees/",
+        params={"trees_per_square_meter": 0.01},
+        headers={"Accept": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) > 0
+
+
+def test_get_trees_binary():
+    """Test the compact binary tree payload"""
+    response = client.get(
+        "/trees/",
+        params={"trees_per_square_meter": 0.01},
+        headers={"Accept": BINARY_MEDIA_TYPE},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == BINARY_MEDIA_TYPE
+    assert response.headers["x-tree-types"].split(",")[0] == "coast_live_oak"
+
+    batch = decode_binary(response.content)
+    assert len(batch) > 0
+    assert len(response.content) == 32 + 9 * len(batch)
+    assert 37.6 < batch.latitude.min() and batch.latitude.max() < 37.9
+    assert -122.6 < batch.longitude.min() and batch.longitude.max() < -122.3
+
+
+def test_get_trees_viewport():
+    """Test restricting tree generation to a viewport"""
+    viewport = {
+        "min_lon": -122.45,
+        "min_lat": 37.76,
+        "max_lon": -122.40,
+        "max_lat": 37.80,
+    }
+    response = client.get(
+        "/trees/", params={"trees_per_square_meter": 0.01, **viewport}
+    )
+    assert response.status_code == 200
+    trees = response.json()
+    assert len(trees) > 0
+    # Rectangles are at most 18m, so trees stay within ~25m of the viewport
+    assert all(tree["longitude"] > viewport["min_lon"] - 3e-4 for tree in trees)
+    assert all(tree["latitude"] < viewport["max_lat"] + 3e-4 for tree in trees)
+
+    # A viewport with no rectangles yields no trees
+    response = client.get(
+        "/trees/",
+        params={"min_lon": 0.0, "min_lat": 0.0, "max_lon": 1.0, "max_lat": 1.0},
+    )
+    assert response.status_code == 200
+    assert response.json() == []
+
+    # Partial viewports are rejected
+    response = client.get("/trees/", params={"min_lon": -122.45})
+    assert response.status_code == 422
+
+
+def test_get_tree_aggregate():
+    """Test aggregated tree counts per grid cell"""
+    params = {"percentage": 0.5, "trees_per_square_meter": 0.05, "seed": 7}
+    response = client.get(
+        "/trees/aggregate/", params={**params, "cell_size_degrees": 0.02}
+    )
+    assert response.status_code == 200
+    result = response.json()
+    cells = result["cells"]
+    assert len(cells) > 0
+    assert sum(cell["trees"] for cell in cells) == result["total_trees"]
+
+    # Counts match the trees generated with the same seed
+    trees = client.get("/trees/", params=params).json()
+    assert result["total_trees"] == len(trees)
+
+    cell = cells[0]
+    assert sum(cell["trees_per_species"].values()) == pytest.approx(cell["trees"])
+    assert cell["co2_per_year_kg"] > 0
+
+    response = client.get("/trees/aggregate/", params={"cell_size_degrees": 0})
+    assert response.status_code == 422
+
+
+def test_get_tree_tile():
+    """Test the tree vector tile endpoint"""
+    tile = mercantile.tile(-122.43, 37.77, 13)
+    url = f"/trees/tiles/{tile.z}/{tile.x}/{tile.y}.mvt"
+    params = {"trees_per_square_meter": 0.05}
+    response = client.get(url, params=params)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.mapbox-vector-tile"
+
+    layer = mapbox_vector_tile.decode(response.content)["trees"]
+    assert len(layer["features"]) > 0
+    assert sum(f["properties"]["count"] for f in layer["features"]) > 0
+
+    # Repeated requests are answered from the tile cache
+    assert client.get(url, params=params).content == response.content
+
+    # Tiles away from the data are empty, tiles outside the zoom level are 404
+    response = client.get("/trees/tiles/13/0/0.mvt")
+    assert response.status_code == 200
+    assert mapbox_vector_tile.decode(response.content)["trees"]["features"] == []
+    assert client.get("/trees/tiles/2/4/0.mvt").status_code == 404
+
+    # Tiles below the minimum zoom are not generated
+    parent = mercantile.parent(tile)
+    response = client.get(f"/trees/tiles/{parent.z}/{parent.x}/{parent.y}.mvt")
+    assert response.status_code == 204
+
+
+def test_get_trees_sampling_methods():
+    """Test each rectangle sampling method"""
+    for method in ["uniform", "area_weighted", "stratified"]:
+        params = {"percentage": 0.5, "trees_per_square_meter": 0.01, "sampling": method}
+        response = client.get("/trees/", params=params)
+        assert response.status_code == 200
+        assert len(response.json()) > 0
+
+    response = client.get("/trees/", params={"sampling": "random"})
+    assert response.status_code == 422
+
+
+def test_get_trees_seeded():
+    """Test reproducible, cacheable tree generation with a seed"""
+    params = {"percentage": 0.5, "trees_per_square_meter": 0.01, "seed": 42}
+    first = client.get("/trees/", params=params)
+    second = client.get("/trees/", params=params)
+    assert first.status_code == 200
+    assert first.json() == second.json()
+    etag = first.headers["etag"]
+    assert second.headers["etag"] == etag
+
+    # Streams with the same seed are reproducible too
+    streamed = [
+        client.get("/trees/", params={**params, "stream": True}).text
+        for _ in range(2)
+    ]
+    assert streamed[0] == streamed[1]
+
+    # A different seed gives different trees
+    other = client.get("/trees/", params={**params, "seed": 43})
+    assert other.headers["etag"] != etag
+    assert other.json() != first.json()
+
+    # Clients holding the current representation get 304 Not Modified
+    response = client.get("/trees/", params=params, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+    # Unseeded requests are not cacheable
+    assert "etag" not in client.get("/trees/", params={"percentage": 0.5}).headers
+
+
+def test_get_trees_stream_matches_json(monkeypatch):
+    """Streamed trees, generated chunk by chunk, match the JSON response"""
+    monkeypatch.setattr(tree_responses, "STREAM_CHUNK_RECTANGLES", 4)
+    assert len(get_rectangle_store()) * 0.5 > 2 * 4
+    for placement in ["uniform", "crown_spacing"]:
+        params = {
+            "percentage": 0.5,
+            "trees_per_square_meter": 0.01,
+            "seed": 11,
+            "placement": placement,
+        }
+        trees = client.get("/trees/", params=params).json()
+        streamed = client.get("/trees/", params={**params, "stream": True})
+        lines = [json.loads(line) for line in streamed.text.splitlines()]
+        assert lines == trees
+
+
 def test_asphalt_conversion():
     """Test the asphalt conversion planning endpoint"""
     test_data = {
@@ -66,6 +262,7 @@ def test_asphalt_conversion():
     assert result["co2_sequestration"] > 0
     assert result["maintenance_cost"] > 0
 
+
 def test_invalid_parameters():
     """Test error handling for invalid parameters"""
     # Test invalid percentage
@@ -88,5 +285,235 @@ def test_invalid_parameters():
     response = client.post("/asphalt-conversion/", json=invalid_data)
     assert response.status_code == 422
 
+
+def test_get_basemap_tile(tmp_path, monkeypatch):
+    """Basemap tiles are read from MBTiles with TMS rows, gzip passed through"""
+    tile = mapbox_vector_tile.encode(
+        [{"name": "water", "features": [{"geometry": "POINT (1 1)", "properties": {}}]}]
+    )
+    path = tmp_path / "basemap.mbtiles"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE tiles (zoom_level integer, tile_column integer, "
+        "tile_row integer, tile_data blob)"
+    )
+    # XYZ tile 1/0/0 is TMS row 1
+    conn.execute("INSERT INTO tiles VALUES (1, 0, 1, ?)", (gzip.compress(tile),))
+    conn.commit()
+    conn.close()
+
+    response = client.get("/basemap/1/0/0.pbf")
+    assert response.status_code == 404
+
+    monkeypatch.setenv(BASEMAP_MBTILES_ENV, str(path))
+    response = client.get("/basemap/1/0/0.pbf")
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.content == tile
+    assert "water" in mapbox_vector_tile.decode(response.content)
+
+    response = client.get(
+        "/basemap/1/0/0.pbf", headers={"Accept-Encoding": "identity"}
+    )
+    assert "content-encoding" not in response.headers
+    assert response.content == tile
+
+    assert client.get("/basemap/1/0/1.pbf").status_code == 204
+    assert client.get("/basemap/1/2/0.pbf").status_code == 404
+
+    # Missing tiles are cached, but still count against the byte budget
+    reader = MBTilesReader(
+        path, pool_size=1, cache_max_bytes=10 * BASEMAP_CACHE_ENTRY_BYTES
+    )
+    for y in range(100):
+        assert reader.get_tile(20, 0, y) is None
+    assert len(reader.cache) == 10
+    reader.close()
+
+
+def test_sweep_asphalt_conversion():
+    """Scenario sweeps stream one NDJSON line per scenario"""
+    scenario = {
+        "asphalt_sqft": 1000.0,
+        "species_distribution": {"coast_live_oak": 0.5, "redwood": 0.5},
+    }
+    response = client.post(
+        "/asphalt-conversion/sweep/", json={"scenarios": [scenario, scenario]}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["scenario"] for row in rows] == [0, 1]
+    assert rows[0]["trees_planted_per_species"] == {"coast_live_oak": 5, "redwood": 5}
+
+    grid = {
+        "asphalt_sqft": [1000.0, 2000.0, 3000.0],
+        "species_distributions": [{"redwood": 1.0}],
+        "maintenance_years": [1, 10],
+    }
+    response = client.post("/asphalt-conversion/sweep/", json={"grid": grid})
+    assert len(response.text.splitlines()) == 6
+
+    response = client.post(
+        "/asphalt-conversion/sweep/", json={"grid": grid, "scenarios": [scenario]}
+    )
+    assert response.status_code == 422
+
+    for invalid in (
+        {"spacing_sqft_per_tree": [0.0, 100.0]},
+        {"asphalt_sqft": [1000.0, -5.0]},
+        {"cost_removal_per_sqft": [-1.0]},
+        {"maintenance_years": [0]},
+    ):
+        response = client.post(
+            "/asphalt-conversion/sweep/", json={"grid": {**grid, **invalid}}
+        )
+        assert response.status_code == 422
+
+
+def test_project_asphalt_conversion():
+    """Projections return one value per year for each planted species"""
+    params = {
+        "asphalt_sqft": 1000.0,
+        "species_distribution": {"redwood": 1.0},
+        "horizon_years": 20,
+    }
+    response = client.post("/asphalt-conversion/projection/", json=params)
+    assert response.status_code == 200
+    result = response.json()
+    assert result["years"] == list(range(1, 21))
+    assert list(result["species"]) == ["redwood"]
+    assert result["species"]["redwood"]["trees"] == 10
+    for series in result["total"].values():
+        assert len(series) == 20
+
+
+def test_optimize_asphalt_conversion():
+    """The optimizer stays within budget and rejects budgets below removal"""
+    params = {"asphalt_sqft": 5000.0, "budget": 80_000.0, "water_cap": 3000.0}
+    response = client.post("/asphalt-conversion/optimize/", json=params)
+    assert response.status_code == 200
+    result = response.json()
+    assert result["total_cost"] <= params["budget"]
+    assert result["annual_water_requirement"] <= params["water_cap"]
+    assert result["total_co2_reduction_kg"] <= result["co2_upper_bound_kg"] + 1e-6
+
+    params["budget"] = 1000.0
+    response = client.post("/asphalt-conversion/optimize/", json=params)
+    assert response.status_code == 422
+
+
+def test_rollup_asphalt_conversion():
+    """Parking lots are rolled up by district and neighborhood"""
+    params = {"region_key": "neighborhood", "species_distribution": {"redwood": 1.0}}
+    response = client.post("/asphalt-conversion/rollup/", json=params)
+    assert response.status_code == 200
+    result = response.json()
+    regions = [row["region"] for row in result["regions"]]
+    assert "Outer Richmond" in regions
+    assert result["total"]["tree_capacity"] == sum(
+        row["tree_capacity"] for row in result["regions"]
+    )
+
+    params.update(region_key="district", regions=["3"], percentage=0.5)
+    response = client.post("/asphalt-conversion/rollup/", json=params)
+    assert response.status_code == 200
+    district = response.json()["regions"][0]
+    assert district["region"] == "3"
+    assert district["asphalt_sqft"] == pytest.approx(district["parking_area_sqft"] / 2)
+
+    params["regions"] = ["99"]
+    response = client.post("/asphalt-conversion/rollup/", json=params)
+    assert response.status_code == 422
+
+
+def test_get_trees_species_distribution():
+    """Generated species and aggregate counts follow the requested mix"""
+    params = {
+        "trees_per_square_meter": 0.05,
+        "seed": 3,
+        "species_distribution": "redwood:0.25,london_plane:0.75",
+    }
+    trees = client.get("/trees/", params=params).json()
+    assert {tree["tree_type"] for tree in trees} == {"redwood", "london_plane"}
+
+    result = client.get("/trees/aggregate/", params=params).json()
+    totals = {}
+    for cell in result["cells"]:
+        for species, count in cell["trees_per_species"].items():
+            totals[species] = totals.get(species, 0) + count
+    assert totals["redwood"] == pytest.approx(result["total_trees"] * 0.25)
+    assert totals["coast_live_oak"] == 0
+
+    # Parking lots use their default mix instead
+    response = client.get("/trees/", params={**params, "area_type_defaults": True})
+    assert {tree["tree_type"] for tree in response.json()} <= {
+        "coast_live_oak",
+        "western_sycamore",
+        "london_plane",
+    }
+
+    # Tiles follow the same mix
+    tile = mercantile.tile(-122.43, 37.77, 13)
+    response = client.get(
+        f"/trees/tiles/{tile.z}/{tile.x}/{tile.y}.mvt", params=params
+    )
+    features = mapbox_vector_tile.decode(response.content)["trees"]["features"]
+    assert {f["properties"]["tree_type"] for f in features} == {
+        "redwood",
+        "london_plane",
+    }
+
+    invalid_distributions = (
+        "redwood:0.5",
+        "redwood",
+        "birch:1.0",
+        "redwood:nan,london_plane:1.0",
+        "redwood:inf,london_plane:-inf",
+    )
+    for invalid in invalid_distributions:
+        response = client.get(
+            "/trees/", params={**params, "species_distribution": invalid}
+        )
+        assert response.status_code == 422
+
+
+def test_get_trees_crown_spacing():
+    """Crown spacing caps trees per rectangle, and aggregates agree"""
+    params = {"trees_per_square_meter": 0.05, "seed": 3}
+    uniform = client.get("/trees/", params=params).json()
+    params["placement"] = "crown_spacing"
+    spaced = client.get("/trees/", params=params).json()
+    assert 0 < len(spaced) < len(uniform)
+
+    result = client.get("/trees/aggregate/", params=params).json()
+    assert result["total_trees"] == len(spaced)
+    streamed = client.get("/trees/", params={**params, "stream": True})
+    assert len(streamed.text.splitlines()) == len(spaced)
+
+    params["placement"] = "poisson"
+    assert client.get("/trees/", params=params).status_code == 422
+
+
+def test_get_trees_dedup_radius():
+    """Trees too close to an earlier one are dropped and counted"""
+    params = {"trees_per_square_meter": 0.5, "seed": 5}
+    trees = client.get("/trees/", params=params).json()
+    params["dedup_radius_meters"] = 1.0
+    response = client.get("/trees/", params=params)
+    removed = int(response.headers["X-Trees-Removed"])
+    assert 0 < removed < len(trees)
+    assert len(response.json()) == len(trees) - removed
+
+    streamed = client.get("/trees/", params={**params, "stream": True})
+    assert streamed.headers["X-Trees-Removed"] == str(removed)
+    assert len(streamed.text.splitlines()) == len(trees) - removed
+
+    for radius in (0, 51):
+        params["dedup_radius_meters"] = radius
+        assert client.get("/trees/", params=params).status_code == 422
+
+
 if __name__ == "__main__":
-    pytest.main([__file__, "-v"]) 
\ No newline at end of file
+    pytest.main([__file__, "-v"])
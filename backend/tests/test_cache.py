@@ -0,0 +1,20 @@
+from services.cache import LRUCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    """Entries are evicted oldest-use first once the size bound is exceeded"""
+    cache = LRUCache(max_size=6, sizeof=len)
+    cache.put("a", b"aa")
+    cache.put("b", b"bb")
+    cache.put("c", b"cc")
+    assert cache.get("a") == b"aa"
+
+    cache.put("d", b"dd")
+    assert "b" not in cache
+    assert cache.get("a") == b"aa"
+    assert cache.size == 6
+
+    # Values bigger than the whole cache are not stored
+    cache.put("e", b"e" * 7)
+    assert "e" not in cache
+    assert len(cache) == 3
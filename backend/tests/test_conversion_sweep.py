@@ -0,0 +1,68 @@
+import itertools
+import json
+
+import pytest
+from schemas.species import Species
+from services.conversion_sweep import (iter_sweep_ndjson, scenario_grid,
+                                       scenario_list)
+from services.getAsphaultConversionResults import plan_asphalt_conversion
+
+DISTRIBUTIONS = [
+    {Species.COAST_LIVE_OAK: 0.5, Species.MONTEREY_PINE: 0.3, Species.REDWOOD: 0.2},
+    {Species.LONDON_PLANE: 1.0},
+]
+
+
+def test_grid_sweep_matches_single_scenarios():
+    """Every line of a sweep equals the single-scenario plan"""
+    values = ([1000.0, 12345.0], [37.0, 100.0], [10.0], [1, 30], DISTRIBUTIONS)
+    scenarios = scenario_grid(*values)
+    lines = b"".join(iter_sweep_ndjson(scenarios, chunk_size=3)).splitlines()
+    assert len(lines) == len(scenarios) == 16
+
+    for index, (line, combination) in enumerate(
+        zip(lines, itertools.product(*values))
+    ):
+        area, spacing, removal, years, distribution = combination
+        expected = plan_asphalt_conversion(
+            area,
+            distribution,
+            spacing_sqft_per_tree=spacing,
+            cost_removal_per_sqft=removal,
+            maintenance_years=years,
+        )
+        row = json.loads(line)
+        assert row["scenario"] == index
+        assert row["maintenance_years"] == years
+        assert row["asphalt_removal_cost"] == expected["asphalt_removal_cost"]
+        assert row["total_maintenance_cost"] == pytest.approx(
+            expected["total_maintenance_cost"]
+        )
+        assert row["total_co2_reduction_kg"] == pytest.approx(
+            expected["total_co2_reduction_kg"]
+        )
+        for species, trees in expected["trees_planted_per_species"].items():
+            assert row["trees_planted_per_species"][species.value] == trees
+
+
+def test_sweep_without_species():
+    """An empty species mix still yields valid JSON"""
+
+    class Scenario:
+        asphalt_sqft = 500.0
+        spacing_sqft_per_tree = 100.0
+        cost_removal_per_sqft = 2.0
+        maintenance_years = 5
+        species_distribution = {}
+
+    (line,) = b"".join(iter_sweep_ndjson(scenario_list([Scenario]))).splitlines()
+    row = json.loads(line)
+    assert row["trees_planted_per_species"] == {}
+    assert row["asphalt_removal_cost"] == 1000.0
+
+
+def test_sweep_refuses_non_finite_values():
+    """NaN and infinity have no JSON encoding, so no line is written"""
+    scenarios = scenario_grid([float("nan")], [100.0], [10.0], [5], DISTRIBUTIONS)
+    with pytest.raises(ValueError):
+        b"".join(iter_sweep_ndjson(scenarios))
@@ -0,0 +1,226 @@
+import gzip
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+import mapbox_vector_tile
+import mercantile
+import pytest
+
+# The preprocessing scripts import their siblings as top-level modules
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from extract_mbtiles import (FeatureMerger, TileBatch,  # noqa: E402
+                             decode_tile_data, extract_features_from_mbtiles,
+                             stream_features_from_mbtiles)
+
+ZOOM = 14
+SF_BOUNDS = [-122.5, 37.7, -122.3, 37.9]
+
+
+def _create_mbtiles(path, tiles):
+    """Write an MBTiles file from {XYZ tile: layers to encode}"""
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE tiles (zoom_level integer, tile_column integer, "
+        "tile_row integer, tile_data blob)"
+    )
+    for tile, layers in tiles.items():
+        data = mapbox_vector_tile.encode(layers, default_options={"y_coord_down": True})
+        tms_row = (1 << tile.z) - 1 - tile.y
+        conn.execute(
+            "INSERT INTO tiles VALUES (?, ?, ?, ?)",
+            (tile.z, tile.x, tms_row, gzip.compress(data)),
+        )
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def mbtiles_path(tmp_path):
+    """MBTiles file with building and road layers, one tile outside
+    San Francisco"""
+    tiles = [
+        mercantile.tile(-122.42 + 0.03 * i, 37.77 + 0.02 * i, ZOOM) for i in range(4)
+    ]
+    tiles.append(mercantile.tile(-121.9, 37.33, ZOOM))  # San Jose
+    layers = [
+        [
+            {
+                "name": "building",
+                "features": [
+                    {
+                        "geometry": f"POLYGON (({i} 0, 100 0, 100 100, {i} 0))",
+                        "properties": {"tile": i},
+                    }
+                ],
+            },
+            {
+                "name": "road",
+                "features": [
+                    {"geometry": "LINESTRING (0 0, 4096 4096)", "properties": {}}
+                ],
+            },
+        ]
+        for i in range(len(tiles))
+    ]
+    return _create_mbtiles(tmp_path / "city.mbtiles", dict(zip(tiles, layers)))
+
+
+def test_bounds_select_tiles_inside(mbtiles_path):
+    """Bounds are matched against TMS rows"""
+    geojson = extract_features_from_mbtiles(mbtiles_path, ZOOM, SF_BOUNDS)
+    tiles = {f["properties"]["tile"] for f in geojson["features"] if "tile" in f["properties"]}
+    assert tiles == {0, 1, 2, 3}
+
+
+@pytest.mark.parametrize("output_format", ["seq", "collection"])
+def test_stream_matches_in_memory_extraction(mbtiles_path, tmp_path, output_format):
+    """Streaming in parallel batches writes the same features, in tile order"""
+    expected = extract_features_from_mbtiles(
+        mbtiles_path, ZOOM, SF_BOUNDS, layer_filter=["building"]
+    )["features"]
+
+    output = tmp_path / "features.out"
+    count = stream_features_from_mbtiles(
+        mbtiles_path,
+        output,
+        ZOOM,
+        SF_BOUNDS,
+        layer_filter=["building"],
+        output_format=output_format,
+        workers=2,
+        batch_size=1,
+    )
+
+    if output_format == "seq":
+        features = [json.loads(line) for line in output.read_text().splitlines()]
+    else:
+        features = json.loads(output.read_text())["features"]
+    assert count == len(expected) == 4
+    assert features == expected
+
+
+def test_decode_only_requested_layers_to_lon_lat(mbtiles_path):
+    """Layers are filtered before decoding and pixels become lon/lat"""
+    conn = sqlite3.connect(mbtiles_path)
+    tile_column, tile_row, tile_data = conn.execute(
+        "SELECT tile_column, tile_row, tile_data FROM tiles LIMIT 1"
+    ).fetchone()
+    conn.close()
+    tile = mercantile.Tile(tile_column, (1 << ZOOM) - 1 - tile_row, ZOOM)
+
+    features = decode_tile_data(tile_data, tile, layer_filter=["road"])
+    assert [f["properties"]["layer"] for f in features] == ["road"]
+    start, end = features[0]["geometry"]["coordinates"]
+    upper_left = mercantile.ul(tile)
+    lower_right = mercantile.ul(tile.x + 1, tile.y + 1, ZOOM)
+    assert start == pytest.approx([upper_left.lng, upper_left.lat], abs=1e-7)
+    assert end == pytest.approx([lower_right.lng, lower_right.lat], abs=1e-7)
+
+
+def test_features_across_tiles_are_deduplicated(tmp_path):
+    """Parts of a feature id in neighbouring tiles are merged, and features
+    repeated in the tile buffers are written once"""
+    west = mercantile.tile(-122.42, 37.77, ZOOM)
+    east = mercantile.Tile(west.x + 1, west.y, ZOOM)
+
+    def layers(polygon, point):
+        return [
+            {
+                "name": "building",
+                "features": [{"geometry": polygon, "properties": {}, "id": 7}],
+            },
+            {"name": "poi", "features": [{"geometry": point, "properties": {}}]},
+        ]
+
+    path = _create_mbtiles(
+        tmp_path / "edge.mbtiles",
+        {
+            west: layers(
+                "POLYGON ((3000 1000, 4096 1000, 4096 2000, 3000 2000, 3000 1000))",
+                "POINT (4100 500)",
+            ),
+            east: layers(
+                "POLYGON ((0 1000, 1000 1000, 1000 2000, 0 2000, 0 1000))",
+                "POINT (4 500)",
+            ),
+        },
+    )
+
+    features = extract_features_from_mbtiles(path, ZOOM)["features"]
+    layers_written = sorted(f["properties"]["layer"] for f in features)
+    assert layers_written == ["building", "poi"]
+
+    building = next(f for f in features if f["properties"]["layer"] == "building")
+    assert building["id"] == 7
+    assert building["geometry"]["type"] == "Polygon"
+    longitudes = [lon for lon, _ in building["geometry"]["coordinates"][0]]
+    west_edge = mercantile.ul(west).lng
+    east_edge = mercantile.ul(east.x + 1, east.y, ZOOM).lng
+    tile_width = east_edge - west_edge
+    assert min(longitudes) == pytest.approx(west_edge + tile_width / 2 * 3000 / 4096, abs=1e-6)
+    assert max(longitudes) == pytest.approx(east_edge - tile_width / 2 * 3096 / 4096, abs=1e-6)
+
+
+def test_feature_id_zero_is_kept(tmp_path):
+    """An id of 0 is an id, a missing id is not"""
+    tile = mercantile.tile(-122.42, 37.77, ZOOM)
+    data = mapbox_vector_tile.encode(
+        [
+            {
+                "name": "poi",
+                "features": [
+                    {"geometry": "POINT (100 100)", "properties": {}, "id": 0},
+                    {"geometry": "POINT (200 200)", "properties": {}},
+                ],
+            }
+        ],
+        default_options={"y_coord_down": True},
+    )
+    with_id, without_id = decode_tile_data(data, tile)
+    assert with_id["id"] == 0
+    assert "id" not in without_id
+
+
+def test_merger_keeps_keys_of_neighbouring_columns_only():
+    """Border keys are dropped once their tile column can have no more
+    neighbours to come"""
+    merger = FeatureMerger()
+    for column in range(5):
+        batch = TileBatch(
+            ["a", "b", "c"], [b"edge", None, None], [column] * 3, [], []
+        )
+        assert list(merger.add(batch)) == (["a"] if column == 0 else []) + ["b", "c"]
+        assert len(merger.seen) == min(column + 1, 2)
+    assert list(merger.add(TileBatch(["a"], [b"edge"], [7], [], []))) == ["a"]
+    assert set(merger.seen) == {7}
+
+
+def test_merger_writes_spanning_features_once_complete():
+    """Parts sharing an id are merged and written as soon as a whole tile
+    column has passed without another part"""
+
+    def part(x):
+        return {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [x, 0.0]},
+            "properties": {"layer": "road"},
+            "id": 3,
+        }
+
+    merger = FeatureMerger()
+    assert list(merger.add(TileBatch([], [], [], [part(0.0)], [4]))) == []
+    assert list(merger.add(TileBatch([], [], [], [part(1.0)], [5]))) == []
+    assert list(merger.add(TileBatch(["a"], [None], [6], [], []))) == ["a"]
+    assert len(merger.spanning) == 1
+
+    lines = list(merger.add(TileBatch(["b"], [None], [7], [], [])))
+    assert lines[0] == "b"
+    merged = json.loads(lines[1])
+    assert merged["id"] == 3
+    assert merged["geometry"]["type"] == "MultiPoint"
+    assert merger.spanning == {} and merger.spanning_column == {}
+    assert list(merger.finish()) == []
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from schemas.species import SPECIES, SPECIES_CODES, SPECIES_DATA, Species
+from services.conversion_sweep import scenario_grid
+from services.getAsphaultConversionResults import plan_asphalt_conversion
+from services.growth_projection import maturity, project_conversion_scenarios
+
+DISTRIBUTION = {Species.REDWOOD: 0.5, Species.COAST_LIVE_OAK: 0.5}
+
+
+def test_maturity_grows_towards_one():
+    grown = maturity(np.arange(0, 301))
+    assert (grown[0] == 0).all()
+    assert (np.diff(grown, axis=0) > 0).all()
+    assert (grown[-1] > 0.9).all() and (grown < 1).all()
+
+    # Trees first grow at their growth rate
+    redwood = SPECIES_CODES[Species.REDWOOD]
+    data = SPECIES_DATA[Species.REDWOOD]
+    assert maturity(np.array([1e-6]))[0, redwood] * data["max_height"] == pytest.approx(
+        data["growth_rate"] * 1e-6
+    )
+
+
+def test_projection_bounds():
+    """Projected totals stay below the flat-rate plan and canopy below the
+    plantable area"""
+    years = 30
+    scenarios = scenario_grid([1000.0, 5000.0], [50.0, 400.0], [10.0], [years], [DISTRIBUTION])
+    projection = project_conversion_scenarios(scenarios, years)
+    assert projection["canopy_area_sqft"].shape == (4, years, len(SPECIES))
+
+    canopy = projection["canopy_area_sqft"].sum(axis=2)
+    assert (np.diff(canopy, axis=1) >= 0).all()
+    assert (canopy <= scenarios.asphalt_sqft[:, None]).all()
+
+    for row in range(len(scenarios)):
+        plan = plan_asphalt_conversion(
+            scenarios.asphalt_sqft[row],
+            DISTRIBUTION,
+            spacing_sqft_per_tree=scenarios.spacing_sqft_per_tree[row],
+            maintenance_years=years,
+        )
+        co2 = projection["co2_sequestered_kg"][row, -1].sum()
+        assert 0 < co2 < plan["total_co2_reduction_kg"]
+
+        trees = projection["trees"][row]
+        planting = trees @ [SPECIES_DATA[s]["planting_cost"] for s in SPECIES]
+        cost = projection["cumulative_cost"][row, -1].sum()
+        assert cost == pytest.approx(planting + plan["total_maintenance_cost"])
@@ -0,0 +1,185 @@
+import json
+import os
+import subprocess
+import sys
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The preprocessing scripts import their siblings as top-level modules
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from ingest import (find_point_columns, ingest_csv, main,  # noqa: E402
+                    process_street_chunk)
+from rectangle_io import read_rectangles, write_rectangles  # noqa: E402
+from services.rectangle_store import load_rectangle_store  # noqa: E402
+from tree_generation import AreaType  # noqa: E402
+
+DATASETS = Path(__file__).resolve().parents[1] / "datasets"
+
+
+def test_ingest_streets_chunked_matches_single_chunk(tmp_path):
+    """Chunked, parallel ingestion merges chunks back in input order"""
+    csv_path = tmp_path / "streets.csv"
+    with open(DATASETS / "On_Street_Parking.csv") as f:
+        csv_path.write_text("".join(f.readline() for _ in range(501)))
+
+    process_chunk = partial(
+        process_street_chunk,
+        offset_meters=1.5,
+        width_meters=3.0,
+        min_spaces=1,
+        first_segment_only=False,
+    )
+    usecols = ["shape", "PRKG_SPLY"]
+    whole = ingest_csv(str(csv_path), process_chunk, usecols, chunk_rows=1_000, workers=1)
+    chunked = ingest_csv(str(csv_path), process_chunk, usecols, chunk_rows=37, workers=2)
+
+    assert len(whole["latitude"]) >= 2 * 500 - 2 * 50
+    for name, values in whole.items():
+        np.testing.assert_array_equal(chunked[name], values)
+
+
+def test_ingest_points_reproduces_parking_lot_dataset(tmp_path):
+    """The points command rebuilds parking-lot-coordinates.json"""
+    assert find_point_columns(str(DATASETS / "Off_street_Parking.csv")) == [
+        "MAIN_ENTRANCE_LAT",
+        "MAIN_ENTRANCE_LONG",
+    ]
+
+    output = tmp_path / "lots.json"
+    main(
+        [
+            "--workers", "1",
+            "points", str(DATASETS / "Off_street_Parking.csv"),
+            "--output", str(output),
+            "--width", "18",
+            "--length", "18",
+        ]
+    )
+    expected = json.loads((DATASETS / "parking-lot-coordinates.json").read_text())
+    assert json.loads(output.read_text()) == expected
+
+
+@pytest.mark.parametrize("suffix", [".json", ".npy"])
+def test_incremental_rebuild_matches_full_build(tmp_path, capsys, suffix):
+    """Only changed rows are reprocessed, and the patched output equals a
+    full build of the refreshed CSV"""
+    rows = pd.read_csv(DATASETS / "On_Street_Parking.csv", nrows=200)
+    csv_path = tmp_path / "streets.csv"
+    output = tmp_path / f"streets{suffix}"
+    args = ["streets", str(csv_path), "--output", str(output), "--incremental"]
+
+    rows.to_csv(csv_path, index=False)
+    main(args)
+    assert "200 added" in capsys.readouterr().out
+
+    # Edit one row, remove one and append a new one
+    rows.loc[0, "shape"] = "LINESTRING (-122.4914 37.7836, -122.4913 37.7817)"
+    rows.loc[0, "data_as_of"] = "10/01/2026 10:00:00 AM"
+    new_row = rows.iloc[[3]].assign(objectid=rows["objectid"].max() + 1)
+    rows = pd.concat([rows.drop(index=5), new_row])
+    rows.to_csv(csv_path, index=False)
+    main(args)
+    assert "1 added, 1 changed, 1 removed" in capsys.readouterr().out
+
+    full = tmp_path / f"full{suffix}"
+    main(["--workers", "1", "streets", str(csv_path), "--output", str(full)])
+    patched = read_rectangles(output)
+    assert patched.pop("objectid")[:2].tolist() == [rows["objectid"][0]] * 2
+    for name, values in read_rectangles(full).items():
+        np.testing.assert_array_equal(patched[name], values)
+
+    main(args)
+    assert "up to date" in capsys.readouterr().out
+
+
+
+def test_incremental_rebuild_ignores_export_stamp(tmp_path, capsys):
+    """A refresh that only restamps data_as_of reprocesses no rows"""
+    rows = pd.read_csv(DATASETS / "On_Street_Parking.csv", nrows=200)
+    csv_path = tmp_path / "streets.csv"
+    output = tmp_path / "streets.npy"
+    args = ["streets", str(csv_path), "--output", str(output), "--incremental"]
+
+    rows.to_csv(csv_path, index=False)
+    main(args)
+    capsys.readouterr()
+
+    rows["data_as_of"] = "10/01/2026 10:00:00 AM"
+    rows.to_csv(csv_path, index=False)
+    main(args)
+    assert "up to date" in capsys.readouterr().out
+
+    # With --min-spaces the parking supply decides which segments are kept
+    args.extend(["--min-spaces", "1"])
+    main(args)
+    capsys.readouterr()
+    rows.loc[0, "PRKG_SPLY"] += 1
+    rows.to_csv(csv_path, index=False)
+    main(args)
+    assert "0 added, 1 changed, 0 removed" in capsys.readouterr().out
+
+def test_combined_dataset_is_memory_mapped(tmp_path):
+    """The combined dataset is loaded as one memory-mapped file while it is
+    newer than the datasets it stacks"""
+    lots, streets = tmp_path / "lots.npy", tmp_path / "streets.npy"
+    combined = tmp_path / "rectangles.npy"
+    rectangle = {"latitude": 37.78, "longitude": -122.41, "width": 1.0, "length": 2.0}
+    write_rectangles(
+        {
+            **{name: np.full(2, value) for name, value in rectangle.items()},
+            "district": np.array([3, 0]),
+            "neighborhood": np.array(["Nob Hill", ""]),
+        },
+        lots,
+    )
+    write_rectangles(
+        {name: np.full(3, value) for name, value in rectangle.items()}, streets
+    )
+    datasets = [(lots, AreaType.PARKING_LOT), (streets, AreaType.STREET_SIDE)]
+    main(
+        [
+            "combine", f"parking_lot={lots}", f"street_side={streets}",
+            "--output", str(combined),
+        ]
+    )
+
+    store = load_rectangle_store(datasets, combined)
+    stacked = load_rectangle_store(datasets)
+    assert isinstance(store.top_right_lat.base, np.memmap)
+    assert isinstance(store.area_type.base, np.memmap)
+    assert store.version == stacked.version
+    assert store.neighborhoods == ("Nob Hill",)
+    assert store.neighborhood.tolist() == [0, -1, -1, -1, -1]
+
+    # A dataset rebuilt after the combined one
+    built = combined.stat().st_mtime
+    os.utime(streets, (built + 1, built + 1))
+    assert not isinstance(
+        load_rectangle_store(datasets, combined).top_right_lat.base, np.memmap
+    )
+
+
+@pytest.mark.parametrize("script", ["ingest.py", "loader.py"])
+def test_scripts_run_as_files(tmp_path, script):
+    """Entry points run as files without backend on PYTHONPATH"""
+    csv_path = tmp_path / "streets.csv"
+    with open(DATASETS / "On_Street_Parking.csv") as f:
+        csv_path.write_text("".join(f.readline() for _ in range(21)))
+
+    args = [str(csv_path)]
+    if script == "ingest.py":
+        args = ["--workers", "1", "streets", *args]
+    env = {k: v for k, v in os.environ.items() if k != "PYTHONPATH"}
+    subprocess.run(
+        [sys.executable, str(Path(__file__).resolve().parents[1] / "scripts" / script)]
+        + args,
+        cwd=tmp_path,
+        env=env,
+        check=True,
+    )
+    assert len(list(tmp_path.glob("streets_rectangles.*"))) == 1
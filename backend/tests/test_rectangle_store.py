@@ -0,0 +1,114 @@
+import json
+
+import numpy as np
+import pytest
+from scripts.tree_generation import AreaType, generate_trees_for_rectangles
+from scripts.rectangle_io import (neighborhoods_path, read_rectangles,
+                                  write_rectangles)
+from services.rectangle_store import AREA_TYPE_CODES, load_rectangle_store
+
+
+@pytest.fixture
+def datasets(tmp_path):
+    """Two small rectangle datasets, one of which is missing on disk"""
+    lots = tmp_path / "lots.json"
+    lots.write_text(
+        json.dumps(
+            [
+                {"latitude": 37.78, "longitude": -122.41, "width": 18, "length": 18},
+                {"latitude": 37.77, "longitude": -122.42, "width": 10, "length": 5},
+            ]
+        )
+    )
+    return [
+        (lots, AreaType.PARKING_LOT),
+        (tmp_path / "missing.json", AreaType.STREET_SIDE),
+    ]
+
+
+def test_load_rectangle_store(datasets):
+    """Rows are loaded into columns and missing datasets are skipped"""
+    store = load_rectangle_store(datasets)
+    assert len(store) == 2
+    assert store.top_right_lat.tolist() == [37.78, 37.77]
+    assert store.area.tolist() == [324.0, 50.0]
+    assert (store.area_type == AREA_TYPE_CODES[AreaType.PARKING_LOT]).all()
+    assert store.nbytes > 0
+    assert store.load_seconds >= 0
+
+
+def test_take_and_generate(datasets):
+    """Subsets of the store feed tree generation directly"""
+    store = load_rectangle_store(datasets)
+    subset = store.take(np.array([1]))
+    assert len(subset) == 1
+    assert subset.to_rectangles()[0].width_meters == 10
+
+    trees = generate_trees_for_rectangles(subset, 0.1)
+    assert len(trees) == 5
+    assert all(37.77 - 1e-3 < tree.latitude <= 37.77 for tree in trees)
+
+
+def test_npy_dataset_preferred_and_memory_mapped(datasets):
+    """A .npy dataset next to the JSON one is loaded without parsing"""
+    lots, _ = datasets[0]
+    write_rectangles(read_rectangles(lots), lots.with_suffix(".npy"))
+    lots.write_text("[]")
+
+    store = load_rectangle_store(datasets)
+    assert store.top_right_lat.tolist() == [37.78, 37.77]
+    assert store.area.tolist() == [324.0, 50.0]
+    assert isinstance(store.top_right_lat.base, np.memmap)
+
+
+def test_region_keys_loaded_and_recoded(tmp_path):
+    """District and neighborhood keys survive the .npy format and stacking
+    datasets with different neighborhoods"""
+    lots, streets = tmp_path / "lots.npy", tmp_path / "streets.npy"
+    rectangle = {"latitude": 37.78, "longitude": -122.41, "width": 1.0, "length": 2.0}
+    write_rectangles(
+        {
+            **{name: np.full(3, value) for name, value in rectangle.items()},
+            "district": np.array([3, 0, 6]),
+            "neighborhood": np.array(["Nob Hill", "", "Mission Bay"]),
+        },
+        lots,
+    )
+    write_rectangles(
+        {
+            **{name: np.full(2, value) for name, value in rectangle.items()},
+            "district": np.array([9, 9]),
+            "neighborhood": np.array(["Mission", "Mission Bay"]),
+        },
+        streets,
+    )
+
+    store = load_rectangle_store(
+        [(lots, AreaType.PARKING_LOT), (streets, AreaType.STREET_SIDE)]
+    )
+    assert store.district.tolist() == [3, 0, 6, 9, 9]
+    assert store.neighborhoods == ("Mission", "Mission Bay", "Nob Hill")
+    assert store.neighborhood.tolist() == [2, -1, 1, 0, 1]
+    assert store.take(np.array([4])).neighborhoods == store.neighborhoods
+
+
+def test_neighborhoods_stored_as_codes(tmp_path):
+    """A .npy dataset stores neighborhood codes, the names go in a sidecar,
+    and the codes are loaded memory-mapped"""
+    lots = tmp_path / "lots.npy"
+    columns = {
+        "latitude": np.full(3, 37.78),
+        "longitude": np.full(3, -122.41),
+        "width": np.ones(3),
+        "length": np.ones(3),
+        "neighborhood": np.array(["Nob Hill", "", "Mission Bay"]),
+    }
+    write_rectangles(columns, lots)
+
+    assert np.load(lots)["neighborhood"].tolist() == [1, -1, 0]
+    names = json.loads(neighborhoods_path(lots).read_text())
+    assert names == ["Mission Bay", "Nob Hill"]
+    names = read_rectangles(lots)["neighborhood"].tolist()
+    assert names == ["Nob Hill", "", "Mission Bay"]
+    store = load_rectangle_store([(lots, AreaType.PARKING_LOT)])
+    assert isinstance(store.neighborhood.base, np.memmap)
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from schemas.species import Species
+from scripts.tree_generation import AreaType
+from services.getAsphaultConversionResults import plan_asphalt_conversion
+from services.rectangle_store import AREA_TYPE_CODES, RectangleStore
+from services.region_rollups import (SQFT_PER_SQUARE_METER, UNASSIGNED_REGION,
+                                     RegionKey, RegionRollups)
+
+DISTRIBUTION = {Species.REDWOOD: 0.5, Species.COAST_LIVE_OAK: 0.5}
+
+
+@pytest.fixture
+def rollups():
+    n = 1_000
+    rng = np.random.default_rng(0)
+    store = RectangleStore(
+        top_right_lat=rng.uniform(37.7, 37.8, n),
+        top_right_long=rng.uniform(-122.5, -122.4, n),
+        width_meters=rng.uniform(1, 20, n),
+        length_meters=rng.uniform(1, 20, n),
+        area_type=rng.choice(
+            [AREA_TYPE_CODES[AreaType.PARKING_LOT], AREA_TYPE_CODES[AreaType.STREET_SIDE]],
+            n,
+        ),
+        district=rng.integers(0, 12, n),
+        neighborhood=rng.integers(-1, 3, n),
+        neighborhoods=["Marina", "Mission", "Sunset/Parkside"],
+    )
+    return RegionRollups(store)
+
+
+def test_region_tables(rollups):
+    """Every rectangle is counted once, unassigned rectangles last"""
+    store = rollups.rectangles
+    for table in rollups.tables.values():
+        assert table.rectangles.sum() == len(store)
+        assert table.area_sqft.sum() == pytest.approx(
+            store.area.sum() * SQFT_PER_SQUARE_METER
+        )
+        assert table.regions[-1] == UNASSIGNED_REGION
+    assert rollups.tables[RegionKey.DISTRICT].regions[:3] == ["1", "2", "3"]
+
+
+def test_convert_matches_plan_per_region(rollups):
+    """Each region is evaluated like plan_asphalt_conversion on its area"""
+    store = rollups.rectangles
+    result = rollups.convert(
+        RegionKey.DISTRICT,
+        0.25,
+        DISTRIBUTION,
+        regions=["5", "11"],
+        area_types=[AreaType.STREET_SIDE],
+    )
+    assert [row["region"] for row in result["regions"]] == ["5", "11"]
+
+    street_side = store.area_type == AREA_TYPE_CODES[AreaType.STREET_SIDE]
+    for row in result["regions"]:
+        selected = street_side & (store.district == int(row["region"]))
+        area = store.area[selected].sum() * SQFT_PER_SQUARE_METER
+        assert row["rectangles"] == selected.sum()
+        assert row["parking_area_sqft"] == pytest.approx(area)
+
+        plan = plan_asphalt_conversion(area * 0.25, DISTRIBUTION)
+        assert row["trees_planted_per_species"] == plan["trees_planted_per_species"]
+        assert row["total_co2_reduction_kg"] == pytest.approx(
+            plan["total_co2_reduction_kg"]
+        )
+
+    total = result["total"]
+    assert total["rectangles"] == sum(row["rectangles"] for row in result["regions"])
+    assert total["trees_planted_per_species"]["redwood"] == sum(
+        row["trees_planted_per_species"]["redwood"] for row in result["regions"]
+    )
+
+    with pytest.raises(ValueError):
+        rollups.convert(RegionKey.NEIGHBORHOOD, 0.5, DISTRIBUTION, regions=["Atlantis"])
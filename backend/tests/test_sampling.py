@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from services.rectangle_store import RectangleStore
+from services.sampling import (SamplingMethod, sample_area_weighted,
+                               sample_rectangles, sample_stratified,
+                               sample_uniform)
+
+
+def _store(n=10_000, seed=0):
+    rng = np.random.default_rng(seed)
+    return RectangleStore(
+        top_right_lat=rng.uniform(37.7, 37.8, n),
+        top_right_long=rng.uniform(-122.5, -122.4, n),
+        width_meters=rng.uniform(1, 20, n),
+        length_meters=rng.uniform(1, 20, n),
+        area_type=rng.integers(0, 3, n),
+    )
+
+
+def test_sample_uniform():
+    """Uniform sampling keeps int(n * fraction) distinct rows"""
+    rng = np.random.default_rng(0)
+    rows = sample_uniform(1_000, 0.25, rng)
+    assert len(rows) == len(np.unique(rows)) == 250
+    assert (np.diff(rows) > 0).all()
+    assert len(sample_uniform(1_000, 1.0, rng)) == 1_000
+    assert len(sample_uniform(1_000, 0.0, rng)) == 0
+
+
+@pytest.mark.parametrize("fraction", [0.01, 0.3, 0.9])
+def test_sample_area_weighted_covers_fraction_of_area(fraction):
+    """Area-weighted sampling covers just over the requested share of area"""
+    areas = _store().area
+    rows = sample_area_weighted(areas, fraction, np.random.default_rng(1))
+    covered = areas[rows].sum()
+    assert covered >= fraction * areas.sum()
+    assert covered - areas[rows].max() < fraction * areas.sum()
+
+
+def test_sample_area_weighted_prefers_large_rows():
+    """Larger rectangles are more likely to be picked"""
+    areas = np.array([1.0] * 100 + [100.0] * 100)
+    rows = sample_area_weighted(areas, 0.1, np.random.default_rng(2))
+    assert (rows >= 100).mean() > 0.9
+
+
+def test_sample_stratified_keeps_share_of_each_stratum():
+    """Stratified sampling keeps the fraction within every stratum"""
+    strata = np.repeat([0, 1, 4], [100, 1_000, 10])
+    rows = sample_stratified(strata, 0.5, np.random.default_rng(3))
+    assert np.bincount(strata[rows]).tolist() == [50, 500, 0, 0, 5]
+
+
+def test_sample_rectangles_within_candidates():
+    """Samples restricted to candidates only return candidate rows"""
+    store = _store()
+    candidates = np.arange(0, len(store), 3)
+    for method in SamplingMethod:
+        rows = sample_rectangles(
+            store, 0.2, method, np.random.default_rng(4), candidates
+        )
+        assert len(rows) > 0
+        assert np.isin(rows, candidates).all()
+
+
+def test_sample_rectangles_full_fraction_keeps_every_row():
+    """A full fraction selects every row without indexing or drawing"""
+    store = _store()
+    candidates = np.arange(0, len(store), 3)
+    for method in SamplingMethod:
+        rng = np.random.default_rng(5)
+        assert sample_rectangles(store, 1.0, method, rng) == slice(None)
+        assert sample_rectangles(store, 1.0, method, rng, candidates) is candidates
+        assert rng.random() == np.random.default_rng(5).random()
@@ -0,0 +1,37 @@
+import numpy as np
+from services.rectangle_store import RectangleStore
+from services.spatial_index import GridIndex
+
+
+def _random_store(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return RectangleStore(
+        top_right_lat=rng.uniform(37.70, 37.80, n),
+        top_right_long=rng.uniform(-122.50, -122.38, n),
+        width_meters=rng.uniform(1, 40, n),
+        length_meters=rng.uniform(1, 400, n),
+        area_type=np.zeros(n),
+    )
+
+
+def test_grid_index_matches_brute_force():
+    """Index queries return exactly the rectangles intersecting the viewport"""
+    store = _random_store(5_000)
+    index = GridIndex(store, cell_size_degrees=0.004)
+    min_long, min_lat, max_long, max_lat = store.bounds()
+
+    rng = np.random.default_rng(1)
+    for _ in range(50):
+        lon0, lon1 = np.sort(rng.uniform(-122.52, -122.36, 2))
+        lat0, lat1 = np.sort(rng.uniform(37.68, 37.82, 2))
+        expected = np.flatnonzero(
+            (min_long <= lon1) & (max_long >= lon0) & (min_lat <= lat1) & (max_lat >= lat0)
+        )
+        np.testing.assert_array_equal(index.query(lon0, lat0, lon1, lat1), expected)
+
+
+def test_grid_index_outside_and_empty():
+    """Viewports away from the data and empty stores return no rows"""
+    index = GridIndex(_random_store(100))
+    assert len(index.query(0.0, 0.0, 1.0, 1.0)) == 0
+    assert len(GridIndex(RectangleStore.empty()).query(-180, -90, 180, 90)) == 0
@@ -0,0 +1,64 @@
+from itertools import product
+
+import numpy as np
+import pytest
+from schemas.species import SPECIES_TABLE, Species
+from services.species_optimizer import optimize_species_mix
+
+
+def brute_force_co2(area, budget, water_cap, years):
+    """Best CO2 reduction over every feasible whole-tree mix"""
+    capacity = int(area // 100)
+    counts = np.array(list(product(range(capacity + 1), repeat=len(Species))))
+    table = SPECIES_TABLE
+    per_tree = table["planting_cost"] + table["maintenance_cost"] * years
+    feasible = (
+        (counts.sum(axis=1) <= capacity)
+        & (counts @ per_tree <= budget - area * 10 + 1e-9)
+        & (counts @ SPECIES_TABLE["water_requirement"] <= water_cap + 1e-9)
+    )
+    return (counts[feasible] @ SPECIES_TABLE["co2_per_year"]).max() * years
+
+
+@pytest.mark.parametrize(
+    "area, budget, water_cap, years",
+    [
+        (1179.0, 11790.0 + 2608.0, 3821.0, 2),
+        (1084.0, 10840.0 + 2524.0, 1436.0, 7),
+        (600.0, 6000.0 + 5000.0, 8000.0, 10),
+        (450.0, 4500.0 + 700.0, 1000.0, 1),
+    ],
+)
+def test_optimize_matches_brute_force(area, budget, water_cap, years):
+    result = optimize_species_mix(
+        area, budget, water_cap=water_cap, maintenance_years=years
+    )
+    assert result["total_co2_reduction_kg"] == pytest.approx(
+        brute_force_co2(area, budget, water_cap, years)
+    )
+    assert result["total_co2_reduction_kg"] <= result["co2_upper_bound_kg"] + 1e-6
+    assert result["total_cost"] <= budget + 1e-6
+    assert result["annual_water_requirement"] <= water_cap + 1e-6
+
+
+def test_optimize_respects_species_and_budget():
+    result = optimize_species_mix(
+        10_000.0, 150_000.0, species=[Species.REDWOOD, Species.COAST_LIVE_OAK]
+    )
+    assert set(result["trees_planted_per_species"]) == {"redwood", "coast_live_oak"}
+    assert sum(result["species_distribution"].values()) == pytest.approx(1.0)
+    assert result["total_trees"] <= 100
+    assert result["binding_constraints"]
+    assert "water" not in result["binding_constraints"]
+
+    with pytest.raises(ValueError):
+        optimize_species_mix(10_000.0, 50_000.0)
+
+
+def test_optimize_ignores_repeated_species():
+    """Listing a species twice plants it once, with every tree counted"""
+    twice = optimize_species_mix(1000.0, 50_000.0, species=["redwood", "redwood"])
+    once = optimize_species_mix(1000.0, 50_000.0, species=["redwood"])
+    assert twice == once
+    assert twice["trees_planted_per_species"] == {"redwood": twice["total_trees"]}
+    assert twice["total_trees"] > 0
@@ -0,0 +1,58 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+from geopy.distance import geodesic
+
+# The preprocessing scripts import their siblings as top-level modules
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from streetside import (Coordinate, generate_rectangle_arrays,  # noqa: E402
+                        offset_segments, perpendicular_offset)
+
+
+def _segments(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    lat1 = rng.uniform(37.70, 37.81, n)
+    lon1 = rng.uniform(-122.51, -122.37, n)
+    # Street segments of up to a few hundred meters in any direction
+    lat2 = lat1 + rng.uniform(-0.003, 0.003, n)
+    lon2 = lon1 + rng.uniform(-0.003, 0.003, n)
+    return lat1, lon1, lat2, lon2
+
+
+def test_offset_segments_matches_geopy():
+    """Batch offsets and lengths agree with the geopy-based scalar code"""
+    lat1, lon1, lat2, lon2 = _segments()
+    offsets = offset_segments(lat1, lon1, lat2, lon2, 1.5)
+
+    for i in range(len(lat1)):
+        start = Coordinate(lat=lat1[i], lon=lon1[i])
+        end = Coordinate(lat=lat2[i], lon=lon2[i])
+        right = perpendicular_offset(start, end, 1.5)
+        left = perpendicular_offset(start, end, -1.5)
+        length = geodesic(start.to_geopy_point(), end.to_geopy_point()).meters
+
+        assert geodesic((right.lat, right.lon), (offsets.right_lat[i], offsets.right_lon[i])).meters < 1e-4
+        assert geodesic((left.lat, left.lon), (offsets.left_lat[i], offsets.left_lon[i])).meters < 1e-4
+        assert abs(offsets.length_meters[i] - length) < 1e-6
+
+
+def test_offsets_are_perpendicular():
+    """A north-south street is offset east and west, not along the street"""
+    offsets = offset_segments([37.78], [-122.42], [37.77], [-122.42], 10.0)
+    assert abs(offsets.right_lat[0] - 37.775) < 1e-9
+    assert abs(offsets.left_lat[0] - 37.775) < 1e-9
+    assert offsets.right_lon[0] < -122.42 < offsets.left_lon[0]
+
+
+def test_generate_rectangle_arrays_interleaves_sides():
+    """Two rectangles per segment, +offset side first"""
+    lat1, lon1, lat2, lon2 = _segments(n=3)
+    columns = generate_rectangle_arrays(lat1, lon1, lat2, lon2, 1.5, 3.0)
+    offsets = offset_segments(lat1, lon1, lat2, lon2, 1.5)
+    assert len(columns["latitude"]) == 6
+    np.testing.assert_array_equal(columns["latitude"][0::2], offsets.right_lat)
+    np.testing.assert_array_equal(columns["latitude"][1::2], offsets.left_lat)
+    np.testing.assert_array_equal(columns["length"][0::2], offsets.length_meters)
+    assert (columns["width"] == 3.0).all()
@@ -0,0 +1,169 @@
+from itertools import product
+
+import numpy as np
+import pytest
+from schemas.species import (SPECIES, SPECIES_CODES, SPECIES_DATA,
+                             SPECIES_TABLE, Species, species_codes)
+from scripts import tree_generation
+from scripts.tree_generation import (AREA_TYPES, METERS_PER_FOOT, TREE_TYPES,
+                                     AreaType, Rectangle, TreeBatch,
+                                     TreePlacement, TreeType,
+                                     deduplicate_trees, generate_tree_batch,
+                                     generate_trees_for_rectangles,
+                                     planted_tree_counts)
+
+
+def _rectangles():
+    return [
+        Rectangle(
+            top_right_lat=37.78,
+            top_right_long=-122.41,
+            width_meters=18,
+            length_meters=18,
+            area_type=AreaType.PARKING_LOT,
+        ),
+        Rectangle(
+            top_right_lat=37.75,
+            top_right_long=-122.45,
+            width_meters=3,
+            length_meters=1,
+            area_type=AreaType.STREET_SIDE,
+        ),
+    ]
+
+
+def test_generate_tree_batch():
+    """Trees are generated per rectangle, in order, inside each rectangle"""
+    batch = generate_tree_batch(_rectangles(), 0.5, np.random.default_rng(0))
+    # round(324 * 0.5) trees, then round(1.5) trees
+    assert len(batch) == 162 + 2
+    assert batch.tree_type.dtype == np.uint8
+    assert batch.tree_type.max() < len(TREE_TYPES)
+
+    first, second = batch.latitude[:162], batch.latitude[162:]
+    assert ((first <= 37.78) & (first > 37.78 - 18 / 111_000)).all()
+    assert ((second <= 37.75) & (second > 37.75 - 1 / 111_000)).all()
+    assert (batch.longitude[:162] <= -122.41).all()
+
+
+def test_generate_tree_batch_minimum_one_tree():
+    """Every rectangle gets at least one tree, and zero density gets none"""
+    assert len(generate_tree_batch(_rectangles(), 1e-6)) == 2
+    assert len(generate_tree_batch(_rectangles(), 0)) == 0
+    assert len(generate_tree_batch([], 1.0)) == 0
+
+
+def test_generate_trees_for_rectangles_compat():
+    """The list wrapper returns Tree objects matching the batch"""
+    trees = generate_trees_for_rectangles(_rectangles(), 0.1)
+    assert len(trees) == 32 + 1
+    assert all(isinstance(tree.tree_type, TreeType) for tree in trees)
+
+
+def test_species_registry_codes():
+    """Tree type codes index the species registry and its attribute table"""
+    assert TreeType is Species
+    codes = species_codes(["redwood", Species.LONDON_PLANE])
+    assert [SPECIES[code] for code in codes] == [Species.REDWOOD, Species.LONDON_PLANE]
+
+    batch = generate_tree_batch(_rectangles(), 0.5, np.random.default_rng(0))
+    co2 = SPECIES_TABLE["co2_per_year"][batch.tree_type]
+    trees = batch.to_trees()
+    assert co2.tolist() == [SPECIES_DATA[t.tree_type]["co2_per_year"] for t in trees]
+
+
+def test_species_mix_per_area_type():
+    """Species follow the mix of each rectangle's area type"""
+    mix = np.zeros((len(AREA_TYPES), len(SPECIES)))
+    mix[:, SPECIES_CODES[Species.REDWOOD]] = 1.0
+    lot = AREA_TYPES.index(AreaType.PARKING_LOT)
+    mix[lot] = 0.0
+    mix[lot, SPECIES_CODES[Species.COAST_LIVE_OAK]] = 0.25
+    mix[lot, SPECIES_CODES[Species.LONDON_PLANE]] = 0.75
+
+    rectangles = _rectangles() * 50
+    batch = generate_tree_batch(rectangles, 1.0, np.random.default_rng(0), mix)
+    # The 3 m x 1 m street-side rectangles get 3 trees each, the rest are lots
+    lot_trees = np.tile(np.repeat([True, False], [324, 3]), 50)
+
+    assert (batch.tree_type[~lot_trees] == SPECIES_CODES[Species.REDWOOD]).all()
+    lot_codes = batch.tree_type[lot_trees]
+    assert set(lot_codes.tolist()) == {
+        SPECIES_CODES[Species.COAST_LIVE_OAK],
+        SPECIES_CODES[Species.LONDON_PLANE],
+    }
+    share = (lot_codes == SPECIES_CODES[Species.LONDON_PLANE]).mean()
+    assert share == pytest.approx(0.75, abs=0.01)
+
+
+def test_crown_spacing_placement():
+    """Trees of a rectangle keep at least the widest crown of the mix apart"""
+    mix = np.zeros((len(AREA_TYPES), len(SPECIES)))
+    mix[:, SPECIES_CODES[Species.MONTEREY_PINE]] = 1.0
+    spacing = SPECIES_DATA[Species.MONTEREY_PINE]["max_crown_spread"]
+    spacing *= METERS_PER_FOOT
+    lot = Rectangle(
+        top_right_lat=37.78,
+        top_right_long=-122.41,
+        width_meters=100,
+        length_meters=60,
+        area_type=AreaType.PARKING_LOT,
+    )
+
+    placement = TreePlacement.CROWN_SPACING
+    counts = planted_tree_counts([lot], 1.0, placement, mix)
+    assert counts.tolist() == [(100 // spacing) * (60 // spacing)]
+    assert planted_tree_counts([lot], 0.001, placement, mix).tolist() == [6]
+
+    to_lat = 1 / (6371000 * np.pi / 180)
+    to_long = to_lat / np.cos(np.radians(lot.top_right_lat))
+    for seed in range(20):
+        batch = generate_tree_batch(
+            [lot], 1.0, np.random.default_rng(seed), mix, placement
+        )
+        assert len(batch) == counts[0]
+        south = (lot.top_right_lat - batch.latitude) / to_lat
+        west = (lot.top_right_long - batch.longitude) / to_long
+        assert ((south >= 0) & (south <= 60) & (west >= 0) & (west <= 100)).all()
+        distances = np.hypot(
+            south[:, None] - south[None, :], west[:, None] - west[None, :]
+        )
+        np.fill_diagonal(distances, np.inf)
+        assert distances.min() >= spacing * (1 - 1e-9)
+
+
+def _dedup_layouts(rng):
+    """Tree positions in meters: scattered, packed a few dozen to a cell, and
+    in rows whose batch order follows their position"""
+    scattered = rng.random((400, 2)) * 40
+    # A few exact duplicates
+    scattered[::50] = scattered[1::50]
+    packed = rng.random((400, 2)) * 4
+    rows = np.column_stack([np.arange(400) % 40 * 0.9, np.arange(400) // 40 * 0.7])
+    return [scattered, packed, rows]
+
+
+@pytest.mark.parametrize("max_cells", [1 << 24, 4])
+def test_deduplicate_trees_matches_greedy(monkeypatch, max_cells):
+    """Kept trees are those of a sequential greedy pass in batch order, also
+    with cells widened past the radius"""
+    monkeypatch.setattr(tree_generation, "MAX_DEDUP_CELLS_PER_AXIS", max_cells)
+    rng = np.random.default_rng(7)
+    to_lat = 1 / (6371000 * np.pi / 180)
+    to_long = to_lat / np.cos(np.radians(37.77))
+    # A tiny radius would overflow the cell keys of a grid one radius wide
+    for radius, meters in product((1e-9, 0.5, 2.0, 5.0), _dedup_layouts(rng)):
+        batch = TreeBatch(
+            37.77 + meters[:, 1] * to_lat,
+            -122.42 + meters[:, 0] * to_long,
+            np.zeros(len(meters), dtype=np.uint8),
+        )
+        distances = np.hypot(*(meters[:, None, :] - meters[None, :, :]).T)
+
+        kept = []
+        for tree in range(len(meters)):
+            if all(distances[tree, other] >= radius for other in kept):
+                kept.append(tree)
+        deduplicated, removed = deduplicate_trees(batch, radius)
+        assert deduplicated.latitude.tolist() == batch.latitude[kept].tolist()
+        assert removed == len(meters) - len(kept)
@@ -0,0 +1,53 @@
+import mapbox_vector_tile
+import mercantile
+import numpy as np
+from services.rectangle_store import RectangleStore
+from services.spatial_index import GridIndex
+from services.tree_tiles import (DEFAULT_TILE_SEED, generate_rectangle_trees,
+                                 get_tree_tile)
+
+
+def _street_store(n, seed=0):
+    """Long, narrow rectangles, many of them crossing tile edges"""
+    rng = np.random.default_rng(seed)
+    return RectangleStore(
+        top_right_lat=rng.uniform(37.76, 37.78, n),
+        top_right_long=rng.uniform(-122.44, -122.42, n),
+        width_meters=np.full(n, 3.0),
+        length_meters=rng.uniform(100, 400, n),
+        area_type=np.zeros(n),
+    )
+
+
+def _tile_tree_count(index, tile):
+    layer = mapbox_vector_tile.decode(get_tree_tile(index, tile, 1.0, 0.05, 4))
+    return sum(f["properties"]["count"] for f in layer["trees"]["features"])
+
+
+def test_rectangle_trees_independent_of_neighbours():
+    """A rectangle's trees do not depend on which other rectangles are drawn"""
+    store = _street_store(20)
+    alone = generate_rectangle_trees(store, np.array([7]), 0.05, 3)
+    together = generate_rectangle_trees(store, np.array([2, 7, 11]), 0.05, 3)
+    assert np.isin(alone.latitude, together.latitude).all()
+    assert np.isin(alone.longitude, together.longitude).all()
+
+
+def test_tile_trees_consistent_across_zoom():
+    """Trees split across child tiles add up to the parent tile's trees"""
+    index = GridIndex(_street_store(300))
+    tile = mercantile.tile(-122.43, 37.77, 15)
+    children = mercantile.children(tile)
+    assert _tile_tree_count(index, tile) > 0
+    assert _tile_tree_count(index, tile) == sum(
+        _tile_tree_count(index, child) for child in children
+    )
+
+
+def test_unseeded_tiles_use_default_seed():
+    """Unseeded tiles are the same in every worker process"""
+    index = GridIndex(_street_store(300))
+    tile = mercantile.tile(-122.43, 37.77, 14)
+    assert get_tree_tile(index, tile, 1.0, 0.05) == get_tree_tile(
+        index, tile, 1.0, 0.05, DEFAULT_TILE_SEED
+    )
@@ -0,0 +1,47 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The preprocessing scripts import their siblings as top-level modules
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from wkt import linestring_segments, parse_linestrings  # noqa: E402
+
+SHAPES = pd.Series(
+    [
+        "LINESTRING (-122.1 37.1, -122.2 37.2, -122.3 37.3)",
+        None,
+        "POINT (-122.0 37.0)",
+        "LINESTRING EMPTY",
+        "LINESTRING (-122.4 37.4,-122.5 37.5)",
+    ]
+)
+
+
+def test_parse_linestrings():
+    """Every row becomes a feature; only LINESTRING rows own points"""
+    parsed = parse_linestrings(SHAPES)
+    assert parsed.counts.tolist() == [3, 0, 0, 0, 2]
+    assert parsed.coords[:, 0].tolist() == [-122.1, -122.2, -122.3, -122.4, -122.5]
+    assert parsed.coords[:, 1].tolist() == [37.1, 37.2, 37.3, 37.4, 37.5]
+
+
+def test_parse_linestrings_rejects_3d():
+    with pytest.raises(ValueError):
+        parse_linestrings(pd.Series(["LINESTRING (1 2 3, 4 5 6, 7 8 9)"]))
+
+
+def test_linestring_segments():
+    """Segments never span two features"""
+    parsed = parse_linestrings(SHAPES)
+
+    segments = linestring_segments(parsed)
+    assert segments.feature.tolist() == [0, 0, 4]
+    np.testing.assert_array_equal(segments.start[:, 0], [-122.1, -122.2, -122.4])
+    np.testing.assert_array_equal(segments.end[:, 0], [-122.2, -122.3, -122.5])
+
+    first = linestring_segments(parsed, first_segment_only=True)
+    assert first.feature.tolist() == [0, 4]
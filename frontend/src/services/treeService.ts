@@ -1,11 +1,55 @@
 import type { Feature, Point } from 'geojson';
 import type { TreeProperties } from './mockData';
 
-export interface TreeLocation {
-  latitude: number;
-  longitude: number;
+// Media type of the compact binary tree payload served by /trees/
+export const BINARY_TREES_MEDIA_TYPE = 'application/vnd.forest-vision.trees';
+
+const BINARY_TREES_HEADER_BYTES = 32;
+
+export interface BinaryTrees {
+  length: number;
+  // [longitude, latitude] offsets in degrees from `origin`, interleaved.
+  // Use with COORDINATE_SYSTEM.LNGLAT_OFFSETS and coordinateOrigin: origin.
+  positions: Float32Array;
+  // Index into `treeTypes` for each tree
+  treeTypeCodes: Uint8Array;
+  treeTypes: string[];
+  origin: [number, number, number];
 }
 
+export const fetchTreesBinary = async (
+  percentage: number = 1.0, // 0.0 to 1.0 decimal
+  treeDensity: number = 0.01 // trees per square meter
+): Promise<BinaryTrees> => {
+  const params = new URLSearchParams({
+    percentage: percentage.toString(),
+    trees_per_square_meter: treeDensity.toString()
+  });
+
+  const response = await fetch(`/api/trees/?${params}`, {
+    headers: { Accept: BINARY_TREES_MEDIA_TYPE }
+  });
+  if (!response.ok) {
+    throw new Error(`HTTP error! status: ${response.status}`);
+  }
+  const buffer = await response.arrayBuffer();
+  const header = new DataView(buffer, 0, BINARY_TREES_HEADER_BYTES);
+  const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+  if (magic !== 'FVTR' || header.getUint16(4, true) !== 1) {
+    throw new Error('Unexpected binary tree payload');
+  }
+  const length = header.getUint32(8, true);
+
+  // Views over the response buffer, no per-tree parsing
+  return {
+    length,
+    positions: new Float32Array(buffer, BINARY_TREES_HEADER_BYTES, length * 2),
+    treeTypeCodes: new Uint8Array(buffer, BINARY_TREES_HEADER_BYTES + length * 8, length),
+    treeTypes: (response.headers.get('X-Tree-Types') ?? '').split(','),
+    origin: [header.getFloat64(16, true), header.getFloat64(24, true), 0]
+  };
+};
+
 export const fetchTrees = async (
   percentage: number = 1.0, // 0.0 to 1.0 decimal
   treeDensity: number = 0.01 // trees per square meter
@@ -17,30 +61,16 @@ export const fetchTrees = async (
       trees_per_square_meter: treeDensity
     });
     
-    // Make sure to encode the parameters properly
-    const params = new URLSearchParams({
-      percentage: percentage.toString(),
-      trees_per_square_meter: treeDensity.toString()
-    });
-    
-    const response = await fetch(`/api/trees/?${params}`);
-    if (!response.ok) {
-      throw new Error(`HTTP error! status: ${response.status}`);
-    }
-    const treeLocations = await response.json();
+    const trees = await fetchTreesBinary(percentage, treeDensity);
     
     // Add debug logging
     console.log(`Fetching trees with density: ${treeDensity} trees/m²`);
-    console.log('Tree locations received:', treeLocations.length);
+    console.log('Tree locations received:', trees.length);
     
-    // Ensure treeLocations is an array
-    const locationsArray = Array.isArray(treeLocations) ? treeLocations : [];
+    const [originLongitude, originLatitude] = trees.origin;
     
-    // Convert backend format to GeoJSON format
-    return locationsArray.map((location: TreeLocation, index) => {
-      const treeTypes = ['sequoia', 'redwood', 'oak', 'eucalyptus', 'cypress'];
-      const randomType = treeTypes[Math.floor(Math.random() * treeTypes.length)];
-      
+    // Convert the binary payload to GeoJSON format
+    return Array.from({ length: trees.length }, (_, index) => {
       // Generate realistic random properties
       const height = 20 + Math.random() * 30; // 20-50m
       const diameter = 0.5 + Math.random() * 2.5; // 0.5-3m
@@ -52,12 +82,15 @@ export const fetchTrees = async (
         type: 'Feature',
         geometry: {
           type: 'Point',
-          coordinates: [location.longitude, location.latitude]
+          coordinates: [
+            originLongitude + trees.positions[index * 2],
+            originLatitude + trees.positions[index * 2 + 1]
+          ]
         },
         properties: {
           id: `tree_${index + 1}`,
           name: `Tree #${index + 1}`,
-          species: randomType,
+          species: trees.treeTypes[trees.treeTypeCodes[index]],
           height,
           diameter,
           age,
@@ -72,4 +105,4 @@ export const fetchTrees = async (
     console.error('Error fetching trees:', error);
     return [];
   }
-}; 
\ No newline at end of file
+};